@@ -11,3 +11,33 @@ def get_data_path(filename: str) -> str:
     base_dir = os.environ.get("CAFE_DATA_PATH", os.path.join(os.getcwd(), "data"))
     os.makedirs(base_dir, exist_ok=True)
     return os.path.join(base_dir, filename)
+
+
+def exportacion_excel_automatica() -> bool:
+    """Indica si las exportaciones a Excel se programan al guardar.
+
+    Se controla con la variable de entorno ``CAFE_EXPORTAR_EXCEL``: con
+    ``manual`` (o ``0``) las planillas solo se generan cuando se solicitan
+    explícitamente; en cualquier otro caso se generan en segundo plano.
+    """
+    valor = os.environ.get("CAFE_EXPORTAR_EXCEL", "auto").strip().lower()
+    return valor not in ("manual", "0", "no", "false")
+
+
+def get_storage_backend() -> str:
+    """Return the storage backend used by the controllers.
+
+    It is taken from the ``CAFE_STORAGE_BACKEND`` environment variable and
+    can be ``json`` (default) or ``sqlite``.
+    """
+    return os.environ.get("CAFE_STORAGE_BACKEND", "json").strip().lower() or "json"
+
+
+def escritura_diferida() -> bool:
+    """Indica si las ventas se persisten en grupos (escritura diferida).
+
+    Se activa con la variable de entorno ``CAFE_ESCRITURA_DIFERIDA`` (``1``,
+    ``si``, ``true``). Por defecto cada venta se escribe antes de retornar.
+    """
+    valor = os.environ.get("CAFE_ESCRITURA_DIFERIDA", "0").strip().lower()
+    return valor in ("1", "si", "sí", "yes", "true")
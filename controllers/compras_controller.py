@@ -1,13 +1,14 @@
 import logging
 
-from utils.json_utils import read_json, write_json
+from utils.cache_utils import REPOSITORIOS, filtrar_periodo
+from utils.storage import obtener_almacen
 from models.compra import Compra
 from models.compra_detalle import CompraDetalle
 from models.proveedor import Proveedor
-from controllers.materia_prima_controller import actualizar_stock_materia_prima
+from controllers.materia_prima_controller import ajustar_stock_materias_primas
 import config
-from collections import defaultdict
-from datetime import datetime  # <-- ¡Necesario para funciones de fecha!
+from utils.export_utils import programar_exportacion
+from utils.rollup_utils import RollupPeriodos, formatear_totales
 
 # Configuración de logging estructurado
 
@@ -37,41 +38,101 @@ logger = ContextAdapter(base_logger, {"proveedor": "-", "archivo": "-"})
 # Ruta por defecto donde se almacenarán las compras
 DATA_PATH = config.get_data_path("compras.json")
 
+# Totales de compras por mes, semana y día, actualizados con cada alta o baja.
+ROLLUP_COMPRAS = RollupPeriodos(lambda c: c.total)
+
 
 def cargar_compras():
     """
     Carga la lista de compras desde el archivo JSON.
     Si el archivo no existe, devuelve una lista vacía.
     """
+    return REPOSITORIOS.obtener(DATA_PATH, _leer_compras)
+
+
+def _leer_compras():
     logger.debug(f"Intentando cargar compras desde: {DATA_PATH}")
-    data = read_json(DATA_PATH)
+    data = obtener_almacen().cargar(DATA_PATH)
     logger.debug(f"Compras cargadas (raw data): {data}")
     return [Compra.from_dict(c) for c in data]
 
 
+def items_comprados_periodo(inicio, fin):
+    """Retorna ``(fecha, materia_prima_id, cantidad)`` por ítem comprado en el período.
+
+    Si las compras no están en el cache se recorren las filas del almacén
+    sin construir los modelos.
+    """
+    if REPOSITORIOS.en_cache(DATA_PATH):
+        return [
+            (c.fecha, item.producto_id, item.cantidad)
+            for c in filtrar_periodo(cargar_compras(), inicio, fin)
+            for item in c.items_compra
+        ]
+    return [
+        (c.get("fecha"), item.get("producto_id"), item.get("cantidad", 0))
+        for c in obtener_almacen().iterar(DATA_PATH, inicio, fin)
+        for item in c.get("items_compra", [])
+    ]
+
+
 def guardar_compras(compras):
     """
     Guarda la lista de objetos Compra en el archivo JSON.
     """
     logger.debug(f"Intentando guardar {len(compras)} compras en: {DATA_PATH}")
-    write_json(DATA_PATH, [c.to_dict() for c in compras])
+    REPOSITORIOS.reemplazar(
+        DATA_PATH,
+        lambda: obtener_almacen().guardar(DATA_PATH, [c.to_dict() for c in compras]),
+        list(compras),
+    )
     logger.debug("Compras guardadas con éxito.")
-    exportar_compras_excel(compras)
+    _programar_exportacion()
+
+
+def _programar_exportacion():
+    if config.exportacion_excel_automatica():
+        exportar_compras_excel()
 
 
-def exportar_compras_excel(compras):
+def exportar_compras_excel(compras=None, en_segundo_plano=True):
     """Exporta la lista de compras a ``compras.xlsx``.
 
+    Se exportan *compras* o, si es ``None``, todas las compras guardadas. Por
+    defecto la exportación se programa en segundo plano, agrupando las
+    ráfagas de guardados, para que ``pandas``/``openpyxl`` no demoren el
+    registro de la compra. Con ``en_segundo_plano=False`` se genera en el
+    momento.
+    """
+    # Al programar solo se toman las rutas: las compras guardadas se recorren
+    # de a una en el hilo exportador.
+    path = DATA_PATH
+    excel_path = config.get_data_path("compras.xlsx")
+    almacen = obtener_almacen()
+
+    def registros():
+        if compras is not None:
+            return [c.to_dict() for c in compras]
+        return (Compra.from_dict(c).to_dict() for c in almacen.iterar(path))
+
+    if en_segundo_plano:
+        programar_exportacion("compras", lambda: _escribir_compras_excel(registros(), excel_path))
+        return
+    _escribir_compras_excel(registros(), excel_path)
+
+
+def _escribir_compras_excel(registros, excel_path):
+    """Escribe ``compras.xlsx``.
+
     Si ``pandas``/``openpyxl`` no están instalados o ocurre algún otro error
     durante la exportación, se registra una advertencia y la aplicación sigue
     funcionando con normalidad.
     """
 
-    try:  # pragma: no cover - la exportación es best effort
+    try:
         import pandas as pd
 
-        df = pd.DataFrame([c.to_dict() for c in compras])
-        excel_path = config.get_data_path("compras.xlsx")
+        df = pd.DataFrame.from_records(registros)
         df.to_excel(excel_path, index=False)
     except ImportError as e:
         logger.warning(
@@ -90,7 +151,9 @@ def registrar_compra(proveedor: Proveedor, items_compra_detalle, fecha=None):
         fecha (str, optional): Fecha y hora de la compra en formato "YYYY-MM-DD HH:MM:SS". Si no se
             proporciona, se utilizará la fecha y hora actuales.
     Raises:
-        ValueError: Si el proveedor está vacío o no hay ítems en la compra.
+        ValueError: Si el proveedor está vacío, no hay ítems en la compra o
+            algún ajuste de stock es inválido (en ese caso la compra no se guarda).
+        OSError: Si la compra se guardó pero no se pudo guardar el stock.
     Returns:
         Compra: El objeto Compra recién registrado.
     """
@@ -99,25 +162,42 @@ def registrar_compra(proveedor: Proveedor, items_compra_detalle, fecha=None):
     if not items_compra_detalle:
         raise ValueError("La compra debe contener al menos un producto.")
 
-    compras = cargar_compras()
     nueva_compra = Compra(
         proveedor_id=proveedor.id,
         items_compra=items_compra_detalle,
         fecha=fecha
     )
-    compras.append(nueva_compra)
-    guardar_compras(compras)
-
-    # ¡Actualizar el stock de materias primas!
-    for item in items_compra_detalle:
-        try:
-            # El producto_id en CompraDetalle ahora es el ID de la MateriaPrima
-            actualizar_stock_materia_prima(item.producto_id, item.cantidad)
-        except ValueError as e:
-            logger.error(
-                f"Error al actualizar stock de materia prima '{item.nombre_producto}': {e}"
-            )
-            raise ValueError(f"Error al actualizar stock de '{item.nombre_producto}': {e}")
+    # El producto_id en CompraDetalle ahora es el ID de la MateriaPrima.
+    ajustes = [(item.producto_id, item.cantidad) for item in items_compra_detalle]
+    # Los ajustes de stock se validan antes de guardar la compra, para que una
+    # materia prima inexistente no deje una compra sin su efecto en el stock.
+    try:
+        ajustar_stock_materias_primas(ajustes, tipo="compra", solo_validar=True)
+    except ValueError as e:
+        logger.error(f"Error al actualizar stock de materias primas de la compra: {e}")
+        raise ValueError(f"Error al actualizar stock de la compra: {e}")
+
+    registrada = ROLLUP_COMPRAS.aplicar(
+        DATA_PATH,
+        lambda: REPOSITORIOS.agregar(
+            DATA_PATH,
+            lambda: obtener_almacen().agregar(DATA_PATH, nueva_compra.to_dict()),
+            nueva_compra,
+        ),
+        sumar=[nueva_compra],
+    )
+    if not registrada:
+        raise ValueError("No se pudo registrar la compra.")
+    _programar_exportacion()
+
+    # ¡Actualizar el stock de materias primas! Todos los ítems se persisten
+    # con una sola escritura.
+    ajustar_stock_materias_primas(
+        ajustes,
+        tipo="compra",
+        referencia=nueva_compra.id,
+        fecha=nueva_compra.fecha,
+    )
 
     return nueva_compra
 
@@ -125,9 +205,10 @@ def registrar_compra(proveedor: Proveedor, items_compra_detalle, fecha=None):
 def eliminar_compra(compra_id: str) -> bool:
     """Elimina una compra existente por ``compra_id``.
 
-    Además de persistir el cambio, intenta revertir el stock de materias
-    primas involucradas.  Si alguna actualización de stock falla, se
-    registra el error pero la eliminación de la compra continúa.
+    Además de persistir el cambio, revierte el stock de las materias
+    primas involucradas con una sola escritura. Si alguna reversión no es
+    posible (materia prima inexistente o stock insuficiente) se registra el
+    error, se omite ese ítem y la eliminación de la compra continúa.
 
     Raises
     ------
@@ -135,27 +216,32 @@ def eliminar_compra(compra_id: str) -> bool:
         Si la compra no existe.
     """
 
-    compras = cargar_compras()
-    for i, compra in enumerate(compras):
-        if compra.id == compra_id:
-            eliminada = compras.pop(i)
-            guardar_compras(compras)
-            for item in eliminada.items_compra:
-                try:
-                    actualizar_stock_materia_prima(item.producto_id, -item.cantidad)
-                except ValueError as exc:  # pragma: no cover - logging best effort
-                    logger.error(
-                        "Error al revertir stock de '%s': %s", item.nombre_producto, exc
-                    )
-            return True
-    raise ValueError("Compra no encontrada")
+    eliminada = REPOSITORIOS.buscar(DATA_PATH, _leer_compras, compra_id)
+    if eliminada is None or not ROLLUP_COMPRAS.aplicar(
+        DATA_PATH,
+        lambda: REPOSITORIOS.quitar(
+            DATA_PATH,
+            lambda: obtener_almacen().eliminar(DATA_PATH, compra_id),
+            compra_id,
+        ),
+        restar=[eliminada],
+    ):
+        raise ValueError("Compra no encontrada")
+    _programar_exportacion()
+    ajustar_stock_materias_primas(
+        [(item.producto_id, -item.cantidad) for item in eliminada.items_compra],
+        omitir_invalidos=True,
+        tipo="reversion",
+        referencia=compra_id,
+    )
+    return True
 
 
 def listar_compras():
     """
     Retorna la lista completa de compras.
     """
-    return cargar_compras()
+    return list(cargar_compras())
 
 
 def total_comprado():
@@ -171,70 +257,20 @@ def obtener_compras_por_mes():
     Retorna una lista de tuplas (mes_año, total_comprado_ese_mes) ordenada cronológicamente,
     con el total formateado con separador de miles y signo de moneda.
     Ejemplo: [('2023-01', 'Gs 50.000,00'), ('2023-02', 'Gs 75.000,00')]
+    Los totales se leen de los acumulados por período; las compras con
+    fecha inválida se ignoran.
     """
-    compras = cargar_compras()
-    compras_mensuales = defaultdict(float)
-
-    for compra in compras:
-        try:
-            fecha_dt = datetime.strptime(compra.fecha, "%Y-%m-%d %H:%M:%S")
-            mes_año = fecha_dt.strftime("%Y-%m")
-            compras_mensuales[mes_año] += compra.total
-        except ValueError:
-            logger.error(
-                f"Advertencia: Fecha de compra inválida '{compra.fecha}'. Se ignorará esta compra para estadísticas mensuales."
-            )
-            continue
-        except Exception as e:
-            logger.error(
-                f"Error inesperado al procesar fecha de compra '{compra.fecha}': {e}"
-            )
-            continue
-
-    compras_ordenadas = sorted(compras_mensuales.items())
-
-    formatted_compras = []
-    for mes_año, total in compras_ordenadas:
-        total_str = f"{total:,.0f}".replace(",", "X").replace(".", ",").replace("X", ".")
-        formatted_compras.append((mes_año, f"Gs {total_str}"))
-
-    return formatted_compras
+    return formatear_totales(ROLLUP_COMPRAS.totales(DATA_PATH, cargar_compras, "mes"))
 
 def obtener_compras_por_semana():
     """
     Calcula el total de compras agrupadas por semana y año.
-    La semana se representa como 'YYYY-WNN' (Año-Número de Semana).
+    La semana se representa como 'YYYY-WNN' (Año-Número de Semana ISO).
     Retorna una lista de tuplas (semana_año, total_comprado_esa_semana) ordenada cronológicamente,
     con el total formateado con separador de miles y signo de moneda.
     Ejemplo: [('2023-W01', 'Gs 25.000,00'), ('2023-W02', 'Gs 30.000,00')]
     """
-    compras = cargar_compras()
-    compras_semanales = defaultdict(float)
-
-    for compra in compras:
-        try:
-            fecha_dt = datetime.strptime(compra.fecha, "%Y-%m-%d %H:%M:%S")
-            semana_año = fecha_dt.strftime("%G-W%V") # Formato Año-Semana ISO
-            compras_semanales[semana_año] += compra.total
-        except ValueError:
-            logger.error(
-                f"Advertencia: Fecha de compra inválida '{compra.fecha}'. Se ignorará esta compra para estadísticas semanales."
-            )
-            continue
-        except Exception as e:
-            logger.error(
-                f"Error inesperado al procesar fecha de compra '{compra.fecha}': {e}"
-            )
-            continue
-
-    compras_ordenadas = sorted(compras_semanales.items())
-
-    formatted_compras = []
-    for semana_año, total in compras_ordenadas:
-        total_str = f"{total:,.0f}".replace(",", "X").replace(".", ",").replace("X", ".")
-        formatted_compras.append((semana_año, f"Gs {total_str}"))
-
-    return formatted_compras
+    return formatear_totales(ROLLUP_COMPRAS.totales(DATA_PATH, cargar_compras, "semana"))
 
 def obtener_compras_por_dia():
     """
@@ -243,21 +279,4 @@ def obtener_compras_por_dia():
     con el total formateado con separador de miles y signo de moneda.
     Ejemplo: [('2025-06-15', 'Gs 120.000'), ...]
     """
-    compras = cargar_compras()
-    compras_dia = defaultdict(float)
-    for compra in compras:
-        try:
-            fecha_dt = datetime.strptime(compra.fecha, "%Y-%m-%d %H:%M:%S")
-            dia = fecha_dt.strftime("%Y-%m-%d")
-            compras_dia[dia] += compra.total
-        except Exception as e:
-            logger.error(f"Error procesando fecha de compra: {e}")
-            continue
-    compras_ordenadas = sorted(compras_dia.items())
-    formatted = []
-    for dia, total in compras_ordenadas:
-        total_str = f"{total:,.0f}".replace(",", "X").replace(".", ",").replace("X", ".")
-        formatted.append((dia, f"Gs {total_str}"))
-    return formatted
-
-
+    return formatear_totales(ROLLUP_COMPRAS.totales(DATA_PATH, cargar_compras, "dia"))
@@ -0,0 +1,125 @@
+"""Conciliación del consumo teórico contra el consumo real entre dos conteos.
+
+Entre un conteo físico inicial y uno final el consumo real de cada materia
+prima es ``inicial + compras - final``; el consumo teórico es lo que dicen las
+recetas de lo vendido en los tickets del mismo período. La diferencia es la
+merma (o el sobrante si es negativa) que no explican las ventas.
+
+Los tickets y las compras del período se recorren una sola vez como filas
+``(fecha, id, cantidad)``: las del almacén se leen solo de las particiones
+mensuales (o filas indexadas) del período y sin construir los modelos. Las
+unidades vendidas por producto se acumulan en un vector que se multiplica por
+la matriz de consumo compilada de las recetas, por lo que el costo no crece
+con la cantidad de recetas por ticket y un año de historial se procesa en una
+pasada.
+"""
+
+from dataclasses import dataclass
+
+import numpy as np
+
+from controllers import (
+    compras_controller,
+    materia_prima_controller,
+    recetas_controller,
+    tickets_controller,
+)
+from utils.storage import normalizar_fecha
+
+
+@dataclass(frozen=True)
+class ConciliacionMateria:
+    materia_prima_id: str
+    nombre: str
+    unidad_medida: str
+    stock_inicial: float
+    compras: float
+    stock_final: float
+    consumo_real: float
+    consumo_teorico: float
+    diferencia: float  # real - teórico; positiva si falta stock
+    merma: float  # la diferencia cuando es positiva, si no 0
+    porcentaje: float  # diferencia sobre el consumo teórico, None si no hubo
+    costo_diferencia: float
+
+
+def _fin_del_dia(fecha):
+    fecha = str(fecha).strip()
+    return f"{fecha} 23:59:59" if len(fecha) == 10 else fecha
+
+
+def conciliar_consumo(inicio, fin, conteo_inicial, conteo_final=None):
+    """
+    Compara el consumo teórico y el real de cada materia prima entre dos conteos.
+    Args:
+        inicio (str): Fecha del conteo inicial (``YYYY-MM-DD`` es el comienzo del día).
+        fin (str): Fecha del conteo final (``YYYY-MM-DD`` es el final del día).
+        conteo_inicial (dict): ``materia_prima_id -> cantidad`` contada al inicio.
+        conteo_final (dict, opcional): ``materia_prima_id -> cantidad`` contada
+            al final; por defecto el stock actual.
+    Returns:
+        list[ConciliacionMateria]: Solo las materias primas contadas en ambos
+        conteos, de la mayor a la menor pérdida valorizada.
+    """
+    inicio, fin = normalizar_fecha(inicio), normalizar_fecha(_fin_del_dia(fin))
+    materias = materia_prima_controller.cargar_materias_primas()
+    if conteo_final is None:
+        conteo_final = {mp.id: mp.stock for mp in materias}
+    materias = [mp for mp in materias if mp.id in conteo_inicial and mp.id in conteo_final]
+    if not materias:
+        return []
+    columnas = {mp.id: i for i, mp in enumerate(materias)}
+
+    # Compras del período, acumuladas por materia prima.
+    comprado = np.zeros(len(materias))
+    compras = [
+        (columnas[mp_id], cantidad)
+        for _, mp_id, cantidad in compras_controller.items_comprados_periodo(inicio, fin)
+        if mp_id in columnas
+    ]
+    if compras:
+        indices, cantidades = zip(*compras)
+        comprado = np.bincount(indices, weights=np.asarray(cantidades, dtype=float), minlength=len(materias))
+
+    # Consumo teórico: unidades vendidas por producto x consumo por unidad.
+    teorico = np.zeros(len(materias))
+    productos = {}
+    vendidos = [
+        (productos.setdefault(producto_id, len(productos)), cantidad)
+        for _, producto_id, cantidad in tickets_controller.items_vendidos_periodo(inicio, fin)
+    ]
+    if vendidos:
+        filas, cantidades = zip(*vendidos)
+        unidades = np.bincount(filas, weights=np.asarray(cantidades, dtype=float), minlength=len(productos))
+        ids, consumos = recetas_controller.matriz_consumo(list(productos))
+        consumo_por_id = unidades @ consumos
+        for j, mp_id in enumerate(ids):
+            if mp_id in columnas:
+                teorico[columnas[mp_id]] = consumo_por_id[j]
+
+    inicial = np.array([float(conteo_inicial[mp.id]) for mp in materias])
+    final = np.array([float(conteo_final[mp.id]) for mp in materias])
+    costo = np.array([float(mp.costo_unitario or 0) for mp in materias])
+    real = inicial + comprado - final
+    diferencia = real - teorico
+    with np.errstate(divide="ignore", invalid="ignore"):
+        porcentaje = np.where(teorico > 0, diferencia / teorico * 100, np.nan)
+    valorizada = diferencia * costo
+
+    return [
+        ConciliacionMateria(
+            materia_prima_id=materias[i].id,
+            nombre=materias[i].nombre,
+            unidad_medida=materias[i].unidad_medida,
+            stock_inicial=float(inicial[i]),
+            compras=round(float(comprado[i]), 4),
+            stock_final=float(final[i]),
+            consumo_real=round(float(real[i]), 4),
+            consumo_teorico=round(float(teorico[i]), 4),
+            diferencia=round(float(diferencia[i]), 4),
+            merma=round(max(float(diferencia[i]), 0.0), 4),
+            porcentaje=None if np.isnan(porcentaje[i]) else round(float(porcentaje[i]), 2),
+            costo_diferencia=round(float(valorizada[i]), 2),
+        )
+        for i in np.argsort(-valorizada, kind="stable")
+    ]
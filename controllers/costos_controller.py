@@ -0,0 +1,160 @@
+"""Tabla de costos de producción por producto.
+
+Los costos se calculan a partir de las recetas y del costo unitario de las
+materias primas. En lugar de recorrer la receta en cada consulta, se mantiene
+una tabla ``producto_id -> CostoProducto`` y un índice inverso
+``materia_prima_id -> productos``. Cuando cambia la colección de materias
+primas o de recetas solo se recalculan los productos afectados: los que usan
+una materia prima cuyo costo cambió o cuya receta fue editada.
+"""
+
+import logging
+import threading
+from collections import defaultdict
+from dataclasses import dataclass
+
+from controllers import materia_prima_controller, recetas_controller
+from utils.cache_utils import REPOSITORIOS
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class CostoProducto:
+    costo_lote: float
+    rendimiento: float
+    costo_unitario: float
+
+
+_SIN_RECETA = CostoProducto(costo_lote=0.0, rendimiento=1, costo_unitario=0.0)
+
+
+def _huella_receta(receta):
+    """Resume los datos de la receta que intervienen en el costo."""
+    return (
+        receta.rendimiento,
+        tuple(
+            (ing.get("materia_prima_id"), ing.get("cantidad_necesaria"))
+            for ing in receta.ingredientes
+        ),
+    )
+
+
+class MotorCostos:
+    """Mantiene la tabla de costos sincronizada con recetas y materias primas."""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._reiniciar(None)
+
+    def _reiniciar(self, rutas):
+        self._rutas = rutas
+        self._version_recetas = None
+        self._version_materias = None
+        self._tabla = {}
+        self._huellas = {}  # producto_id -> (receta, huella)
+        self._costos_materias = {}  # materia_prima_id -> costo_unitario
+        self._por_materia = defaultdict(set)  # materia_prima_id -> {producto_id}
+        self._materias_de = {}  # producto_id -> materias de su receta
+
+    def invalidar(self):
+        with self._lock:
+            self._reiniciar(None)
+
+    def costo(self, producto_id):
+        """Retorna el ``CostoProducto`` de *producto_id*."""
+        with self._lock:
+            self._sincronizar()
+            return self._tabla.get(producto_id, _SIN_RECETA)
+
+    def tabla(self):
+        """Retorna una copia de la tabla ``producto_id -> CostoProducto``."""
+        with self._lock:
+            self._sincronizar()
+            return dict(self._tabla)
+
+    def _sincronizar(self):
+        # Las cargas validan el cache de repositorios (y recargan si hubo
+        # cambios externos) antes de consultar las versiones.
+        recetas = recetas_controller.cargar_recetas()
+        materias = materia_prima_controller.cargar_materias_primas()
+        rutas = (recetas_controller.DATA_PATH, materia_prima_controller.DATA_PATH)
+        if rutas != self._rutas:
+            self._reiniciar(rutas)
+
+        afectados = set()
+        version_materias = REPOSITORIOS.version(rutas[1])
+        if version_materias != self._version_materias:
+            costos = {mp.id: float(mp.costo_unitario or 0) for mp in materias}
+            for mp_id in costos.keys() | self._costos_materias.keys():
+                if costos.get(mp_id) != self._costos_materias.get(mp_id):
+                    afectados |= self._por_materia.get(mp_id, set())
+            self._costos_materias = costos
+            self._version_materias = version_materias
+
+        version_recetas = REPOSITORIOS.version(rutas[0])
+        if version_recetas != self._version_recetas:
+            huellas = {}
+            for receta in recetas:
+                # Igual que obtener_receta_por_producto_id: vale la primera receta.
+                if receta.producto_id not in huellas:
+                    huellas[receta.producto_id] = (receta, _huella_receta(receta))
+            for producto_id in huellas.keys() | self._huellas.keys():
+                nueva = huellas.get(producto_id)
+                anterior = self._huellas.get(producto_id)
+                if nueva is None or anterior is None or nueva[1] != anterior[1]:
+                    afectados.add(producto_id)
+            self._huellas = huellas
+            self._version_recetas = version_recetas
+
+        for producto_id in afectados:
+            self._recalcular(producto_id)
+
+    def _recalcular(self, producto_id):
+        for mp_id in self._materias_de.pop(producto_id, ()):
+            self._por_materia[mp_id].discard(producto_id)
+        entrada = self._huellas.get(producto_id)
+        if entrada is None:
+            self._tabla.pop(producto_id, None)
+            return
+        receta, (rendimiento, ingredientes) = entrada
+        self._materias_de[producto_id] = {mp_id for mp_id, _ in ingredientes}
+        costo_lote = 0.0
+        for mp_id, cantidad in ingredientes:
+            self._por_materia[mp_id].add(producto_id)
+            costo_mp = self._costos_materias.get(mp_id)
+            if costo_mp is None:
+                logger.error(
+                    f"Advertencia: Materia prima con ID '{mp_id}' no encontrada para la receta del producto '{receta.nombre_producto}'. No se incluirá en el costo."
+                )
+                continue
+            costo_lote += float(cantidad or 0) * costo_mp
+        rendimiento = rendimiento if rendimiento and rendimiento > 0 else 1
+        self._tabla[producto_id] = CostoProducto(
+            costo_lote=costo_lote,
+            rendimiento=rendimiento,
+            costo_unitario=costo_lote / rendimiento,
+        )
+
+
+_MOTOR = MotorCostos()
+
+
+def costo_lote_producto(producto_id):
+    """Costo de las materias primas de un lote de la receta del producto."""
+    return _MOTOR.costo(producto_id).costo_lote
+
+
+def costo_unitario_producto(producto_id):
+    """Costo de producción de una unidad (costo del lote / rendimiento)."""
+    return _MOTOR.costo(producto_id).costo_unitario
+
+
+def tabla_costos():
+    """Retorna la tabla completa ``producto_id -> CostoProducto``."""
+    return _MOTOR.tabla()
+
+
+def invalidar_costos():
+    """Descarta la tabla para que la próxima consulta la reconstruya."""
+    _MOTOR.invalidar()
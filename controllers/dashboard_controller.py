@@ -5,10 +5,12 @@ import datetime as dt
 from collections import defaultdict
 from dataclasses import dataclass
 
-from controllers.gastos_adicionales_controller import listar_gastos_adicionales
-from controllers.materia_prima_controller import obtener_materia_prima_por_id
-from controllers.recetas_controller import obtener_receta_por_producto_id
-from controllers.tickets_controller import cargar_tickets
+import numpy as np
+
+from controllers.costos_controller import costo_unitario_producto
+from controllers.gastos_adicionales_controller import cargar_gastos_periodo, listar_gastos_adicionales
+from controllers.tickets_controller import meses_con_tickets, tabla_ventas
+from utils.fechas import clave_mes
 
 
 @dataclass
@@ -28,51 +30,12 @@ class DashboardMetricas:
     productos_problema: list[dict]
 
 
-def _parse_fecha(fecha: str | dt.datetime | None) -> dt.datetime | None:
-    if not fecha:
-        return None
-    if isinstance(fecha, dt.datetime):
-        return fecha
-    if isinstance(fecha, str):
-        fecha_limpia = fecha[:19]
-        formatos = ("%Y-%m-%d %H:%M:%S", "%Y-%m-%d")
-        for fmt in formatos:
-            try:
-                return dt.datetime.strptime(fecha_limpia, fmt)
-            except ValueError:
-                continue
-    return None
-
-
-def _costo_unitario_producto(producto_id: str) -> float:
-    receta = obtener_receta_por_producto_id(producto_id)
-    if not receta:
-        return 0.0
-
-    costo_lote = 0.0
-    for ingrediente in receta.ingredientes:
-        materia = obtener_materia_prima_por_id(ingrediente["materia_prima_id"])
-        if not materia:
-            continue
-        costo_lote += float(ingrediente.get("cantidad_necesaria", 0) or 0) * float(materia.costo_unitario or 0)
-
-    rendimiento = getattr(receta, "rendimiento", None)
-    if rendimiento and rendimiento > 0:
-        return costo_lote / rendimiento
-    return costo_lote
-
-
 def meses_disponibles_dashboard() -> list[str]:
-    meses = set()
-    for ticket in cargar_tickets():
-        fecha = _parse_fecha(getattr(ticket, "fecha", None))
-        if fecha:
-            meses.add(fecha.strftime("%Y-%m"))
+    meses = set(meses_con_tickets())
 
     for gasto in listar_gastos_adicionales():
-        fecha = _parse_fecha(getattr(gasto, "fecha", None))
-        if fecha:
-            meses.add(fecha.strftime("%Y-%m"))
+        if gasto.fecha_dt:
+            meses.add(clave_mes(gasto.fecha_dt))
 
     return sorted(meses)
 
@@ -85,98 +48,162 @@ def _rango_mes(mes: str) -> tuple[dt.datetime, dt.datetime]:
     return inicio, fin
 
 
-def calcular_metricas_dashboard_mensual(mes: str) -> DashboardMetricas:
-    inicio, fin = _rango_mes(mes)
-
-    ventas_totales = 0.0
-    costos_produccion = 0.0
-    unidades_vendidas = 0
-    dias_con_ventas = set()
-
-    ventas_por_producto = defaultdict(float)
-    unidades_por_producto = defaultdict(int)
-    margen_por_producto = defaultdict(float)
-    costo_pendiente_por_producto = defaultdict(bool)
-    nombres_por_producto = {}
-
-    for ticket in cargar_tickets():
-        fecha_ticket = _parse_fecha(getattr(ticket, "fecha", None))
-        if not fecha_ticket or not (inicio <= fecha_ticket <= fin):
-            continue
-
-        dias_con_ventas.add(fecha_ticket.date())
-        ventas_totales += float(ticket.total or 0)
-
-        for item in ticket.items_venta:
-            cantidad = int(item.cantidad or 0)
-            total_item = float(item.total or 0)
-            producto_id = item.producto_id
-            if producto_id and producto_id not in nombres_por_producto:
-                nombres_por_producto[producto_id] = getattr(item, "nombre_producto", "")
-            unidades_vendidas += cantidad
-            ventas_por_producto[producto_id] += total_item
-            unidades_por_producto[producto_id] += cantidad
-
-            costo_unitario = _costo_unitario_producto(producto_id)
-            if cantidad > 0 and costo_unitario <= 0:
-                costo_pendiente_por_producto[producto_id] = True
-            costo_item = costo_unitario * cantidad
-            costos_produccion += costo_item
-            margen_por_producto[producto_id] += total_item - costo_item
-
-    gastos_adicionales = 0.0
-    for gasto in listar_gastos_adicionales():
-        fecha_gasto = _parse_fecha(getattr(gasto, "fecha", None))
-        if fecha_gasto and inicio <= fecha_gasto <= fin:
-            gastos_adicionales += float(gasto.monto or 0)
+class _AcumuladoMes:
+    """Totales de un mes, calculados sobre las columnas de ventas."""
+
+    def __init__(self) -> None:
+        self.ventas_totales = 0.0
+        self.costos_produccion = 0.0
+        self.unidades_vendidas = 0
+        self.total_tickets = 0
+        self.gastos_adicionales = 0.0
+        self.dias_con_ventas: set[dt.date] = set()
+        self.ventas_por_producto: dict[str, float] = defaultdict(float)
+        self.unidades_por_producto: dict[str, int] = defaultdict(int)
+        self.margen_por_producto: dict[str, float] = defaultdict(float)
+        self.costo_pendiente_por_producto: dict[str, bool] = defaultdict(bool)
+        self.nombres_por_producto: dict[str, str] = {}
+
+    def metricas(self, mes: str) -> DashboardMetricas:
+        resultado_mes = self.ventas_totales - self.costos_produccion - self.gastos_adicionales
+        ticket_promedio = self.ventas_totales / self.total_tickets if self.total_tickets > 0 else 0.0
+        dias_operativos = len(self.dias_con_ventas)
+        ventas_diarias_promedio = (
+            self.ventas_totales / dias_operativos if dias_operativos > 0 else 0.0
+        )
+        punto_equilibrio = self.costos_produccion + self.gastos_adicionales
+
+        ranking = []
+        for producto_id, total_vendido in self.ventas_por_producto.items():
+            margen_total = self.margen_por_producto[producto_id]
+            margen_pct = (margen_total / total_vendido * 100) if total_vendido > 0 else 0.0
+            ranking.append(
+                {
+                    "producto_id": producto_id,
+                    "nombre_producto": self.nombres_por_producto.get(producto_id, ""),
+                    "ventas": total_vendido,
+                    "margen_pct": margen_pct,
+                    "margen_total": margen_total,
+                    "unidades": self.unidades_por_producto[producto_id],
+                    "costo_pendiente": self.costo_pendiente_por_producto[producto_id],
+                }
+            )
+
+        top_productos = sorted(ranking, key=lambda x: x["margen_total"], reverse=True)[:3]
+        productos_problema = sorted(ranking, key=lambda x: x["margen_total"])[:3]
+
+        return DashboardMetricas(
+            mes=mes,
+            ventas_totales=self.ventas_totales,
+            costos_produccion=self.costos_produccion,
+            gastos_adicionales=self.gastos_adicionales,
+            resultado_mes=resultado_mes,
+            punto_equilibrio=punto_equilibrio,
+            unidades_vendidas=self.unidades_vendidas,
+            ticket_promedio=ticket_promedio,
+            ventas_diarias_promedio=ventas_diarias_promedio,
+            dias_operativos=dias_operativos,
+            costos_produccion_pendientes=any(self.costo_pendiente_por_producto.values()),
+            top_productos=top_productos,
+            productos_problema=productos_problema,
+        )
 
-    resultado_mes = ventas_totales - costos_produccion - gastos_adicionales
 
-    ticket_promedio = 0.0
-    total_tickets_mes = sum(
-        1
-        for t in cargar_tickets()
-        if (fecha_t := _parse_fecha(getattr(t, "fecha", None))) and inicio <= fecha_t <= fin
+def _indice_mes(fechas: np.ndarray, meses: np.ndarray) -> np.ndarray:
+    """Posición en *meses* (ordenados) del mes de cada fecha epoch, o -1."""
+    mes = fechas.astype("datetime64[s]").astype("datetime64[M]")
+    posicion = np.minimum(np.searchsorted(meses, mes), len(meses) - 1)
+    return np.where(meses[posicion] == mes, posicion, -1)
+
+
+def calcular_metricas_dashboard_meses(meses: list[str]) -> dict[str, DashboardMetricas]:
+    """Calcula las métricas de varios meses con reducciones sobre las columnas de ventas.
+
+    Solo se consideran los tickets y gastos entre el primer y el último mes
+    pedido. Los totales por mes y por ``(mes, producto)`` se obtienen con
+    ``np.bincount`` sobre las columnas de ``tabla_ventas`` y el costo
+    unitario de cada producto se consulta una vez por llamada.
+    """
+    if not meses:
+        return {}
+    acumulados = {mes: _AcumuladoMes() for mes in meses}
+    inicio = _rango_mes(min(meses))[0]
+    fin = _rango_mes(max(meses))[1]
+    claves = sorted(acumulados)
+    tabla = tabla_ventas(inicio, fin)
+    cantidad_meses, cantidad_productos = len(claves), len(tabla.productos)
+    meses_np = np.array(claves, dtype="datetime64[M]")
+
+    # Por ticket: cantidad, total y días con ventas de cada mes.
+    mes_ticket = _indice_mes(tabla.ticket_fecha, meses_np)
+    en_mes = mes_ticket >= 0
+    mes_ticket = mes_ticket[en_mes]
+    total_tickets = np.bincount(mes_ticket, minlength=cantidad_meses)
+    ventas_totales = np.bincount(
+        mes_ticket, weights=tabla.ticket_total[en_mes], minlength=cantidad_meses
     )
-    if total_tickets_mes > 0:
-        ticket_promedio = ventas_totales / total_tickets_mes
-
-    dias_operativos = len(dias_con_ventas)
-    ventas_diarias_promedio = ventas_totales / dias_operativos if dias_operativos > 0 else 0.0
-
-    punto_equilibrio = costos_produccion + gastos_adicionales
-
-    ranking = []
-    for producto_id, total_vendido in ventas_por_producto.items():
-        margen_total = margen_por_producto[producto_id]
-        margen_pct = (margen_total / total_vendido * 100) if total_vendido > 0 else 0.0
-        ranking.append(
-            {
-                "producto_id": producto_id,
-                "nombre_producto": nombres_por_producto.get(producto_id, ""),
-                "ventas": total_vendido,
-                "margen_pct": margen_pct,
-                "margen_total": margen_total,
-                "unidades": unidades_por_producto[producto_id],
-                "costo_pendiente": costo_pendiente_por_producto[producto_id],
-            }
+    dias = np.unique(np.column_stack((mes_ticket, tabla.ticket_fecha[en_mes] // 86400)), axis=0)
+    for posicion, dia in dias:
+        acumulados[claves[posicion]].dias_con_ventas.add(
+            dt.date(1970, 1, 1) + dt.timedelta(days=int(dia))
         )
 
-    top_productos = sorted(ranking, key=lambda x: x["margen_total"], reverse=True)[:3]
-    productos_problema = sorted(ranking, key=lambda x: x["margen_total"])[:3]
-
-    return DashboardMetricas(
-        mes=mes,
-        ventas_totales=ventas_totales,
-        costos_produccion=costos_produccion,
-        gastos_adicionales=gastos_adicionales,
-        resultado_mes=resultado_mes,
-        punto_equilibrio=punto_equilibrio,
-        unidades_vendidas=unidades_vendidas,
-        ticket_promedio=ticket_promedio,
-        ventas_diarias_promedio=ventas_diarias_promedio,
-        dias_operativos=dias_operativos,
-        costos_produccion_pendientes=any(costo_pendiente_por_producto.values()),
-        top_productos=top_productos,
-        productos_problema=productos_problema,
-    )
+    # Por línea: ventas y unidades de cada (mes, producto).
+    mes_linea = _indice_mes(tabla.fecha, meses_np)
+    en_mes = mes_linea >= 0
+    celda = mes_linea[en_mes] * cantidad_productos + tabla.producto[en_mes]
+    cantidades = tabla.cantidad[en_mes].astype(np.int64)
+    forma = (cantidad_meses, cantidad_productos)
+
+    def por_celda(pesos=None):
+        return np.bincount(
+            celda, weights=pesos, minlength=cantidad_meses * cantidad_productos
+        ).reshape(forma)
+
+    lineas = por_celda()
+    ventas = por_celda(tabla.total[en_mes])
+    unidades = por_celda(cantidades).astype(np.int64)
+    con_unidades = por_celda(cantidades > 0)
+    # Primera línea de cada (mes, producto): el ranking desempata por orden de aparición.
+    primera = np.full(cantidad_meses * cantidad_productos, len(celda))
+    np.minimum.at(primera, celda, np.arange(len(celda)))
+    primera = primera.reshape(forma)
+    costos_unitarios = np.zeros(cantidad_productos)
+    for producto in np.flatnonzero(lineas.any(axis=0)):
+        costos_unitarios[producto] = costo_unitario_producto(tabla.productos[producto])
+    costos = unidades * costos_unitarios
+
+    for posicion, mes in enumerate(claves):
+        acumulado = acumulados[mes]
+        acumulado.total_tickets = int(total_tickets[posicion])
+        acumulado.ventas_totales = float(ventas_totales[posicion])
+        acumulado.unidades_vendidas = int(unidades[posicion].sum())
+        acumulado.costos_produccion = float(costos[posicion].sum())
+        vendidos = np.flatnonzero(lineas[posicion])
+        for producto in vendidos[np.argsort(primera[posicion, vendidos], kind="stable")]:
+            producto_id = tabla.productos[producto]
+            if producto_id:
+                acumulado.nombres_por_producto[producto_id] = tabla.nombres[producto]
+            acumulado.ventas_por_producto[producto_id] = float(ventas[posicion, producto])
+            acumulado.unidades_por_producto[producto_id] = int(unidades[posicion, producto])
+            acumulado.margen_por_producto[producto_id] = float(
+                ventas[posicion, producto] - costos[posicion, producto]
+            )
+            if con_unidades[posicion, producto] and costos_unitarios[producto] <= 0:
+                acumulado.costo_pendiente_por_producto[producto_id] = True
+
+    for gasto in cargar_gastos_periodo(inicio, fin):
+        acumulado = acumulados.get(clave_mes(gasto.fecha_dt)) if gasto.fecha_dt else None
+        if acumulado is not None:
+            acumulado.gastos_adicionales += float(gasto.monto or 0)
+
+    return {mes: acumulado.metricas(mes) for mes, acumulado in acumulados.items()}
+
+
+def calcular_metricas_dashboard_anual(anio: int) -> dict[str, DashboardMetricas]:
+    """Calcula las métricas de los doce meses de *anio* en una sola pasada."""
+    return calcular_metricas_dashboard_meses([f"{anio:04d}-{m:02d}" for m in range(1, 13)])
+
+
+def calcular_metricas_dashboard_mensual(mes: str) -> DashboardMetricas:
+    return calcular_metricas_dashboard_meses([mes])[mes]
@@ -0,0 +1,196 @@
+"""Unidades producibles de cada producto con el stock actual.
+
+La ventana de ventas muestra cuántas unidades de cada producto se pueden
+preparar. En lugar de recorrer la receta y buscar cada materia prima por
+producto, se mantiene una matriz ``productos x materias primas`` con la
+cantidad necesaria por unidad y un vector con el stock de cada columna; las
+unidades de todos los productos salen de una división y un mínimo por fila.
+
+La matriz se reconstruye solo cuando cambia la colección de recetas y las
+unidades solo cuando cambian las recetas o las materias primas (cualquier
+cambio de stock incrementa la versión de la colección en el cache).
+
+``ReservaCarrito`` descuenta del stock lo que ya está en el carrito de la
+venta en curso y señala qué productos comparten ingredientes con el último
+ítem agregado, de modo que la ventana solo actualiza esas líneas.
+"""
+
+import threading
+from collections import defaultdict
+
+import numpy as np
+
+from controllers import materia_prima_controller, recetas_controller
+from utils.cache_utils import REPOSITORIOS
+
+SIN_LIMITE = float("inf")
+
+
+class MatrizDisponibilidad:
+    """Mantiene las unidades producibles sincronizadas con recetas y stock."""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._reiniciar(None)
+
+    def _reiniciar(self, rutas):
+        self._rutas = rutas
+        self._version_recetas = None
+        self._version_materias = None
+        self._filas = {}  # producto_id -> fila
+        self._productos = []  # producto_id de cada fila
+        self._columnas = []  # materia_prima_id de cada columna
+        self._consumos = np.zeros((0, 0))  # cantidad necesaria por unidad
+        self._usa = np.zeros((0, 0), dtype=bool)  # la receta menciona la materia prima
+        self._stock = np.zeros(0)
+        self._existe = np.zeros(0, dtype=bool)
+        self._unidades = np.zeros(0)
+
+    def invalidar(self):
+        with self._lock:
+            self._reiniciar(None)
+
+    def unidades(self, producto_ids, reservado=None):
+        """Retorna ``producto_id -> unidades`` (``SIN_LIMITE`` si no tiene receta).
+
+        *reservado* (``materia_prima_id -> cantidad``) se descuenta del stock
+        antes de calcular, solo para los productos pedidos.
+        """
+        with self._lock:
+            self._sincronizar()
+            filas = {pid: self._filas.get(pid) for pid in producto_ids}
+            if reservado:
+                indices = np.array([f for f in filas.values() if f is not None], dtype=int)
+                descuento = np.array([reservado.get(mp_id, 0.0) for mp_id in self._columnas])
+                valores = dict(zip(indices.tolist(), self._evaluar(indices, self._stock - descuento)))
+            else:
+                valores = self._unidades
+            resultado = {}
+            for producto_id, fila in filas.items():
+                valor = SIN_LIMITE if fila is None else float(valores[fila])
+                resultado[producto_id] = valor if valor == SIN_LIMITE else int(valor)
+            return resultado
+
+    def relacionados(self, producto_id):
+        """Productos cuya receta comparte alguna materia prima con la de *producto_id*.
+
+        Incluye al propio producto.
+        """
+        with self._lock:
+            self._sincronizar()
+            fila = self._filas.get(producto_id)
+            if fila is None:
+                return {producto_id}
+            comparten = self._usa[:, self._usa[fila]].any(axis=1)
+            return {self._productos[i] for i in np.flatnonzero(comparten)}
+
+    def _sincronizar(self):
+        # Las cargas validan el cache de repositorios antes de consultar versiones.
+        recetas = recetas_controller.cargar_recetas()
+        materias = materia_prima_controller.cargar_materias_primas()
+        rutas = (recetas_controller.DATA_PATH, materia_prima_controller.DATA_PATH)
+        if rutas != self._rutas:
+            self._reiniciar(rutas)
+
+        version_recetas = REPOSITORIOS.version(rutas[0])
+        if version_recetas != self._version_recetas:
+            self._construir(recetas)
+            self._version_recetas = version_recetas
+            self._version_materias = None
+
+        version_materias = REPOSITORIOS.version(rutas[1])
+        if version_materias != self._version_materias:
+            self._calcular(materias)
+            self._version_materias = version_materias
+
+    def _construir(self, recetas):
+        filas = {}
+        columnas = {}
+        ingredientes_por_fila = []
+        for receta in recetas:
+            # Igual que obtener_receta_por_producto_id: vale la primera receta.
+            if receta.producto_id in filas or not receta.ingredientes:
+                continue
+            filas[receta.producto_id] = len(ingredientes_por_fila)
+            ingredientes = []
+            for ingrediente in receta.ingredientes:
+                mp_id = ingrediente["materia_prima_id"]
+                columna = columnas.setdefault(mp_id, len(columnas))
+                ingredientes.append((columna, float(ingrediente["cantidad_necesaria"] or 0)))
+            ingredientes_por_fila.append(ingredientes)
+
+        consumos = np.zeros((len(filas), len(columnas)))
+        usa = np.zeros((len(filas), len(columnas)), dtype=bool)
+        for fila, ingredientes in enumerate(ingredientes_por_fila):
+            for columna, cantidad in ingredientes:
+                usa[fila, columna] = True
+                if cantidad > 0:
+                    # Un ingrediente repetido suma, como al registrar la venta.
+                    consumos[fila, columna] += cantidad
+        self._filas = filas
+        self._productos = list(filas)
+        self._columnas = list(columnas)
+        self._consumos = consumos
+        self._usa = usa
+
+    def _calcular(self, materias):
+        stock_por_id = {mp.id: float(mp.stock or 0) for mp in materias}
+        self._stock = np.array([stock_por_id.get(mp_id, 0.0) for mp_id in self._columnas])
+        self._existe = np.array([mp_id in stock_por_id for mp_id in self._columnas], dtype=bool)
+        self._unidades = self._evaluar(slice(None), self._stock)
+
+    def _evaluar(self, filas, stock):
+        """Unidades de las *filas* de la matriz con el vector de *stock* dado."""
+        consumos = self._consumos[filas]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            posibles = np.where(consumos > 0, stock / consumos, np.inf)
+        minimo = posibles.min(axis=1, initial=np.inf)
+        # Una receta con una materia prima inexistente no puede producirse.
+        faltantes = (self._usa[filas] & ~self._existe).any(axis=1)
+        return np.where(faltantes, 0.0, np.trunc(minimo))
+
+
+class ReservaCarrito:
+    """Consumo de materias primas comprometido por el carrito en curso."""
+
+    def __init__(self, matriz=None):
+        self._matriz = matriz or _MATRIZ
+        self._reservado = defaultdict(float)  # materia_prima_id -> cantidad
+
+    def agregar(self, producto_id, cantidad):
+        """Reserva el consumo de *cantidad* unidades y retorna los productos afectados."""
+        plan = recetas_controller.planes_consumo([producto_id])[producto_id]
+        for mp_id, cantidad_por_unidad, _ in plan:
+            if cantidad_por_unidad > 0:
+                self._reservado[mp_id] += cantidad_por_unidad * cantidad
+        return self._matriz.relacionados(producto_id)
+
+    def reservado(self, materia_prima_id):
+        """Cantidad de *materia_prima_id* comprometida por el carrito."""
+        return self._reservado.get(materia_prima_id, 0.0)
+
+    def unidades(self, producto_ids):
+        """Como ``unidades_producibles`` pero descontando lo reservado."""
+        return self._matriz.unidades(producto_ids, self._reservado)
+
+    def vaciar(self):
+        """Libera todas las reservas (venta registrada o cancelada)."""
+        self._reservado.clear()
+
+
+_MATRIZ = MatrizDisponibilidad()
+
+
+def unidades_producibles(producto_ids):
+    """Retorna ``producto_id -> unidades producibles`` para varios productos."""
+    return _MATRIZ.unidades(producto_ids)
+
+
+def unidades_producibles_producto(producto_id):
+    """Unidades de *producto_id* que alcanza a producir el stock actual."""
+    return _MATRIZ.unidades([producto_id])[producto_id]
+
+
+def invalidar_disponibilidad():
+    """Descarta la matriz para que la próxima consulta la reconstruya."""
+    _MATRIZ.invalidar()
@@ -1,8 +1,9 @@
 import os
 import logging
-from utils.json_utils import read_json, write_json
-from collections import defaultdict
-from datetime import datetime
+from utils.cache_utils import REPOSITORIOS, filtrar_periodo
+from utils.rollup_utils import RollupPeriodos, formatear_totales
+from utils.storage import obtener_almacen
+from utils.fechas import epoch, parse_fecha
 import config
 
 # Importa tus modelos según corresponda, por ejemplo:
@@ -13,19 +14,39 @@ DATA_PATH = config.get_data_path("gastos_adicionales.json")
 logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
+# Totales de gastos por mes, semana y día, actualizados con cada alta o baja.
+ROLLUP_GASTOS = RollupPeriodos(lambda ga: ga.monto)
+
 def cargar_gastos_adicionales():
     """
     Carga la lista de gastos adicionales desde el archivo JSON.
     Si el archivo no existe, devuelve una lista vacía.
     """
-    data = read_json(DATA_PATH)
+    return REPOSITORIOS.obtener(DATA_PATH, _leer_gastos_adicionales)
+
+
+def _leer_gastos_adicionales():
+    data = obtener_almacen().cargar(DATA_PATH)
+    return [GastoAdicional.from_dict(ga) for ga in data]
+
+
+def cargar_gastos_periodo(inicio, fin):
+    """Carga solo los gastos adicionales con fecha entre *inicio* y *fin*."""
+    almacen = obtener_almacen()
+    if REPOSITORIOS.en_cache(DATA_PATH) or not almacen.rango_eficiente(DATA_PATH):
+        return filtrar_periodo(cargar_gastos_adicionales(), inicio, fin)
+    data = almacen.rango(DATA_PATH, inicio, fin)
     return [GastoAdicional.from_dict(ga) for ga in data]
 
 def guardar_gastos_adicionales(gastos_adicionales):
     """
     Guarda la lista de objetos GastoAdicional en el archivo JSON.
     """
-    write_json(DATA_PATH, [ga.to_dict() for ga in gastos_adicionales])
+    REPOSITORIOS.reemplazar(
+        DATA_PATH,
+        lambda: obtener_almacen().guardar(DATA_PATH, [ga.to_dict() for ga in gastos_adicionales]),
+        list(gastos_adicionales),
+    )
 
 def validar_gasto_adicional(nombre, monto):
     """
@@ -46,35 +67,45 @@ def agregar_gasto_adicional(nombre, monto, fecha=None, descripcion=None):
     if not es_valido:
         raise ValueError(mensaje_error)
 
-    gastos_adicionales = cargar_gastos_adicionales()
     nuevo_gasto = GastoAdicional(
         nombre.strip(),
         monto,
         fecha,
         descripcion.strip() if descripcion else ""
     )
-    gastos_adicionales.append(nuevo_gasto)
-    guardar_gastos_adicionales(gastos_adicionales)
+    ROLLUP_GASTOS.aplicar(
+        DATA_PATH,
+        lambda: REPOSITORIOS.agregar(
+            DATA_PATH,
+            lambda: obtener_almacen().agregar(DATA_PATH, nuevo_gasto.to_dict()),
+            nuevo_gasto,
+        ),
+        sumar=[nuevo_gasto],
+    )
     return nuevo_gasto
 
 def listar_gastos_adicionales():
     """
     Retorna la lista completa de gastos adicionales.
     """
-    return cargar_gastos_adicionales()
+    return list(cargar_gastos_adicionales())
 
 def eliminar_gasto_adicional(id_gasto):
     """
     Elimina un gasto adicional de la lista por su ID.
     """
-    gastos_adicionales = cargar_gastos_adicionales()
-    gastos_original_count = len(gastos_adicionales)
-    gastos_adicionales = [ga for ga in gastos_adicionales if ga.id != id_gasto]
-
-    if len(gastos_adicionales) == gastos_original_count:
+    gasto = REPOSITORIOS.buscar(DATA_PATH, _leer_gastos_adicionales, id_gasto)
+    eliminado = gasto is not None and ROLLUP_GASTOS.aplicar(
+        DATA_PATH,
+        lambda: REPOSITORIOS.quitar(
+            DATA_PATH,
+            lambda: obtener_almacen().eliminar(DATA_PATH, id_gasto),
+            id_gasto,
+        ),
+        restar=[gasto],
+    )
+    if not eliminado:
         raise ValueError(f"Gasto adicional con ID '{id_gasto}' no encontrado para eliminación.")
-
-    guardar_gastos_adicionales(gastos_adicionales)
     return True
 
 def obtener_gastos_adicionales_por_mes():
@@ -83,70 +114,20 @@ def obtener_gastos_adicionales_por_mes():
     Retorna una lista de tuplas (mes_año, total_gastado_ese_mes) ordenada cronológicamente,
     con el total formateado con separador de miles y signo de moneda.
     Ejemplo: [('2023-01', 'Gs 150.000,00'), ('2023-02', 'Gs 200.000,00')]
+    Los totales se leen de los acumulados por período; los gastos con
+    fecha inválida se ignoran.
     """
-    gastos = cargar_gastos_adicionales()
-    gastos_mensuales = defaultdict(float)
-
-    for gasto in gastos:
-        try:
-            fecha_dt = datetime.strptime(gasto.fecha, "%Y-%m-%d %H:%M:%S")
-            mes_año = fecha_dt.strftime("%Y-%m")
-            gastos_mensuales[mes_año] += gasto.monto
-        except ValueError:
-            logger.error(
-                f"Advertencia: Fecha de gasto inválida '{gasto.fecha}'. Se ignorará este gasto para estadísticas mensuales."
-            )
-            continue
-        except Exception as e:
-            logger.error(
-                f"Error inesperado al procesar fecha del gasto '{gasto.fecha}': {e}"
-            )
-            continue
-
-    gastos_ordenados = sorted(gastos_mensuales.items())
-
-    formatted_gastos = []
-    for mes_año, total in gastos_ordenados:
-        total_str = f"{total:,.0f}".replace(",", "X").replace(".", ",").replace("X", ".")
-        formatted_gastos.append((mes_año, f"Gs {total_str}"))
-
-    return formatted_gastos
+    return formatear_totales(ROLLUP_GASTOS.totales(DATA_PATH, cargar_gastos_adicionales, "mes"))
 
 def obtener_gastos_adicionales_por_semana():
     """
     Calcula el total de gastos adicionales agrupados por semana y año.
-    La semana se representa como 'YYYY-WNN' (Año-Número de Semana).
+    La semana se representa como 'YYYY-WNN' (Año-Número de Semana ISO).
     Retorna una lista de tuplas (semana_año, total_gastado_esa_semana) ordenada cronológicamente,
     con el total formateado con separador de miles y signo de moneda.
     Ejemplo: [('2023-W01', 'Gs 25.000,00'), ('2023-W02', 'Gs 30.000,00')]
     """
-    gastos = cargar_gastos_adicionales()
-    gastos_semanales = defaultdict(float)
-
-    for gasto in gastos:
-        try:
-            fecha_dt = datetime.strptime(gasto.fecha, "%Y-%m-%d %H:%M:%S")
-            semana_año = fecha_dt.strftime("%G-W%V") # Formato Año-Semana ISO
-            gastos_semanales[semana_año] += gasto.monto
-        except ValueError:
-            logger.error(
-                f"Advertencia: Fecha de gasto inválida '{gasto.fecha}'. Se ignorará este gasto para estadísticas semanales."
-            )
-            continue
-        except Exception as e:
-            logger.error(
-                f"Error inesperado al procesar fecha del gasto '{gasto.fecha}': {e}"
-            )
-            continue
-
-    gastos_ordenados = sorted(gastos_semanales.items())
-
-    formatted_gastos = []
-    for semana_año, total in gastos_ordenados:
-        total_str = f"{total:,.0f}".replace(",", "X").replace(".", ",").replace("X", ".")
-        formatted_gastos.append((semana_año, f"Gs {total_str}"))
-
-    return formatted_gastos
+    return formatear_totales(ROLLUP_GASTOS.totales(DATA_PATH, cargar_gastos_adicionales, "semana"))
 
 def obtener_gastos_adicionales_por_dia():
     """
@@ -154,48 +135,17 @@ def obtener_gastos_adicionales_por_dia():
     Retorna una lista de tuplas (YYYY-MM-DD, total_gastos_dia) ordenada,
     con el total formateado como string de moneda.
     """
-    gastos = cargar_gastos_adicionales()
-    gastos_dia = defaultdict(float)
-    for gasto in gastos:
-        try:
-            fecha_dt = datetime.strptime(gasto.fecha, "%Y-%m-%d %H:%M:%S")
-            dia = fecha_dt.strftime("%Y-%m-%d")
-            gastos_dia[dia] += gasto.monto
-        except Exception as e:
-            logger.error(f"Error procesando fecha de gasto adicional: {e}")
-            continue
-    gastos_ordenados = sorted(gastos_dia.items())
-    formatted = []
-    for dia, total in gastos_ordenados:
-        total_str = f"{total:,.0f}".replace(",", "X").replace(".", ",").replace("X", ".")
-        formatted.append((dia, f"Gs {total_str}"))
-    return formatted
-
-
-def _parse_fecha(fecha):
-    if isinstance(fecha, datetime):
-        return fecha
-    if isinstance(fecha, str):
-        fecha = fecha[:19]
-        try:
-            if len(fecha) == 10:
-                return datetime.strptime(fecha, "%Y-%m-%d")
-            return datetime.strptime(fecha, "%Y-%m-%d %H:%M:%S")
-        except ValueError:
-            raise ValueError("Formato de fecha inválido. Use 'YYYY-MM-DD' o 'YYYY-MM-DD HH:MM:SS'.")
-    raise TypeError("La fecha debe ser un string o datetime.")
+    return formatear_totales(ROLLUP_GASTOS.totales(DATA_PATH, cargar_gastos_adicionales, "dia"))
 
 
 def total_gastos_periodo(inicio, fin):
-    inicio_dt = _parse_fecha(inicio)
-    fin_dt = _parse_fecha(fin)
+    inicio_dt = parse_fecha(inicio)
+    fin_dt = parse_fecha(fin)
+    desde, hasta = epoch(inicio_dt), epoch(fin_dt)
     total = 0.0
-    for gasto in cargar_gastos_adicionales():
-        try:
-            fecha_gasto = _parse_fecha(gasto.fecha)
-        except Exception:
-            continue
-        if inicio_dt <= fecha_gasto <= fin_dt:
+    for gasto in cargar_gastos_periodo(inicio_dt, fin_dt):
+        segundos = gasto.epoch
+        if segundos is not None and desde <= segundos <= hasta:
             total += gasto.monto
     return total
 
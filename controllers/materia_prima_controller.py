@@ -1,6 +1,13 @@
 import logging
-from typing import Optional, List  # Add this import
-from utils.json_utils import read_json, write_json
+from utils.cache_utils import REPOSITORIOS
+from utils.storage import obtener_almacen
+from utils.write_behind_utils import vaciar_escrituras
+from controllers.movimientos_stock_controller import (
+    crear_movimientos,
+    neto_movimientos,
+    registrar_movimientos,
+)
+from controllers.stock_bajo_controller import INDICE_STOCK_BAJO
 from models.materia_prima import MateriaPrima
 from models.unidades import ALLOWED_UNIDADES
 import config
@@ -9,37 +16,32 @@ DATA_PATH = config.get_data_path("materias_primas.json")
 
 logger = logging.getLogger(__name__)
 
-# Cache de materias primas para evitar lecturas repetidas del disco.
-_MATERIAS_CACHE: Optional[List[MateriaPrima]] = None
-_CACHE_PATH: Optional[str] = None
-
 
 def clear_materias_cache() -> None:
     """Limpia el cache de materias primas.
 
     Esta función es útil en entornos de prueba para asegurar que cada test
-    comience sin datos en memoria. También se invalida la ruta asociada al cache
-    para que, en caso de cambiar ``DATA_PATH``, la próxima carga se realice
-    desde el nuevo archivo.
+    comience sin datos en memoria. El cache se indexa por ``DATA_PATH``, por
+    lo que cambiar la ruta ya provoca una nueva carga desde el otro archivo.
     """
-    global _MATERIAS_CACHE, _CACHE_PATH
-    _MATERIAS_CACHE = None
-    _CACHE_PATH = None
+    REPOSITORIOS.invalidar(DATA_PATH)
 
 
 def cargar_materias_primas():
     """
     Carga la lista de materias primas desde el archivo JSON.
     Si el archivo no existe, devuelve una lista vacía.
+    La lista se comparte a través del cache de repositorios mientras el
+    almacén no cambie.
     """
-    global _MATERIAS_CACHE, _CACHE_PATH
+    return REPOSITORIOS.obtener(DATA_PATH, _leer_materias_primas)
 
-    if _MATERIAS_CACHE is not None and _CACHE_PATH == DATA_PATH:
-        logger.debug("Retornando materias primas desde cache.")
-        return _MATERIAS_CACHE
 
+def _leer_materias_primas():
+    # Los ajustes de stock diferidos deben estar en disco antes de releer.
+    vaciar_escrituras()
     logger.debug(f"Intentando cargar materias primas desde: {DATA_PATH}")
-    data = read_json(DATA_PATH)
+    data = obtener_almacen().cargar(DATA_PATH)
     logger.debug(f"Materias primas cargadas (raw data): {data}")
     if not isinstance(data, list):
         logger.error(
@@ -56,27 +58,39 @@ def cargar_materias_primas():
             )
             continue
         materias_primas.append(MateriaPrima.from_dict(mp))
-    _MATERIAS_CACHE = materias_primas
-    _CACHE_PATH = DATA_PATH
-    return _MATERIAS_CACHE
+    return materias_primas
+
+
+def _indice_stock_bajo():
+    """Retorna el índice de stock bajo sincronizado con la colección cacheada."""
+    materias = cargar_materias_primas()
+    INDICE_STOCK_BAJO.sincronizar(DATA_PATH, REPOSITORIOS.version(DATA_PATH), materias)
+    return INDICE_STOCK_BAJO
+
+
+def _actualizar_stock_bajo(indice, materias):
+    """Informa al índice de stock bajo las materias primas recién modificadas."""
+    indice.aplicar(DATA_PATH, materias, REPOSITORIOS.version(DATA_PATH))
 
 
 def guardar_materias_primas(materias_primas):
     """
     Guarda la lista de objetos MateriaPrima en el archivo JSON.
     """
-    global _MATERIAS_CACHE, _CACHE_PATH
-
     logger.debug(
         f"Intentando guardar {len(materias_primas)} materias primas en: {DATA_PATH}"
     )
-    write_json(DATA_PATH, [mp.to_dict() for mp in materias_primas])
+    vaciar_escrituras()
+    _indice_stock_bajo()
+    REPOSITORIOS.reemplazar(
+        DATA_PATH,
+        lambda: obtener_almacen().guardar(DATA_PATH, [mp.to_dict() for mp in materias_primas]),
+        list(materias_primas),
+    )
+    # Compara contra el estado anterior y notifica los cruces.
+    _indice_stock_bajo()
     logger.debug("Materias primas guardadas con éxito.")
 
-    # Actualizamos el cache para que refleje los datos persistidos.
-    _MATERIAS_CACHE = materias_primas
-    _CACHE_PATH = DATA_PATH
-
 
 def validar_materia_prima(nombre, unidad_medida, costo_unitario, stock, stock_minimo=0):
     """
@@ -108,7 +122,6 @@ def agregar_materia_prima(nombre, unidad_medida, costo_unitario, stock_inicial,
     if not es_valido:
         raise ValueError(mensaje_error)
 
-    materias_primas = cargar_materias_primas()
     nueva_materia_prima = MateriaPrima(
         nombre.strip(),
         unidad_medida.strip(),
@@ -116,8 +129,16 @@ def agregar_materia_prima(nombre, unidad_medida, costo_unitario, stock_inicial,
         stock_inicial,
         stock_minimo
     )
-    materias_primas.append(nueva_materia_prima)
-    guardar_materias_primas(materias_primas)
+    indice = _indice_stock_bajo()
+    REPOSITORIOS.agregar(
+        DATA_PATH,
+        lambda: obtener_almacen().agregar(DATA_PATH, nueva_materia_prima.to_dict()),
+        nueva_materia_prima,
+    )
+    _actualizar_stock_bajo(indice, [nueva_materia_prima])
+    registrar_movimientos(
+        crear_movimientos({nueva_materia_prima.id: stock_inicial}, "ajuste", referencia="alta")
+    )
     return nueva_materia_prima
 
 
@@ -125,13 +146,19 @@ def listar_materias_primas():
     """
     Retorna la lista completa de materias primas.
     """
-    return cargar_materias_primas()
+    return list(cargar_materias_primas())
 
 
 def materias_con_stock_bajo():
-    """Retorna la lista de materias primas cuyo stock actual es menor o igual al stock mínimo."""
-    materias = cargar_materias_primas()
-    return [mp for mp in materias if mp.stock <= mp.stock_minimo]
+    """Retorna la lista de materias primas cuyo stock actual es menor o igual al stock mínimo.
+
+    La lista sale del índice de stock bajo, que se actualiza con cada cambio
+    de stock; solo se recorre la colección si cambió por fuera del controlador.
+    """
+    indice = _indice_stock_bajo()
+    return [
+        mp for mp in (obtener_materia_prima_por_id(id_mp) for id_mp in indice.bajas()) if mp
+    ]
 
 
 def obtener_materia_prima_por_id(id_materia_prima):
@@ -139,11 +166,7 @@ def obtener_materia_prima_por_id(id_materia_prima):
     Busca y retorna una materia prima por su ID.
     Retorna None si la materia prima no es encontrada.
     """
-    materias_primas = cargar_materias_primas()
-    for mp in materias_primas:
-        if mp.id == id_materia_prima:
-            return mp
-    return None
+    return REPOSITORIOS.buscar(DATA_PATH, _leer_materias_primas, id_materia_prima)
 
 
 def editar_materia_prima(id_materia_prima, nuevo_nombre, nueva_unidad_medida, nuevo_costo_unitario, nuevo_stock, nuevo_stock_minimo=0):
@@ -155,16 +178,19 @@ def editar_materia_prima(id_materia_prima, nuevo_nombre, nueva_unidad_medida, nu
     if not es_valido:
         raise ValueError(mensaje_error)
 
-    materias_primas = cargar_materias_primas()
-    for i, mp in enumerate(materias_primas):
-        if mp.id == id_materia_prima:
-            materias_primas[i].nombre = nuevo_nombre.strip()
-            materias_primas[i].unidad_medida = nueva_unidad_medida.strip()
-            materias_primas[i].costo_unitario = nuevo_costo_unitario
-            materias_primas[i].stock = nuevo_stock
-            materias_primas[i].stock_minimo = nuevo_stock_minimo
-            guardar_materias_primas(materias_primas)
-            return materias_primas[i]
+    mp = obtener_materia_prima_por_id(id_materia_prima)
+    if mp:
+        indice = _indice_stock_bajo()
+        cambio_stock = nuevo_stock - mp.stock
+        mp.nombre = nuevo_nombre.strip()
+        mp.unidad_medida = nueva_unidad_medida.strip()
+        mp.costo_unitario = nuevo_costo_unitario
+        mp.stock = nuevo_stock
+        mp.stock_minimo = nuevo_stock_minimo
+        _persistir_materia_prima(mp)
+        _actualizar_stock_bajo(indice, [mp])
+        registrar_movimientos(crear_movimientos({mp.id: cambio_stock}, "ajuste"))
+        return mp
     raise ValueError(f"Materia prima con ID '{id_materia_prima}' no encontrada para edición.")
 
 
@@ -172,14 +198,17 @@ def eliminar_materia_prima(id_materia_prima):
     """
     Elimina una materia prima de la lista por su ID.
     """
-    materias_primas = cargar_materias_primas()
-    materias_primas_original_count = len(materias_primas)
-    materias_primas = [mp for mp in materias_primas if mp.id != id_materia_prima]
-
-    if len(materias_primas) == materias_primas_original_count:
+    if obtener_materia_prima_por_id(id_materia_prima) is None:
         raise ValueError(f"Materia prima con ID '{id_materia_prima}' no encontrada para eliminación.")
+    vaciar_escrituras()
+    indice = _indice_stock_bajo()
 
-    guardar_materias_primas(materias_primas)
+    REPOSITORIOS.quitar(
+        DATA_PATH,
+        lambda: obtener_almacen().eliminar(DATA_PATH, id_materia_prima),
+        id_materia_prima,
+    )
+    indice.quitar(DATA_PATH, id_materia_prima, REPOSITORIOS.version(DATA_PATH))
     return True
 
 
@@ -192,24 +221,117 @@ def actualizar_stock_materia_prima(id_materia_prima, cantidad_cambio):
     Raises:
         ValueError: Si la materia prima no se encuentra o el stock resultante es negativo.
     """
-    materias_primas = cargar_materias_primas()
-    materia_prima_encontrada = None
-    for i, mp in enumerate(materias_primas):
-        if mp.id == id_materia_prima:
-            materia_prima_encontrada = mp
-            break
-
-    if not materia_prima_encontrada:
-        raise ValueError(f"Materia prima con ID '{id_materia_prima}' no encontrada para actualizar stock.")
+    return ajustar_stock_materias_primas([(id_materia_prima, cantidad_cambio)])[0]
+
+
+def ajustar_stock_materias_primas(
+    ajustes,
+    omitir_invalidos=False,
+    forzar=False,
+    persistir=True,
+    tipo="ajuste",
+    referencia=None,
+    fecha=None,
+    solo_validar=False,
+):
+    """
+    Aplica varios cambios de stock y los persiste con una sola escritura.
+    Los cambios aplicados se anexan al libro de movimientos como *tipo*
+    (``venta``, ``compra``, ``ajuste`` o ``reversion``).
+    Args:
+        ajustes (iterable): Pares ``(id_materia_prima, cantidad_cambio)`` o un dict
+            ``id -> cantidad_cambio``. Los cambios de una misma materia prima se suman.
+        omitir_invalidos (bool): Si es True, los ajustes de materias primas
+            inexistentes o que dejarían stock negativo se registran en el log y
+            se omiten; si es False, ninguno se aplica.
+        forzar (bool): Si es True, permite que el stock quede negativo.
+        persistir (bool): Si es False, solo se modifican las materias primas
+            cacheadas y quien llama debe persistirlas con
+            ``persistir_materias_primas`` (por ejemplo en una escritura diferida)
+            y registrar sus movimientos.
+        tipo (str): Origen de los cambios en el libro de movimientos.
+        referencia (str, opcional): ID del ticket o compra que los origina.
+        fecha (str, opcional): Fecha de los movimientos; por defecto la actual.
+        solo_validar (bool): Si es True, solo se validan los ajustes (con las
+            mismas excepciones) sin modificar el stock, para que quien llama
+            pueda validar antes de persistir sus propios cambios.
+    Raises:
+        ValueError: Si algún ajuste es inválido y no se omiten (el mensaje
+            incluye todos los errores).
+        OSError: Si no se pudo guardar el stock.
+    Returns:
+        list: Las materias primas actualizadas, en el orden de los ajustes
+        (con *solo_validar*, las que se actualizarían).
+    """
+    if isinstance(ajustes, dict):
+        ajustes = ajustes.items()
+    cambios = {}
+    for id_materia_prima, cantidad_cambio in ajustes:
+        cambios[id_materia_prima] = cambios.get(id_materia_prima, 0) + cantidad_cambio
+
+    validos = []
+    errores = []
+    for id_materia_prima, cantidad_cambio in cambios.items():
+        materia_prima = obtener_materia_prima_por_id(id_materia_prima)
+        if not materia_prima:
+            errores.append(f"Materia prima con ID '{id_materia_prima}' no encontrada para actualizar stock.")
+            continue
+        nuevo_stock = materia_prima.stock + cantidad_cambio
+        if nuevo_stock < 0 and not forzar:
+            errores.append(
+                f"Stock insuficiente para '{materia_prima.nombre}'. Se intenta reducir el stock a {nuevo_stock}, pero solo hay {materia_prima.stock}.")
+            continue
+        validos.append((materia_prima, nuevo_stock))
+
+    if errores:
+        if not omitir_invalidos:
+            raise ValueError(" ".join(errores))
+        for error in errores:
+            logger.error(f"Ajuste de stock omitido: {error}")
+    if solo_validar:
+        return [materia_prima for materia_prima, _ in validos]
+
+    indice = _indice_stock_bajo()
+    for materia_prima, nuevo_stock in validos:
+        materia_prima.stock = nuevo_stock
+    actualizadas = [materia_prima for materia_prima, _ in validos]
+    if not persistir:
+        # Sin escritura, pero los cálculos derivados del stock deben enterarse.
+        REPOSITORIOS.modificar(DATA_PATH, lambda: True)
+        _actualizar_stock_bajo(indice, actualizadas)
+    else:
+        if persistir_materias_primas(actualizadas) is False:
+            raise OSError("No se pudo guardar el stock de materias primas.")
+        _actualizar_stock_bajo(indice, actualizadas)
+        registrar_movimientos(
+            crear_movimientos(
+                {mp.id: cambios[mp.id] for mp in actualizadas},
+                tipo,
+                referencia=referencia,
+                fecha=fecha,
+            )
+        )
+    return actualizadas
+
+
+def persistir_materias_primas(materias_primas):
+    """Persiste con una sola escritura materias primas cacheadas ya modificadas."""
+    if not materias_primas:
+        return True
+    return REPOSITORIOS.modificar(
+        DATA_PATH,
+        lambda: obtener_almacen().actualizar_varios(
+            DATA_PATH, [mp.to_dict() for mp in materias_primas]
+        ),
+    )
 
-    nuevo_stock = materia_prima_encontrada.stock + cantidad_cambio
-    if nuevo_stock < 0:
-        raise ValueError(
-            f"Stock insuficiente para '{materia_prima_encontrada.nombre}'. Se intenta reducir el stock a {nuevo_stock}, pero solo hay {materia_prima_encontrada.stock}.")
 
-    materias_primas[i].stock = nuevo_stock
-    guardar_materias_primas(materias_primas)
-    return materias_primas[i]
+def _persistir_materia_prima(materia_prima):
+    """Persiste una materia prima de la lista cacheada ya modificada en memoria."""
+    REPOSITORIOS.modificar(
+        DATA_PATH,
+        lambda: obtener_almacen().actualizar(DATA_PATH, materia_prima.to_dict()),
+    )
 
 
 def establecer_stock_materia_prima(id_materia_prima, nuevo_stock_absoluto):
@@ -236,3 +358,22 @@ def establecer_stock_materia_prima(id_materia_prima, nuevo_stock_absoluto):
     # No necesitamos verificar si el stock resultante es negativo aquí,
     # ya que actualizar_stock_materia_prima ya lo hace.
     return actualizar_stock_materia_prima(id_materia_prima, cantidad_cambio)
+
+
+def stock_a_fecha(id_materia_prima, fecha):
+    """
+    Retorna el stock que tenía una materia prima al final de *fecha*
+    (``YYYY-MM-DD`` o ``YYYY-MM-DD HH:MM:SS``).
+    Parte del stock actual y descuenta los movimientos posteriores usando los
+    checkpoints mensuales del libro. Los cambios hechos sin pasar por el libro
+    (por ejemplo un guardado completo) se atribuyen al saldo inicial.
+    Raises:
+        ValueError: Si la materia prima no existe.
+    """
+    materia_prima = obtener_materia_prima_por_id(id_materia_prima)
+    if not materia_prima:
+        raise ValueError(f"Materia prima con ID '{id_materia_prima}' no encontrada.")
+    if isinstance(fecha, str) and len(fecha.strip()) == 10:
+        fecha = f"{fecha.strip()} 23:59:59"
+    posteriores = neto_movimientos(id_materia_prima) - neto_movimientos(id_materia_prima, hasta=fecha)
+    return materia_prima.stock - posteriores
@@ -0,0 +1,103 @@
+"""Libro de movimientos de inventario.
+
+Cada cambio de stock hecho a través de los controladores (ventas, compras,
+ajustes manuales y reversiones) se anexa aquí sin modificar los anteriores.
+El stock actual sigue materializado en ``MateriaPrima.stock``; el libro
+permite reconstruir el stock a una fecha y el historial de cada materia
+prima. Los movimientos se guardan particionados por mes y
+``SALDOS_MOVIMIENTOS`` mantiene el neto mensual por materia prima como
+*checkpoints*, de modo que una consulta solo lee el mes que la contiene.
+"""
+
+import logging
+
+import config
+from models.movimiento_stock import MovimientoStock
+from utils.cache_utils import REPOSITORIOS
+from utils.rollup_utils import SaldosMensuales
+from utils.storage import normalizar_fecha, obtener_almacen
+
+DATA_PATH = config.get_data_path("movimientos_stock.json")
+
+logger = logging.getLogger(__name__)
+
+# Neto mensual de los movimientos de cada materia prima.
+SALDOS_MOVIMIENTOS = SaldosMensuales(lambda m: m.materia_prima_id, lambda m: m.cantidad)
+
+
+def cargar_movimientos():
+    """Carga el libro completo de movimientos (compartido por el cache)."""
+    return REPOSITORIOS.obtener(DATA_PATH, _leer_movimientos)
+
+
+def _leer_movimientos():
+    data = obtener_almacen().cargar(DATA_PATH)
+    return [MovimientoStock.from_dict(m) for m in data]
+
+
+def crear_movimientos(cambios, tipo, referencia=None, fecha=None):
+    """
+    Crea los movimientos de *tipo* para ``{id_materia_prima: cantidad_cambio}``.
+    Los cambios nulos se omiten.
+    """
+    fecha = normalizar_fecha(fecha)
+    return [
+        MovimientoStock(id_materia_prima, tipo, cantidad, fecha=fecha, referencia=referencia)
+        for id_materia_prima, cantidad in cambios.items()
+        if cantidad
+    ]
+
+
+def registrar_movimientos(movimientos):
+    """Anexa *movimientos* al libro con una sola escritura."""
+    if not movimientos:
+        return True
+    movimientos = list(movimientos)
+    registrados = SALDOS_MOVIMIENTOS.aplicar(
+        DATA_PATH,
+        lambda: REPOSITORIOS.agregar_varios(
+            DATA_PATH,
+            lambda: obtener_almacen().agregar_varios(DATA_PATH, [m.to_dict() for m in movimientos]),
+            movimientos,
+        ),
+        movimientos,
+    )
+    if registrados is False:
+        logger.error(f"No se pudieron registrar {len(movimientos)} movimientos de stock.")
+    return registrados
+
+
+def movimientos_materia_prima(id_materia_prima, inicio=None, fin=None):
+    """
+    Retorna los movimientos de una materia prima, ordenados por fecha.
+    Con *inicio* o *fin* solo se leen los meses del rango, aunque el libro
+    completo esté en el cache: recorrerlo entero costaría más que leer el mes.
+    """
+    almacen = obtener_almacen()
+    if inicio is not None or fin is not None:
+        data = [
+            m
+            for m in almacen.rango(DATA_PATH, inicio, fin)
+            if m.get("materia_prima_id") == id_materia_prima
+        ]
+        movimientos = [MovimientoStock.from_dict(m) for m in data]
+    elif REPOSITORIOS.en_cache(DATA_PATH):
+        movimientos = [m for m in cargar_movimientos() if m.materia_prima_id == id_materia_prima]
+    else:
+        movimientos = [MovimientoStock.from_dict(m) for m in almacen.buscar(DATA_PATH, id_materia_prima)]
+    return sorted(movimientos, key=lambda m: normalizar_fecha(m.fecha) or "")
+
+
+def neto_movimientos(id_materia_prima, hasta=None):
+    """
+    Suma los movimientos de una materia prima con fecha hasta *hasta* inclusive
+    (todos si es ``None``). Los meses completos salen de los checkpoints y solo
+    se leen los movimientos del mes de *hasta*.
+    """
+    if hasta is None:
+        return SALDOS_MOVIMIENTOS.neto_hasta(DATA_PATH, cargar_movimientos, id_materia_prima)
+    hasta = normalizar_fecha(hasta)
+    mes = hasta[:7]
+    previo = SALDOS_MOVIMIENTOS.neto_hasta(DATA_PATH, cargar_movimientos, id_materia_prima, mes)
+    del_mes = movimientos_materia_prima(id_materia_prima, f"{mes}-01 00:00:00", hasta)
+    return previo + sum(m.cantidad for m in del_mes)
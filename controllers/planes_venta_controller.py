@@ -2,7 +2,7 @@ import logging
 from datetime import datetime
 
 import config
-from utils.json_utils import read_json, write_json
+from utils.storage import obtener_almacen
 
 logger = logging.getLogger(__name__)
 
@@ -11,7 +11,7 @@ DATA_PATH = config.get_data_path("planes_venta.json")
 
 def cargar_planes_venta():
     """Carga la lista de planes de venta desde el archivo JSON."""
-    planes = read_json(DATA_PATH)
+    planes = obtener_almacen().cargar(DATA_PATH)
     if not isinstance(planes, list):
         logger.warning("Formato inválido en planes_venta.json, se devuelve lista vacía.")
         return []
@@ -25,33 +25,19 @@ def guardar_plan_venta(nombre, items):
     if not items:
         raise ValueError("El plan debe contener al menos un producto.")
 
-    planes = cargar_planes_venta()
+    almacen = obtener_almacen()
     timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    plan_existente = next((p for p in planes if p.get("nombre") == nombre), None)
-
-    if plan_existente:
-        plan_existente["items"] = items
-        plan_existente["actualizado"] = timestamp
-    else:
-        planes.append({
-            "nombre": nombre,
-            "items": items,
-            "actualizado": timestamp,
-        })
-
-    if not write_json(DATA_PATH, planes):
+    plan = almacen.obtener(DATA_PATH, nombre) or {"nombre": nombre}
+    plan["items"] = items
+    plan["actualizado"] = timestamp
+
+    if not almacen.actualizar(DATA_PATH, plan):
         raise ValueError("No se pudo guardar el plan de venta.")
     return True
 
 
 def eliminar_plan_venta(nombre):
     """Elimina un plan de venta por su nombre."""
-    planes = cargar_planes_venta()
-    planes_filtrados = [p for p in planes if p.get("nombre") != nombre]
-
-    if len(planes) == len(planes_filtrados):
+    if not obtener_almacen().eliminar(DATA_PATH, nombre):
         raise ValueError("No se encontró el plan de venta a eliminar.")
-
-    if not write_json(DATA_PATH, planes_filtrados):
-        raise ValueError("No se pudo eliminar el plan de venta.")
     return True
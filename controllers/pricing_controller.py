@@ -2,8 +2,7 @@ from __future__ import annotations
 
 from dataclasses import dataclass
 
-from controllers.productos_controller import calcular_costo_produccion_producto
-from controllers.recetas_controller import obtener_receta_por_producto_id
+from controllers.costos_controller import costo_unitario_producto
 
 
 @dataclass(frozen=True)
@@ -24,13 +23,8 @@ class PlanVentaItem:
 
 
 def calcular_costo_variable_unitario(producto_id: str) -> float:
-    """Calcula el costo variable unitario (CV) usando receta y materias primas."""
-    receta = obtener_receta_por_producto_id(producto_id)
-    rendimiento = (
-        receta.rendimiento if receta and receta.rendimiento and receta.rendimiento > 0 else 1
-    )
-    costo_produccion_total = calcular_costo_produccion_producto(producto_id)
-    return costo_produccion_total / rendimiento
+    """Calcula el costo variable unitario (CV) usando la tabla de costos de recetas."""
+    return costo_unitario_producto(producto_id)
 
 
 def calcular_costo_fijo_unitario(costos_fijos_periodo: float, unidades_previstas: float) -> float:
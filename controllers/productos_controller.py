@@ -1,5 +1,6 @@
 import logging
-from utils.json_utils import read_json, write_json
+from utils.cache_utils import REPOSITORIOS
+from utils.storage import obtener_almacen
 from models.producto import Producto
 import config
 
@@ -13,9 +14,15 @@ def cargar_productos():
     """
     Carga la lista de productos desde el archivo JSON.
     Si el archivo no existe, devuelve una lista vacía.
+    La lista se comparte a través del cache de repositorios mientras el
+    almacén no cambie.
     """
+    return REPOSITORIOS.obtener(DATA_PATH, _leer_productos)
+
+
+def _leer_productos():
     logger.debug(f"Intentando cargar productos desde: {DATA_PATH}")
-    data = read_json(DATA_PATH)
+    data = obtener_almacen().cargar(DATA_PATH)
     logger.debug(f"Productos cargados (raw data): {data}")
     return [Producto.from_dict(p) for p in data]
 
@@ -27,7 +34,11 @@ def guardar_productos(productos):
     logger.debug(
         f"Intentando guardar {len(productos)} productos en: {DATA_PATH}"
     )
-    write_json(DATA_PATH, [p.to_dict() for p in productos])
+    REPOSITORIOS.reemplazar(
+        DATA_PATH,
+        lambda: obtener_almacen().guardar(DATA_PATH, [p.to_dict() for p in productos]),
+        list(productos),
+    )
     logger.debug("Productos guardados con éxito.")
 
 
@@ -55,14 +66,16 @@ def agregar_producto(nombre, precio_unitario, disponible_venta=True):
     if not es_valido:
         raise ValueError(mensaje_error)  # Lanza un error si la validación falla
 
-    productos = cargar_productos()
     nuevo_producto = Producto(
         nombre.strip(),
         precio_unitario,
         disponible_venta=disponible_venta,
     )  # Elimina espacios en blanco del nombre
-    productos.append(nuevo_producto)
-    guardar_productos(productos)
+    REPOSITORIOS.agregar(
+        DATA_PATH,
+        lambda: obtener_almacen().agregar(DATA_PATH, nuevo_producto.to_dict()),
+        nuevo_producto,
+    )
     return nuevo_producto
 
 
@@ -70,7 +83,7 @@ def listar_productos():
     """
     Retorna la lista completa de productos.
     """
-    return cargar_productos()
+    return list(cargar_productos())
 
 
 def obtener_producto_por_id(id_producto):
@@ -78,11 +91,7 @@ def obtener_producto_por_id(id_producto):
     Busca y retorna un producto por su ID.
     Retorna None si el producto no es encontrado.
     """
-    productos = cargar_productos()
-    for producto in productos:
-        if producto.id == id_producto:
-            return producto
-    return None
+    return REPOSITORIOS.buscar(DATA_PATH, _leer_productos, id_producto)
 
 
 def editar_producto(id_producto, nuevo_nombre, nuevo_precio_unitario, disponible_venta=True):
@@ -95,14 +104,16 @@ def editar_producto(id_producto, nuevo_nombre, nuevo_precio_unitario, disponible
     if not es_valido:
         raise ValueError(mensaje_error)
 
-    productos = cargar_productos()
-    for i, producto in enumerate(productos):
-        if producto.id == id_producto:
-            productos[i].nombre = nuevo_nombre.strip()
-            productos[i].precio_unitario = nuevo_precio_unitario
-            productos[i].disponible_venta = disponible_venta
-            guardar_productos(productos)
-            return productos[i]  # Retorna el producto editado
+    producto = obtener_producto_por_id(id_producto)
+    if producto:
+        producto.nombre = nuevo_nombre.strip()
+        producto.precio_unitario = nuevo_precio_unitario
+        producto.disponible_venta = disponible_venta
+        REPOSITORIOS.modificar(
+            DATA_PATH,
+            lambda: obtener_almacen().actualizar(DATA_PATH, producto.to_dict()),
+        )
+        return producto  # Retorna el producto editado
     raise ValueError(f"Producto con ID '{id_producto}' no encontrado para edición.")
 
 
@@ -111,15 +122,13 @@ def eliminar_producto(id_producto):
     Elimina un producto de la lista por su ID.
     Lanza un ValueError si el producto no se encuentra.
     """
-    productos = cargar_productos()
-    productos_original_count = len(productos)
-    # Filtra la lista para crear una nueva sin el producto a eliminar
-    productos = [p for p in productos if p.id != id_producto]
-
-    if len(productos) == productos_original_count:
+    eliminado = REPOSITORIOS.quitar(
+        DATA_PATH,
+        lambda: obtener_almacen().eliminar(DATA_PATH, id_producto),
+        id_producto,
+    )
+    if not eliminado:
         raise ValueError(f"Producto con ID '{id_producto}' no encontrado para eliminación.")
-
-    guardar_productos(productos)
     return True  # Retorna True si la eliminación fue exitosa
 
 
@@ -146,31 +155,14 @@ def actualizar_disponibilidad_productos(ids_productos, disponible_venta):
 
 def calcular_costo_produccion_producto(producto_id):
     """
-    Calcula el costo total de las materias primas necesarias para producir una unidad de un producto.
+    Calcula el costo total de las materias primas necesarias para producir un lote
+    de la receta del producto, leyéndolo de la tabla de costos.
     Retorna el costo de producción o 0 si no hay receta o materias primas.
     """
-    # Importaciones locales para evitar el ciclo de dependencia
-    from controllers.recetas_controller import obtener_receta_por_producto_id
-    from controllers.materia_prima_controller import obtener_materia_prima_por_id
-
-    receta = obtener_receta_por_producto_id(producto_id)
-    if not receta or not receta.ingredientes:
-        return 0  # No hay receta o no tiene ingredientes, costo de producción es 0
+    # Importación local para evitar el ciclo de dependencia
+    from controllers.costos_controller import costo_lote_producto
 
-    costo_total = 0
-    for ingrediente in receta.ingredientes:
-        mp_id = ingrediente["materia_prima_id"]
-        cantidad_necesaria = ingrediente["cantidad_necesaria"]
-
-        materia_prima = obtener_materia_prima_por_id(mp_id)
-        if materia_prima:
-            costo_total += (cantidad_necesaria * materia_prima.costo_unitario)
-        else:
-            logger.error(
-                f"Advertencia: Materia prima con ID '{mp_id}' no encontrada para la receta del producto '{receta.nombre_producto}'. No se incluirá en el costo."
-            )
-            # Podrías lanzar un error aquí si quieres una validación más estricta
-    return costo_total
+    return costo_lote_producto(producto_id)
 
 
 def obtener_rentabilidad_productos():
@@ -178,19 +170,17 @@ def obtener_rentabilidad_productos():
     Calcula la rentabilidad (ganancia y margen de beneficio) para cada producto.
     Retorna una lista de diccionarios con la información de rentabilidad.
     """
+    from controllers.costos_controller import tabla_costos
+
     productos = listar_productos()
+    costos = tabla_costos()
     rentabilidad_data = []
 
     for p in productos:
-        receta = obtener_receta_por_producto_id(p.id)
-        rendimiento = (
-            receta.rendimiento if receta and receta.rendimiento and receta.rendimiento > 0 else 1
-        )
-
         precio_venta_unitario = p.precio_unitario
 
-        costo_produccion_total = calcular_costo_produccion_producto(p.id)
-        costo_produccion_unitario = costo_produccion_total / rendimiento
+        costo = costos.get(p.id)
+        costo_produccion_unitario = costo.costo_unitario if costo else 0
 
         ganancia = precio_venta_unitario - costo_produccion_unitario
         margen_beneficio = (
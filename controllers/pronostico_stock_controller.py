@@ -0,0 +1,156 @@
+"""Pronóstico de quiebres de stock a partir de las ventas y las recetas.
+
+El consumo diario de cada materia prima se deriva de los tickets de los
+últimos ``DIAS_HISTORIAL`` días: las unidades vendidas por producto (un
+vector) se multiplican por la matriz ``productos x materias primas`` de
+consumo por unidad (``recetas_controller.matriz_consumo``), de modo que
+todas las materias primas se calculan con una sola operación. Con
+ese ritmo y el stock actual se proyecta la fecha en que cada materia prima
+llega al stock mínimo y a cero, y la cantidad a reponer para cubrir
+``DIAS_COBERTURA`` días sin bajar del mínimo.
+
+Solo se leen las particiones de tickets del período, y sin construir los
+modelos, por lo que el tiempo no depende de cuántos años de historial haya
+guardados. Para revisarlo cada mañana::
+
+    python -m controllers.pronostico_stock_controller [dias_historial] [dias_cobertura]
+"""
+
+import datetime
+import sys
+from dataclasses import dataclass
+
+import numpy as np
+
+from controllers import materia_prima_controller, recetas_controller, tickets_controller
+from utils.fechas import parse_fecha
+
+# Días de ventas que se usan para estimar el consumo diario.
+DIAS_HISTORIAL = 60
+# Días de consumo que debe cubrir la reposición sugerida.
+DIAS_COBERTURA = 14
+
+
+@dataclass(frozen=True)
+class PronosticoStock:
+    materia_prima_id: str
+    nombre: str
+    stock: float
+    stock_minimo: float
+    consumo_diario: float
+    dias_hasta_minimo: float  # inf si no se consume
+    fecha_minimo: str  # AAAA-MM-DD o None
+    dias_hasta_quiebre: float
+    fecha_quiebre: str
+    cantidad_sugerida: float
+
+
+def _a_fecha(valor):
+    if valor is None:
+        return datetime.date.today()
+    if isinstance(valor, datetime.datetime):
+        return valor.date()
+    if isinstance(valor, datetime.date):
+        return valor
+    return parse_fecha(str(valor)[:10]).date()
+
+
+def consumo_diario_materias(dias_historial=DIAS_HISTORIAL, hoy=None):
+    """Retorna ``materia_prima_id -> consumo diario promedio`` según las ventas.
+
+    El promedio se toma desde la primera venta del período (o desde el
+    inicio del período si hay ventas anteriores), para no subestimar el
+    ritmo de un negocio con poco historial.
+    """
+    ids, consumo = _consumo_diario(dias_historial, _a_fecha(hoy))
+    return dict(zip(ids, consumo.tolist()))
+
+
+def _consumo_diario(dias_historial, hoy):
+    inicio = hoy - datetime.timedelta(days=dias_historial - 1)
+    items = tickets_controller.items_vendidos_periodo(
+        f"{inicio.isoformat()} 00:00:00", f"{hoy.isoformat()} 23:59:59"
+    )
+    if not items:
+        return [], np.zeros(0)
+    fechas, producto_ids, cantidades = zip(*items)
+    productos = {}
+    filas = [productos.setdefault(producto_id, len(productos)) for producto_id in producto_ids]
+
+    # Unidades vendidas por producto en el período.
+    unidades = np.bincount(
+        np.asarray(filas), weights=np.asarray(cantidades, dtype=float), minlength=len(productos)
+    )
+
+    ids, consumos = recetas_controller.matriz_consumo(list(productos))
+
+    primer_dia = np.datetime64(min(fechas)[:10], "D")
+    inicio_efectivo = max(np.datetime64(inicio, "D"), primer_dia)
+    dias_observados = int((np.datetime64(hoy, "D") - inicio_efectivo).astype(int)) + 1
+    return ids, (unidades @ consumos) / max(dias_observados, 1)
+
+
+def pronosticar_quiebres(dias_historial=DIAS_HISTORIAL, dias_cobertura=DIAS_COBERTURA, hoy=None):
+    """
+    Proyecta el quiebre de stock de todas las materias primas.
+    Args:
+        dias_historial (int): Días de ventas usados para el consumo diario.
+        dias_cobertura (int): Días que debe cubrir la reposición sugerida.
+        hoy (date | str, opcional): Fecha de referencia; por defecto la actual.
+    Returns:
+        list[PronosticoStock]: De la más urgente a la menos urgente; las
+        materias primas sin consumo quedan al final con días ``inf``.
+    """
+    hoy = _a_fecha(hoy)
+    materias = materia_prima_controller.cargar_materias_primas()
+    if not materias:
+        return []
+    ids, consumo_por_id = _consumo_diario(dias_historial, hoy)
+    columna = {mp_id: i for i, mp_id in enumerate(ids)}
+
+    stock = np.array([float(mp.stock or 0) for mp in materias])
+    minimo = np.array([float(mp.stock_minimo or 0) for mp in materias])
+    consumo = np.array(
+        [consumo_por_id[columna[mp.id]] if mp.id in columna else 0.0 for mp in materias]
+    )
+    with np.errstate(divide="ignore", invalid="ignore"):
+        hasta_minimo = np.where(consumo > 0, np.maximum(stock - minimo, 0) / consumo, np.inf)
+        hasta_quiebre = np.where(consumo > 0, np.maximum(stock, 0) / consumo, np.inf)
+    sugerida = np.maximum(consumo * dias_cobertura + minimo - stock, 0)
+
+    # Con consumos ínfimos los días superan el calendario: no hay fecha que mostrar.
+    dias_maximos = (datetime.date.max - hoy).days
+
+    def fecha(dias):
+        if not np.isfinite(dias) or dias > dias_maximos:
+            return None
+        return (hoy + datetime.timedelta(days=int(dias))).isoformat()
+
+    orden = np.lexsort((hasta_quiebre, hasta_minimo))
+    return [
+        PronosticoStock(
+            materia_prima_id=materias[i].id,
+            nombre=materias[i].nombre,
+            stock=float(stock[i]),
+            stock_minimo=float(minimo[i]),
+            consumo_diario=round(float(consumo[i]), 4),
+            dias_hasta_minimo=float(hasta_minimo[i]),
+            fecha_minimo=fecha(hasta_minimo[i]),
+            dias_hasta_quiebre=float(hasta_quiebre[i]),
+            fecha_quiebre=fecha(hasta_quiebre[i]),
+            cantidad_sugerida=round(float(sugerida[i]), 2),
+        )
+        for i in orden
+    ]
+
+
+if __name__ == "__main__":
+    argumentos = [int(a) for a in sys.argv[1:3]]
+    for p in pronosticar_quiebres(*argumentos):
+        if p.consumo_diario <= 0:
+            continue
+        print(
+            f"{p.nombre}: stock {p.stock:g}, consumo {p.consumo_diario:g}/día, "
+            f"mínimo el {p.fecha_minimo}, quiebre el {p.fecha_quiebre}, "
+            f"reponer {p.cantidad_sugerida:g}"
+        )
@@ -1,5 +1,6 @@
 import logging
-from utils.json_utils import read_json, write_json
+from utils.cache_utils import REPOSITORIOS
+from utils.storage import obtener_almacen
 from models.proveedor import Proveedor
 import config
 
@@ -9,12 +10,20 @@ logger = logging.getLogger(__name__)
 
 
 def cargar_proveedores():
-    data = read_json(DATA_PATH)
+    return REPOSITORIOS.obtener(DATA_PATH, _leer_proveedores)
+
+
+def _leer_proveedores():
+    data = obtener_almacen().cargar(DATA_PATH)
     return [Proveedor.from_dict(p) for p in data]
 
 
 def guardar_proveedores(proveedores):
-    write_json(DATA_PATH, [p.to_dict() for p in proveedores])
+    REPOSITORIOS.reemplazar(
+        DATA_PATH,
+        lambda: obtener_almacen().guardar(DATA_PATH, [p.to_dict() for p in proveedores]),
+        list(proveedores),
+    )
 
 
 def validar_proveedor(nombre, contacto):
@@ -29,44 +38,45 @@ def agregar_proveedor(nombre, contacto=""):
     es_valido, mensaje = validar_proveedor(nombre, contacto)
     if not es_valido:
         raise ValueError(mensaje)
-    proveedores = cargar_proveedores()
     nuevo = Proveedor(nombre, contacto)
-    proveedores.append(nuevo)
-    guardar_proveedores(proveedores)
+    REPOSITORIOS.agregar(
+        DATA_PATH,
+        lambda: obtener_almacen().agregar(DATA_PATH, nuevo.to_dict()),
+        nuevo,
+    )
     return nuevo
 
 
 def listar_proveedores():
-    return cargar_proveedores()
+    return list(cargar_proveedores())
 
 
 def obtener_proveedor_por_id(id_proveedor):
-    proveedores = cargar_proveedores()
-    for p in proveedores:
-        if p.id == id_proveedor:
-            return p
-    return None
+    return REPOSITORIOS.buscar(DATA_PATH, _leer_proveedores, id_proveedor)
 
 
 def editar_proveedor(id_proveedor, nuevo_nombre, nuevo_contacto=""):
     es_valido, mensaje = validar_proveedor(nuevo_nombre, nuevo_contacto)
     if not es_valido:
         raise ValueError(mensaje)
-    proveedores = cargar_proveedores()
-    for i, p in enumerate(proveedores):
-        if p.id == id_proveedor:
-            proveedores[i].nombre = nuevo_nombre.strip()
-            proveedores[i].contacto = nuevo_contacto.strip()
-            guardar_proveedores(proveedores)
-            return proveedores[i]
+    proveedor = obtener_proveedor_por_id(id_proveedor)
+    if proveedor:
+        proveedor.nombre = nuevo_nombre.strip()
+        proveedor.contacto = nuevo_contacto.strip()
+        REPOSITORIOS.modificar(
+            DATA_PATH,
+            lambda: obtener_almacen().actualizar(DATA_PATH, proveedor.to_dict()),
+        )
+        return proveedor
     raise ValueError(f"Proveedor con ID '{id_proveedor}' no encontrado para edición.")
 
 
 def eliminar_proveedor(id_proveedor):
-    proveedores = cargar_proveedores()
-    original = len(proveedores)
-    proveedores = [p for p in proveedores if p.id != id_proveedor]
-    if len(proveedores) == original:
+    eliminado = REPOSITORIOS.quitar(
+        DATA_PATH,
+        lambda: obtener_almacen().eliminar(DATA_PATH, id_proveedor),
+        id_proveedor,
+    )
+    if not eliminado:
         raise ValueError(f"Proveedor con ID '{id_proveedor}' no encontrado para eliminación.")
-    guardar_proveedores(proveedores)
     return True
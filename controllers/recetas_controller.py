@@ -1,6 +1,8 @@
 import os
 import logging
-from utils.json_utils import read_json, write_json
+import threading
+from utils.cache_utils import REPOSITORIOS
+from utils.storage import obtener_almacen
 from models.receta import Receta
 import config
 from controllers.productos_controller import listar_productos, obtener_producto_por_id
@@ -11,14 +13,23 @@ DATA_PATH = config.get_data_path("recetas.json")
 logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
+# Planes de consumo compilados, válidos para una versión de la colección.
+_PLANES = {"clave": None, "planes": {}}
+_PLANES_LOCK = threading.Lock()
+
 
 def cargar_recetas():
     """
     Carga la lista de recetas desde el archivo JSON.
     Si el archivo no existe, devuelve una lista vacía.
+    La lista se comparte a través del cache de repositorios.
     """
+    return REPOSITORIOS.obtener(DATA_PATH, _leer_recetas)
+
+
+def _leer_recetas():
     logger.debug(f"Intentando cargar recetas desde: {DATA_PATH}")
-    data = read_json(DATA_PATH)
+    data = obtener_almacen().cargar(DATA_PATH)
     logger.debug(f"Recetas cargadas (raw data): {data}")
     return [Receta.from_dict(r) for r in data]
 
@@ -28,7 +39,11 @@ def guardar_recetas(recetas):
     Guarda la lista de objetos Receta en el archivo JSON.
     """
     logger.debug(f"Intentando guardar {len(recetas)} recetas en: {DATA_PATH}")
-    write_json(DATA_PATH, [r.to_dict() for r in recetas])
+    REPOSITORIOS.reemplazar(
+        DATA_PATH,
+        lambda: obtener_almacen().guardar(DATA_PATH, [r.to_dict() for r in recetas]),
+        list(recetas),
+    )
     logger.debug("Recetas guardadas con éxito.")
 
 
@@ -94,18 +109,18 @@ def agregar_receta(producto_id, nombre_producto, ingredientes, rendimiento, proc
     if not es_valido:
         raise ValueError(mensaje_error)
 
-    recetas = cargar_recetas()
-
     # Opcional: Verificar si ya existe una receta para este producto (una receta por producto)
-    for r in recetas:
-        if r.producto_id == producto_id:
-            raise ValueError(
-                f"Ya existe una receta para el producto '{nombre_producto}'. Edítela en su lugar."
-            )
+    if obtener_receta_por_producto_id(producto_id):
+        raise ValueError(
+            f"Ya existe una receta para el producto '{nombre_producto}'. Edítela en su lugar."
+        )
 
     nueva_receta = Receta(producto_id, nombre_producto, ingredientes, rendimiento, procedimiento)
-    recetas.append(nueva_receta)
-    guardar_recetas(recetas)
+    REPOSITORIOS.agregar(
+        DATA_PATH,
+        lambda: obtener_almacen().agregar(DATA_PATH, nueva_receta.to_dict()),
+        nueva_receta,
+    )
     return nueva_receta
 
 
@@ -113,7 +128,7 @@ def listar_recetas():
     """
     Retorna la lista completa de recetas.
     """
-    return cargar_recetas()
+    return list(cargar_recetas())
 
 
 def obtener_receta_por_producto_id(producto_id):
@@ -121,11 +136,72 @@ def obtener_receta_por_producto_id(producto_id):
     Busca y retorna una receta por el ID del producto al que pertenece.
     Retorna None si la receta no es encontrada.
     """
-    recetas = cargar_recetas()
-    for r in recetas:
-        if r.producto_id == producto_id:
-            return r
-    return None
+    return REPOSITORIOS.buscar(DATA_PATH, _leer_recetas, producto_id, campo="producto_id")
+
+
+def _compilar_plan(receta):
+    """Convierte la receta en ``((materia_prima_id, cantidad_por_unidad, nombre), ...)``."""
+    if not receta or not receta.ingredientes:
+        return ()
+    unidades_por_lote = getattr(receta, "unidades_por_lote", None)
+    divisor = unidades_por_lote if unidades_por_lote and unidades_por_lote > 0 else 1
+    return tuple(
+        (
+            ing["materia_prima_id"],
+            float(ing["cantidad_necesaria"]) / divisor,
+            ing.get("nombre_materia_prima", ing["materia_prima_id"]),
+        )
+        for ing in receta.ingredientes
+    )
+
+
+def planes_consumo(producto_ids):
+    """
+    Retorna ``producto_id -> plan de consumo`` para los productos indicados.
+    El plan es una tupla ``(materia_prima_id, cantidad_por_unidad, nombre_materia_prima)``
+    por ingrediente (vacía si el producto no tiene receta). Cada plan se compila
+    una sola vez y se reutiliza mientras la colección de recetas no cambie.
+    """
+    cargar_recetas()  # Valida el cache (y recarga si hubo cambios externos).
+    clave = (DATA_PATH, REPOSITORIOS.version(DATA_PATH))
+    with _PLANES_LOCK:
+        if _PLANES["clave"] != clave:
+            _PLANES["clave"] = clave
+            _PLANES["planes"] = {}
+        planes = _PLANES["planes"]
+        resultado = {}
+        for producto_id in producto_ids:
+            plan = planes.get(producto_id)
+            if plan is None:
+                plan = planes[producto_id] = _compilar_plan(
+                    obtener_receta_por_producto_id(producto_id)
+                )
+            resultado[producto_id] = plan
+        return resultado
+
+
+def matriz_consumo(producto_ids):
+    """
+    Retorna ``(materia_prima_ids, matriz)`` con el consumo por unidad de cada producto.
+    La fila ``i`` de la matriz corresponde a ``producto_ids[i]`` y la columna
+    ``j`` a ``materia_prima_ids[j]``; sale de los planes compilados, por lo
+    que sigue las mismas reglas que el registro de ventas. Multiplicar un
+    vector de unidades vendidas por la matriz da el consumo de cada materia prima.
+    """
+    import numpy as np  # Importación local: NumPy demora el arranque de las interfaces
+
+    columnas = {}
+    filas, cols, valores = [], [], []
+    planes = planes_consumo(producto_ids)
+    for fila, producto_id in enumerate(producto_ids):
+        for mp_id, cantidad_por_unidad, _ in planes[producto_id]:
+            filas.append(fila)
+            cols.append(columnas.setdefault(mp_id, len(columnas)))
+            valores.append(cantidad_por_unidad)
+    matriz = np.zeros((len(producto_ids), len(columnas)))
+    # Un ingrediente repetido suma, como al registrar la venta.
+    np.add.at(matriz, (np.asarray(filas, dtype=int), np.asarray(cols, dtype=int)), np.asarray(valores, dtype=float))
+    return list(columnas), matriz
 
 
 def editar_receta(receta_id, nuevos_ingredientes, nuevo_rendimiento, nuevo_procedimiento=None):
@@ -136,14 +212,16 @@ def editar_receta(receta_id, nuevos_ingredientes, nuevo_rendimiento, nuevo_proce
     if not es_valido:
         raise ValueError(mensaje_error)
 
-    recetas = cargar_recetas()
-    for i, r in enumerate(recetas):
-        if r.id == receta_id:
-            recetas[i].ingredientes = nuevos_ingredientes
-            recetas[i].rendimiento = nuevo_rendimiento  # Actualizar el rendimiento
-            recetas[i].procedimiento = nuevo_procedimiento
-            guardar_recetas(recetas)
-            return recetas[i]
+    receta = REPOSITORIOS.buscar(DATA_PATH, _leer_recetas, receta_id)
+    if receta:
+        receta.ingredientes = nuevos_ingredientes
+        receta.rendimiento = nuevo_rendimiento  # Actualizar el rendimiento
+        receta.procedimiento = nuevo_procedimiento
+        REPOSITORIOS.modificar(
+            DATA_PATH,
+            lambda: obtener_almacen().actualizar(DATA_PATH, receta.to_dict()),
+        )
+        return receta
     raise ValueError(f"Receta con ID '{receta_id}' no encontrada para edición.")
 
 
@@ -151,12 +229,11 @@ def eliminar_receta(receta_id):
     """
     Elimina una receta de la lista por su ID.
     """
-    recetas = cargar_recetas()
-    recetas_original_count = len(recetas)
-    recetas = [r for r in recetas if r.id != receta_id]
-
-    if len(recetas) == recetas_original_count:
+    eliminado = REPOSITORIOS.quitar(
+        DATA_PATH,
+        lambda: obtener_almacen().eliminar(DATA_PATH, receta_id),
+        receta_id,
+    )
+    if not eliminado:
         raise ValueError(f"Receta con ID '{receta_id}' no encontrada para eliminación.")
-
-    guardar_recetas(recetas)
     return True
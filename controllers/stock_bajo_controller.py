@@ -0,0 +1,178 @@
+"""Índice de materias primas con stock bajo y alertas de cruce de umbral.
+
+``materia_prima_controller`` informa aquí cada cambio de stock o de stock
+mínimo hecho a través de sus funciones; el índice mantiene el conjunto de
+materias primas con ``stock <= stock_minimo`` y registra un ``CruceStock``
+cada vez que una entra o sale de ese conjunto. La GUI o la app móvil se
+suscriben con ``suscribir_stock_bajo`` para mostrar la alerta en el momento,
+sin consultar periódicamente ni recorrer la colección.
+
+Si la colección cambia por otro camino (un guardado completo, una edición
+externa del archivo) la versión del cache de repositorios ya no coincide y el
+índice se reconstruye comparando contra el estado anterior, de modo que los
+cruces tampoco se pierden en ese caso.
+"""
+
+import logging
+import threading
+from collections import deque
+from dataclasses import dataclass
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+# Cruces recientes que se conservan en memoria.
+MAX_CRUCES = 500
+
+
+@dataclass(frozen=True)
+class CruceStock:
+    materia_prima_id: str
+    nombre: str
+    stock: float
+    stock_minimo: float
+    bajo: bool  # True si quedó en stock bajo, False si se repuso
+    fecha: str
+
+
+def _es_bajo(materia_prima):
+    return materia_prima.stock <= materia_prima.stock_minimo
+
+
+class IndiceStockBajo:
+    """Conjunto de materias primas en stock bajo, actualizado por cada cambio."""
+
+    def __init__(self, max_cruces=MAX_CRUCES):
+        self._lock = threading.RLock()
+        self._suscriptores = []
+        self._cruces = deque(maxlen=max_cruces)
+        self._reiniciar(None)
+
+    def _reiniciar(self, path):
+        self._path = path
+        self._version = None
+        self._bajas = {}  # materia_prima_id -> None, en orden de la colección
+        self._conocidas = set()
+
+    def invalidar(self):
+        with self._lock:
+            self._reiniciar(None)
+
+    def sincronizar(self, path, version, materias):
+        """Reconstruye el índice si *version* no es la última que se aplicó.
+
+        La primera construcción para un *path* no genera cruces; las
+        siguientes comparan contra el estado anterior.
+        """
+        with self._lock:
+            if path == self._path and version == self._version:
+                return
+            if path != self._path:
+                self._reiniciar(path)
+                self._conocidas = {mp.id for mp in materias}
+                self._bajas = dict.fromkeys(mp.id for mp in materias if _es_bajo(mp))
+                self._version = version
+                return
+            cruces = self._aplicar(materias)
+            ids = {mp.id for mp in materias}
+            for id_quitada in self._conocidas - ids:
+                self._bajas.pop(id_quitada, None)
+            self._conocidas = ids
+            self._version = version
+        self._notificar(cruces)
+
+    def aplicar(self, path, materias, version):
+        """Evalúa las *materias* modificadas y notifica los cruces de umbral."""
+        with self._lock:
+            if path != self._path:
+                # Sin índice para esta colección: se construirá en la próxima consulta.
+                return []
+            cruces = self._aplicar(materias)
+            self._version = version
+        self._notificar(cruces)
+        return cruces
+
+    def quitar(self, path, materia_prima_id, version):
+        """Saca del índice una materia prima eliminada (sin generar cruce)."""
+        with self._lock:
+            if path != self._path:
+                return
+            self._bajas.pop(materia_prima_id, None)
+            self._conocidas.discard(materia_prima_id)
+            self._version = version
+
+    def bajas(self):
+        """IDs de las materias primas en stock bajo."""
+        with self._lock:
+            return list(self._bajas)
+
+    def cruces(self):
+        """Cruces de umbral registrados, del más antiguo al más reciente."""
+        with self._lock:
+            return list(self._cruces)
+
+    def suscribir(self, funcion):
+        """Llama a ``funcion(cruce)`` por cada cruce; retorna la función para cancelar."""
+        with self._lock:
+            self._suscriptores.append(funcion)
+
+        def cancelar():
+            with self._lock:
+                if funcion in self._suscriptores:
+                    self._suscriptores.remove(funcion)
+
+        return cancelar
+
+    def _aplicar(self, materias):
+        fecha = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        cruces = []
+        for mp in materias:
+            bajo = _es_bajo(mp)
+            if mp.id not in self._conocidas:
+                # Un alta no es un cruce: solo se registra su estado.
+                self._conocidas.add(mp.id)
+            elif bajo != (mp.id in self._bajas):
+                cruces.append(CruceStock(mp.id, mp.nombre, mp.stock, mp.stock_minimo, bajo, fecha))
+            if bajo:
+                self._bajas.setdefault(mp.id, None)
+            else:
+                self._bajas.pop(mp.id, None)
+        self._cruces.extend(cruces)
+        return cruces
+
+    def _notificar(self, cruces):
+        if not cruces:
+            return
+        with self._lock:
+            suscriptores = list(self._suscriptores)
+        for cruce in cruces:
+            logger.info(
+                "Stock %s: %s (stock %s, mínimo %s)",
+                "bajo" if cruce.bajo else "repuesto",
+                cruce.nombre,
+                cruce.stock,
+                cruce.stock_minimo,
+            )
+            for funcion in suscriptores:
+                try:
+                    funcion(cruce)
+                except Exception:
+                    logger.exception("Error en un suscriptor de alertas de stock")
+
+
+INDICE_STOCK_BAJO = IndiceStockBajo()
+
+
+def suscribir_stock_bajo(funcion):
+    """Registra ``funcion(cruce)`` para cada cruce de umbral de stock.
+
+    La función se llama en el hilo que modificó el stock; una GUI debe
+    reprogramar su actualización en su propio bucle de eventos. Retorna una
+    función sin argumentos que cancela la suscripción.
+    """
+    return INDICE_STOCK_BAJO.suscribir(funcion)
+
+
+def cruces_stock_bajo():
+    """Retorna los cruces de umbral recientes (``CruceStock``)."""
+    return INDICE_STOCK_BAJO.cruces()
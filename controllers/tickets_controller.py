@@ -1,12 +1,26 @@
 import os
+import csv
+import json
 import logging
-import pandas as pd
-from utils.json_utils import read_json, write_json
-from models.ticket import Ticket  # Ajusta según tus imports reales
+from utils.cache_utils import REPOSITORIOS, filtrar_periodo
+from utils.columnas_utils import ColumnasVentas
+from utils.export_utils import programar_exportacion
+from utils.fechas import parse_fecha
+from utils.rollup_utils import RollupPeriodos, formatear_totales
+from utils.storage import obtener_almacen
+from utils.write_behind_utils import encolar_escritura, registrar_persistencia, vaciar_escrituras
+from models.ticket import ResumenTicket, Ticket  # Ajusta según tus imports reales
+from models.venta_detalle import VentaDetalle
 import config
 from collections import defaultdict
-from controllers.materia_prima_controller import listar_materias_primas, guardar_materias_primas
-from controllers.recetas_controller import obtener_receta_por_producto_id
+from controllers.movimientos_stock_controller import crear_movimientos, registrar_movimientos
+from controllers.materia_prima_controller import (
+    ajustar_stock_materias_primas,
+    obtener_materia_prima_por_id,
+    persistir_materias_primas,
+)
+from controllers.recetas_controller import planes_consumo
+from controllers.productos_controller import obtener_producto_por_id
 import datetime
 
 DATA_PATH = config.get_data_path("tickets.json")
@@ -14,185 +28,550 @@ DATA_PATH = config.get_data_path("tickets.json")
 logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
+# Totales de ventas por mes, semana y día, actualizados con cada alta o baja.
+ROLLUP_VENTAS = RollupPeriodos(lambda t: t.total)
+# Columnas mapeadas en memoria de los tickets y sus líneas, para los agregados.
+COLUMNAS_VENTAS = ColumnasVentas()
+
+
+def _aplicar_ventas(escritura, sumar=(), restar=()):
+    """Ejecuta *escritura* actualizando los acumulados y las columnas de ventas."""
+    return ROLLUP_VENTAS.aplicar(
+        DATA_PATH,
+        lambda: COLUMNAS_VENTAS.aplicar(DATA_PATH, escritura, sumar=sumar, restar=restar),
+        sumar=sumar,
+        restar=restar,
+    )
+
 
 def eliminar_ticket(ticket_id):
-    tickets = cargar_tickets()
-    tickets_filtrados = [t for t in tickets if t.id != ticket_id]
-    if len(tickets_filtrados) == len(tickets):
+    vaciar_escrituras()
+    ticket = _obtener_ticket(ticket_id)
+    eliminado = ticket is not None and _aplicar_ventas(
+        lambda: REPOSITORIOS.quitar(
+            DATA_PATH,
+            lambda: obtener_almacen().eliminar(DATA_PATH, ticket_id),
+            ticket_id,
+        ),
+        restar=[ticket],
+    )
+    if not eliminado:
         raise ValueError(f"No se encontró el ticket con ID {ticket_id}.")
-    guardar_tickets(tickets_filtrados)
+    _programar_exportacion()
     return True
 
 def cargar_tickets():
-    data = read_json(DATA_PATH)
+    return REPOSITORIOS.obtener(DATA_PATH, _leer_tickets)
+
+
+def _leer_tickets():
+    # Las ventas diferidas deben estar en disco antes de releer.
+    vaciar_escrituras()
+    data = obtener_almacen().cargar(DATA_PATH)
     return [Ticket.from_dict(t) for t in data]
 
 
-def exportar_tickets_excel(tickets):
-    df = pd.DataFrame([t.to_dict() for t in tickets])
-    excel_path = os.path.join(os.path.dirname(DATA_PATH), "tickets.xlsx")
-    df.to_excel(excel_path, index=False)
+def _obtener_ticket(ticket_id):
+    """Busca un ticket en el cache o, si no está cargado, solo en el almacén."""
+    vaciar_escrituras()
+    if REPOSITORIOS.en_cache(DATA_PATH):
+        return REPOSITORIOS.buscar(DATA_PATH, _leer_tickets, ticket_id)
+    data = obtener_almacen().obtener(DATA_PATH, ticket_id)
+    return Ticket.from_dict(data) if data else None
+
+
+def cargar_tickets_periodo(inicio, fin):
+    """Carga solo los tickets con fecha entre *inicio* y *fin* (inclusive).
+
+    Si los tickets ya están en el cache se filtran en memoria; si no, el
+    almacén lee solo las particiones (o filas indexadas) del rango.
+    """
+    vaciar_escrituras()
+    almacen = obtener_almacen()
+    if REPOSITORIOS.en_cache(DATA_PATH) or not almacen.rango_eficiente(DATA_PATH):
+        return filtrar_periodo(cargar_tickets(), inicio, fin)
+    data = almacen.rango(DATA_PATH, inicio, fin)
+    return [Ticket.from_dict(t) for t in data]
+
+
+def iterar_tickets(inicio=None, fin=None):
+    """Recorre los tickets (o los del período) como registros livianos.
+
+    Para cálculos agregados que no modifican los tickets: si ya están en el
+    cache se recorren esos objetos; si no, el almacén los lee de a uno y cada
+    registro se convierte en un ``ResumenTicket`` sin ``VentaDetalle``, de modo
+    que la memoria no crece con el historial.
+    """
+    vaciar_escrituras()
+    if REPOSITORIOS.en_cache(DATA_PATH):
+        tickets = cargar_tickets()
+        yield from (tickets if inicio is None and fin is None else filtrar_periodo(tickets, inicio, fin))
+        return
+    for data in obtener_almacen().iterar(DATA_PATH, inicio, fin):
+        yield ResumenTicket.from_dict(data)
+
+
+def tabla_ventas(inicio=None, fin=None):
+    """Retorna las columnas de los tickets (o los del período) como ``TablaVentas``.
+
+    Las columnas viven en disco y se abren con ``numpy.memmap``; solo se
+    reconstruyen recorriendo los tickets si la colección cambió sin pasar por
+    este controlador.
+    """
+    vaciar_escrituras()
+    tabla = COLUMNAS_VENTAS.tabla(DATA_PATH, iterar_tickets)
+    return tabla if inicio is None and fin is None else tabla.periodo(inicio, fin)
+
+
+def items_vendidos_periodo(inicio, fin):
+    """Retorna ``(fecha, producto_id, cantidad)`` por ítem vendido en el período.
+
+    Para cálculos que solo necesitan cantidades: si los tickets no están en el
+    cache se leen del almacén sin construir los modelos.
+    """
+    vaciar_escrituras()
+    if REPOSITORIOS.en_cache(DATA_PATH):
+        return [
+            (t.fecha, item.producto_id, item.cantidad)
+            for t in filtrar_periodo(cargar_tickets(), inicio, fin)
+            for item in t.items_venta
+        ]
+    return [
+        (t.get("fecha"), item.get("producto_id"), item.get("cantidad", 0))
+        for t in obtener_almacen().iterar(DATA_PATH, inicio, fin)
+        for item in t.get("items_venta", [])
+    ]
+
+
+def exportar_tickets_excel(tickets=None, en_segundo_plano=True):
+    """Exporta los tickets a ``tickets.xlsx`` junto al archivo de datos.
+
+    Se exportan *tickets* o, si es ``None``, todos los tickets guardados. Por
+    defecto la exportación se programa en segundo plano y las ráfagas de
+    guardados se agrupan en una sola escritura; con ``en_segundo_plano=False``
+    se genera en el momento.
+    """
+    # Al programar solo se toma la ruta: los tickets guardados se recorren de
+    # a uno en el hilo exportador, sin cargar el historial en quien vende.
+    path = DATA_PATH
+    excel_path = os.path.join(os.path.dirname(path), "tickets.xlsx")
+    almacen = obtener_almacen()
+
+    def registros():
+        if tickets is not None:
+            return [t.to_dict() for t in tickets]
+        vaciar_escrituras()
+        return (Ticket.from_dict(t).to_dict() for t in almacen.iterar(path))
+
+    if en_segundo_plano:
+        programar_exportacion("tickets", lambda: _escribir_tickets_excel(registros(), excel_path))
+        return
+    _escribir_tickets_excel(registros(), excel_path)
+
+
+def _escribir_tickets_excel(registros, excel_path):
+    try:
+        import pandas as pd
+
+        df = pd.DataFrame.from_records(registros)
+        df.to_excel(excel_path, index=False)
+    except ImportError as e:
+        logger.warning(f"No se pudo exportar los tickets a Excel por falta de dependencias: {e}")
+    except Exception as e:
+        logger.warning(f"No se pudo exportar los tickets a Excel: {e}")
 
 
 def guardar_tickets(tickets):
-    write_json(DATA_PATH, [t.to_dict() for t in tickets])
-    exportar_tickets_excel(tickets)
+    """Escribe el conjunto completo de tickets en el almacén."""
+    vaciar_escrituras()
+    REPOSITORIOS.reemplazar(
+        DATA_PATH,
+        lambda: obtener_almacen().guardar(DATA_PATH, [t.to_dict() for t in tickets]),
+        list(tickets),
+    )
+    _programar_exportacion()
+
+
+def meses_con_tickets():
+    """Retorna los meses ``AAAA-MM`` con tickets sin leer los tickets."""
+    vaciar_escrituras()
+    return obtener_almacen().meses(DATA_PATH)
+
+
+def compactar_tickets():
+    """Incorpora el journal de tickets a sus particiones mensuales."""
+    vaciar_escrituras()
+    _aplicar_ventas(
+        lambda: REPOSITORIOS.modificar(DATA_PATH, lambda: obtener_almacen().compactar(DATA_PATH)),
+    )
+
+
+def _programar_exportacion():
+    if config.exportacion_excel_automatica():
+        exportar_tickets_excel()
+
+
+def _guardar_ventas(tickets, materias, movimientos, agregar_al_cache=True):
+    """Persiste varias ventas con una escritura por colección.
 
-def registrar_ticket(cliente, items_venta_detalle, forzar=False, fecha=None):
+    Escribe el stock de *materias* (ya descontado en memoria), agrega los
+    *tickets* con una sola línea de journal (o transacción) y anexa sus
+    *movimientos* de stock. Si los tickets ya están en el cache (escritura
+    diferida) *agregar_al_cache* debe ser False.
+    Raises:
+        OSError: Si no se pudo guardar el stock o los tickets.
+    """
+    if persistir_materias_primas(list(materias)) is False:
+        raise OSError("No se pudo guardar el stock de materias primas.")
+
+    def escritura():
+        return obtener_almacen().agregar_varios(DATA_PATH, [t.to_dict() for t in tickets])
+
+    registrados = _aplicar_ventas(
+        (lambda: REPOSITORIOS.agregar_varios(DATA_PATH, escritura, tickets))
+        if agregar_al_cache
+        else (lambda: REPOSITORIOS.modificar(DATA_PATH, escritura)),
+        sumar=tickets,
+    )
+    if registrados is False:
+        raise OSError("No se pudieron guardar los tickets.")
+    registrar_movimientos(movimientos)
+    _programar_exportacion()
+
+
+def _persistir_ventas(ventas):
+    """Persiste un grupo de ventas diferidas ``(ticket, materias_actualizadas, movimientos)``."""
+    materias = {}
+    for _, actualizadas, _ in ventas:
+        for mp in actualizadas:
+            materias[mp.id] = mp
+    _guardar_ventas(
+        [ticket for ticket, _, _ in ventas],
+        materias.values(),
+        [m for _, _, movimientos in ventas for m in movimientos],
+        agregar_al_cache=False,
+    )
+
+
+registrar_persistencia("ventas", _persistir_ventas)
+
+def _requerimientos_materias(items_venta_detalle):
+    """Suma el consumo de materias primas de todo el carrito.
+
+    Los ítems de un mismo producto se agrupan antes de aplicar su plan de
+    consumo. Retorna ``materia_prima_id -> cantidad`` y, para los mensajes de
+    error, ``materia_prima_id -> (nombre_materia_prima, nombre_producto)``.
+    """
+    unidades = defaultdict(float)
+    nombres = {}
+    for item in items_venta_detalle:
+        unidades[item.producto_id] += item.cantidad
+        nombres.setdefault(item.producto_id, item.nombre_producto)
+    requeridos = defaultdict(float)
+    origen = {}
+    for producto_id, plan in planes_consumo(unidades).items():
+        for mp_id, cantidad_por_unidad, nombre_materia_prima in plan:
+            requeridos[mp_id] += unidades[producto_id] * cantidad_por_unidad
+            origen.setdefault(mp_id, (nombre_materia_prima, nombres[producto_id]))
+    return requeridos, origen
+
+def _validar_venta(cliente, items_venta_detalle, forzar=False, disponibles=None):
+    """Valida una venta y retorna su consumo ``materia_prima_id -> cantidad``.
+
+    En un lote, *disponibles* lleva el stock que dejan las ventas anteriores
+    del mismo lote; si la venta es válida se descuenta de ahí.
+    """
+    if not cliente or len(cliente.strip()) == 0:
+        raise ValueError("El nombre del cliente no puede estar vacío.")
+    if not items_venta_detalle:
+        raise ValueError("El ticket debe contener al menos un producto.")
+
+    # --- Verificación de stock sobre los requerimientos agregados del carrito ---
+    requeridos, origen = _requerimientos_materias(items_venta_detalle)
+    restantes = {}
+    for mp_id, cantidad_a_deducir in requeridos.items():
+        materia_prima = obtener_materia_prima_por_id(mp_id)
+        if not materia_prima:
+            nombre_materia_prima, nombre_producto = origen[mp_id]
+            raise ValueError(
+                f"Materia prima '{nombre_materia_prima}' no encontrada para la receta del producto '{nombre_producto}'."
+            )
+        stock = materia_prima.stock if disponibles is None else disponibles.get(mp_id, materia_prima.stock)
+        if stock < cantidad_a_deducir and not forzar:
+            raise ValueError(
+                f"Stock insuficiente de '{materia_prima.nombre}'. Se requieren {cantidad_a_deducir:.2f} {materia_prima.unidad_medida}, pero solo hay {stock:.2f}."
+            )
+        restantes[mp_id] = stock - cantidad_a_deducir
+    if disponibles is not None:
+        disponibles.update(restantes)
+    return requeridos
+
+def registrar_ticket(cliente, items_venta_detalle, forzar=False, fecha=None, esperar_confirmacion=False):
     """
     Registra un nuevo ticket de venta con múltiples ítems y deduce el stock de materias primas.
+    Con ``config.escritura_diferida()`` activo el ticket y el stock se actualizan
+    en memoria y se persisten en grupo junto con otras ventas (ver
+    ``utils.write_behind_utils``).
     Args:
         cliente (str): Nombre del cliente.
         items_venta_detalle (list): Lista de objetos VentaDetalle.
         forzar (bool): Si es True, permite stock negativo y solo advierte.
         fecha (str, opcional): Fecha y hora de la venta en formato 'YYYY-MM-DD HH:MM:SS'.
                                Si es None o vacío, se usará la fecha/hora actual.
+        esperar_confirmacion (bool): En escritura diferida, no retornar hasta
+                               que el grupo de la venta esté en disco.
     Raises:
         ValueError: Si el cliente está vacío, no hay ítems en el ticket,
                     o si el stock de alguna materia prima es insuficiente y no se fuerza.
     Returns:
         Ticket: El objeto Ticket recién registrado.
     """
-    if not cliente or len(cliente.strip()) == 0:
-        raise ValueError("El nombre del cliente no puede estar vacío.")
-    if not items_venta_detalle:
-        raise ValueError("El ticket debe contener al menos un producto.")
-
-    # --- Verificación de stock antes de registrar el ticket ---
-    materias_primas = listar_materias_primas()
-    materias_prima_dict = {mp.id: mp for mp in materias_primas}
-
-    for item in items_venta_detalle:
-        receta = obtener_receta_por_producto_id(item.producto_id)
-        if receta and receta.ingredientes:
-            unidades_por_lote = getattr(receta, 'unidades_por_lote', None)
-            for ingrediente in receta.ingredientes:
-                mp_id = ingrediente["materia_prima_id"]
-                cantidad_necesaria = ingrediente["cantidad_necesaria"]
-                if unidades_por_lote and unidades_por_lote > 0:
-                    cantidad_necesaria_por_unidad = cantidad_necesaria / unidades_por_lote
-                else:
-                    cantidad_necesaria_por_unidad = cantidad_necesaria
-                materia_prima = materias_prima_dict.get(mp_id)
-                if not materia_prima:
-                    raise ValueError(
-                        f"Materia prima '{ingrediente.get('nombre_materia_prima', mp_id)}' no encontrada para la receta del producto '{item.nombre_producto}'."
-                    )
-                cantidad_a_deducir = item.cantidad * cantidad_necesaria_por_unidad
-                if materia_prima.stock < cantidad_a_deducir and not forzar:
-                    raise ValueError(
-                        f"Stock insuficiente de '{materia_prima.nombre}'. Se requieren {cantidad_a_deducir:.2f} {materia_prima.unidad_medida}, pero solo hay {materia_prima.stock:.2f}."
-                    )
-
-    # --- Descontar stock y registrar el ticket ---
-    for item in items_venta_detalle:
-        receta = obtener_receta_por_producto_id(item.producto_id)
-        if receta and receta.ingredientes:
-            unidades_por_lote = getattr(receta, 'unidades_por_lote', None)
-            for ingrediente in receta.ingredientes:
-                mp_id = ingrediente["materia_prima_id"]
-                cantidad_necesaria = ingrediente["cantidad_necesaria"]
-                if unidades_por_lote and unidades_por_lote > 0:
-                    cantidad_necesaria_por_unidad = cantidad_necesaria / unidades_por_lote
-                else:
-                    cantidad_necesaria_por_unidad = cantidad_necesaria
-                materia_prima = materias_prima_dict.get(mp_id)
-                cantidad_a_deducir = item.cantidad * cantidad_necesaria_por_unidad
-                materia_prima.stock -= cantidad_a_deducir
-
-    guardar_materias_primas(list(materias_prima_dict.values()))
+    requeridos = _validar_venta(cliente, items_venta_detalle, forzar)
 
     # Si la fecha es None o vacía, usar la fecha/hora actual
     if not fecha or (isinstance(fecha, str) and fecha.strip() == ""):
         fecha = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-
-    # Crear y guardar el ticket
-    tickets = cargar_tickets()
     nuevo_ticket = Ticket(cliente=cliente, items_venta=items_venta_detalle, fecha=fecha)
-    tickets.append(nuevo_ticket)
-    guardar_tickets(tickets)
+
+    # --- Descontar stock (una sola escritura) y registrar el ticket ---
+    consumos = {mp_id: -cantidad for mp_id, cantidad in requeridos.items()}
+    diferida = config.escritura_diferida()
+    actualizadas = ajustar_stock_materias_primas(
+        consumos,
+        forzar=True,
+        persistir=not diferida,
+        tipo="venta",
+        referencia=nuevo_ticket.id,
+        fecha=fecha,
+    )
+
+    # Agregar el ticket sin reescribir el historial
+    if diferida:
+        # Solo en memoria; la cola lo persiste con el resto de su grupo.
+        REPOSITORIOS.agregar(DATA_PATH, lambda: True, nuevo_ticket)
+        movimientos = crear_movimientos(consumos, "venta", referencia=nuevo_ticket.id, fecha=fecha)
+        confirmacion = encolar_escritura("ventas", (nuevo_ticket, actualizadas, movimientos))
+        if esperar_confirmacion:
+            confirmacion.esperar()
+        return nuevo_ticket
+    registrado = _aplicar_ventas(
+        lambda: REPOSITORIOS.agregar(
+            DATA_PATH,
+            lambda: obtener_almacen().agregar(DATA_PATH, nuevo_ticket.to_dict()),
+            nuevo_ticket,
+        ),
+        sumar=[nuevo_ticket],
+    )
+    if not registrado:
+        raise ValueError("No se pudo registrar el ticket.")
+    _programar_exportacion()
     return nuevo_ticket
 
-def listar_tickets():
-    return cargar_tickets()
+def registrar_tickets_lote(ventas, forzar=False):
+    """
+    Registra varios tickets de una vez (por ejemplo ventas cargadas sin conexión).
+    El stock se valida sobre el lote completo, en orden: cada venta se compara
+    con el stock que dejan las anteriores. Las ventas inválidas se informan y
+    se omiten; las válidas se persisten con una sola escritura de materias
+    primas, una de tickets y una de movimientos de stock.
+    Args:
+        ventas (iterable): Diccionarios con ``cliente``, ``items`` (lista de
+            VentaDetalle) y opcionalmente ``fecha``.
+        forzar (bool): Si es True, permite stock negativo.
+    Returns:
+        tuple: ``(tickets_registrados, errores)``, con ``errores`` como lista de
+        ``(indice_venta, mensaje)``.
+    """
+    disponibles = {}
+    aceptadas = []
+    errores = []
+    for indice, venta in enumerate(ventas):
+        try:
+            fecha = venta.get("fecha")
+            if not fecha or (isinstance(fecha, str) and fecha.strip() == ""):
+                fecha = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            else:
+                parse_fecha(fecha)
+            items = venta.get("items") or []
+            requeridos = _validar_venta(venta.get("cliente"), items, forzar, disponibles)
+        except (TypeError, ValueError) as e:
+            errores.append((indice, str(e)))
+            continue
+        aceptadas.append((Ticket(cliente=venta["cliente"], items_venta=items, fecha=fecha), requeridos))
 
-def total_vendido_tickets():
-    tickets = cargar_tickets()
-    return sum(t.total for t in tickets)
+    if not aceptadas:
+        return [], errores
+    consumo_total = defaultdict(float)
+    movimientos = []
+    for ticket, requeridos in aceptadas:
+        consumos = {mp_id: -cantidad for mp_id, cantidad in requeridos.items()}
+        for mp_id, cantidad in consumos.items():
+            consumo_total[mp_id] += cantidad
+        movimientos.extend(crear_movimientos(consumos, "venta", referencia=ticket.id, fecha=ticket.fecha))
+    actualizadas = ajustar_stock_materias_primas(consumo_total, forzar=True, persistir=False)
+    tickets = [ticket for ticket, _ in aceptadas]
+    try:
+        _guardar_ventas(tickets, actualizadas, movimientos)
+    except OSError as e:
+        raise ValueError(f"No se pudo registrar el lote de tickets: {e}")
+    logger.info(f"Lote de tickets registrado: {len(tickets)} tickets, {len(errores)} rechazados.")
+    return tickets, errores
 
 
-def _parse_fecha(fecha):
-    if isinstance(fecha, datetime.datetime):
-        return fecha
-    if isinstance(fecha, str):
-        fecha = fecha[:19]
-        try:
-            if len(fecha) == 10:
-                return datetime.datetime.strptime(fecha, "%Y-%m-%d")
-            return datetime.datetime.strptime(fecha, "%Y-%m-%d %H:%M:%S")
-        except ValueError:
-            raise ValueError("Formato de fecha inválido. Use 'YYYY-MM-DD' o 'YYYY-MM-DD HH:MM:SS'.")
-    raise TypeError("La fecha debe ser un string o datetime.")
+def importar_tickets(path, forzar=False):
+    """
+    Importa tickets desde un archivo ``.csv`` o ``.json`` y los registra como un lote.
 
+    CSV: una fila por ítem con las columnas ``ticket``, ``cliente``, ``fecha``,
+    ``producto_id``, ``cantidad`` y opcionalmente ``nombre_producto`` y
+    ``precio_unitario`` (si faltan se toman del producto). Las filas con el
+    mismo valor en ``ticket`` forman un ticket; sin esa columna cada fila es
+    un ticket.
+    JSON: lista de tickets con ``cliente``, ``fecha`` e ``items`` (o
+    ``items_venta``, como los exporta la aplicación).
+    Returns:
+        tuple: ``(tickets_registrados, errores)``, con ``errores`` como lista de
+        ``(fila, mensaje)``: la línea del CSV o la posición (desde 1) en el JSON.
+    Raises:
+        ValueError: Si el formato del archivo no es soportado o no se puede leer.
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".csv":
+        ventas, filas, errores = _leer_ventas_csv(path)
+    elif extension == ".json":
+        ventas, filas, errores = _leer_ventas_json(path)
+    else:
+        raise ValueError("Formato de importación no soportado. Use un archivo .csv o .json.")
+    registrados, rechazos = registrar_tickets_lote(ventas, forzar=forzar)
+    errores.extend((filas[indice], mensaje) for indice, mensaje in rechazos)
+    errores.sort(key=lambda error: error[0])
+    return registrados, errores
 
-def total_vendido_periodo(inicio, fin):
-    inicio_dt = _parse_fecha(inicio)
-    fin_dt = _parse_fecha(fin)
-    total = 0.0
-    for ticket in cargar_tickets():
+
+def _leer_ventas_csv(path):
+    grupos = {}
+    errores = []
+    try:
+        with open(path, newline="", encoding="utf-8-sig") as f:
+            lector = csv.DictReader(f)
+            for numero, fila in enumerate(lector):
+                clave = (fila.get("ticket") or "").strip() or f"#{numero}"
+                venta = grupos.setdefault(
+                    clave,
+                    {"fila": lector.line_num, "cliente": fila.get("cliente"), "fecha": fila.get("fecha"), "items": []},
+                )
+                if venta.get("error"):
+                    continue
+                try:
+                    venta["items"].append(_detalle_importado(fila))
+                except ValueError as e:
+                    venta["error"] = (lector.line_num, str(e))
+    except (OSError, csv.Error, UnicodeDecodeError) as e:
+        raise ValueError(f"No se pudo leer el archivo de tickets: {e}")
+    ventas, filas = [], []
+    for venta in grupos.values():
+        if venta.get("error"):
+            errores.append(venta["error"])
+            continue
+        ventas.append(venta)
+        filas.append(venta["fila"])
+    return ventas, filas, errores
+
+
+def _leer_ventas_json(path):
+    try:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError) as e:
+        raise ValueError(f"No se pudo leer el archivo de tickets: {e}")
+    if not isinstance(data, list):
+        raise ValueError("El archivo de tickets debe contener una lista.")
+    ventas, filas, errores = [], [], []
+    for numero, registro in enumerate(data, start=1):
         try:
-            fecha_ticket = _parse_fecha(ticket.fecha)
-        except Exception:
+            if not isinstance(registro, dict):
+                raise ValueError("Cada ticket debe ser un objeto.")
+            items = registro.get("items", registro.get("items_venta")) or []
+            venta = {
+                "cliente": registro.get("cliente"),
+                "fecha": registro.get("fecha"),
+                "items": [_detalle_importado(item) for item in items],
+            }
+        except (AttributeError, ValueError) as e:
+            errores.append((numero, str(e)))
             continue
-        if inicio_dt <= fecha_ticket <= fin_dt:
-            total += ticket.total
-    return total
+        ventas.append(venta)
+        filas.append(numero)
+    return ventas, filas, errores
+
+
+def _detalle_importado(datos):
+    """Convierte un ítem importado en VentaDetalle, completando nombre y precio del producto."""
+    producto_id = datos.get("producto_id")
+    if isinstance(producto_id, str):
+        producto_id = producto_id.strip()
+    if producto_id in (None, ""):
+        raise ValueError("Falta el producto del ítem.")
+    try:
+        cantidad = float(datos.get("cantidad"))
+    except (TypeError, ValueError):
+        raise ValueError(f"Cantidad inválida: '{datos.get('cantidad')}'.")
+    if cantidad <= 0:
+        raise ValueError("La cantidad debe ser un número positivo.")
+    nombre = (datos.get("nombre_producto") or "").strip()
+    precio = datos.get("precio_unitario")
+    if not nombre or precio in (None, ""):
+        producto = obtener_producto_por_id(producto_id)
+        if producto is None:
+            raise ValueError(f"Producto con ID '{producto_id}' no encontrado.")
+        nombre = nombre or producto.nombre
+        precio = producto.precio_unitario if precio in (None, "") else precio
+    try:
+        precio = float(precio)
+    except (TypeError, ValueError):
+        raise ValueError(f"Precio inválido: '{precio}'.")
+    return VentaDetalle(
+        producto_id, nombre, int(cantidad) if cantidad.is_integer() else cantidad, precio
+    )
+
+def listar_tickets():
+    return list(cargar_tickets())
+
+def total_vendido_tickets():
+    return float(tabla_ventas().ticket_total.sum())
+
+
+def total_vendido_periodo(inicio, fin):
+    return float(tabla_ventas(parse_fecha(inicio), parse_fecha(fin)).ticket_total.sum())
 
 def obtener_ventas_por_mes():
-    tickets = cargar_tickets()
-    ventas_por_mes = defaultdict(float)
-    for t in tickets:
-        if hasattr(t, 'fecha') and t.fecha:
-            if isinstance(t.fecha, str):
-                fecha = datetime.datetime.strptime(t.fecha[:19], "%Y-%m-%d %H:%M:%S")
-            else:
-                fecha = t.fecha
-            key = fecha.strftime("%Y-%m")
-            ventas_por_mes[key] += t.total
-    return dict(ventas_por_mes)
+    """Retorna ``{AAAA-MM: total vendido}`` desde los acumulados por período."""
+    vaciar_escrituras()
+    return ROLLUP_VENTAS.totales(DATA_PATH, iterar_tickets, "mes")
 
 def obtener_ventas_por_semana():
-    tickets = cargar_tickets()
-    ventas_por_semana = defaultdict(float)
-    for t in tickets:
-        if hasattr(t, 'fecha') and t.fecha:
-            if isinstance(t.fecha, str):
-                fecha = datetime.datetime.strptime(t.fecha[:19], "%Y-%m-%d %H:%M:%S")
-            else:
-                fecha = t.fecha
-            year, weeknum, _ = fecha.isocalendar()
-            key = f"{year}-W{weeknum:02d}"
-            ventas_por_semana[key] += t.total
-    return dict(ventas_por_semana)
+    """Retorna ``{AAAA-WNN: total vendido}`` desde los acumulados por período."""
+    vaciar_escrituras()
+    return ROLLUP_VENTAS.totales(DATA_PATH, iterar_tickets, "semana")
 
 
 def obtener_ventas_por_producto():
     """Obtiene el total vendido agrupado por ``producto_id``.
 
-    Recorre todos los tickets y acumula el importe total vendido para cada
-    producto. El resultado es un diccionario donde las claves son los
+    Suma el importe de las líneas de venta por producto sobre las columnas de
+    ventas. El resultado es un diccionario donde las claves son los
     ``producto_id`` y los valores el monto total vendido de ese producto.
 
     Returns:
         dict[int, float]: Diccionario con el total vendido por ``producto_id``.
     """
-    tickets = cargar_tickets()
-    ventas_por_producto = defaultdict(float)
-    for t in tickets:
-        if hasattr(t, 'items_venta') and t.items_venta:
-            for item in t.items_venta:
-                ventas_por_producto[item.producto_id] += item.total
-    return dict(ventas_por_producto)
+    import numpy as np  # Solo se carga al calcular agregados, no al iniciar la aplicación
+
+    tabla = tabla_ventas()
+    cantidad_productos = len(tabla.productos)
+    ventas = np.bincount(tabla.producto, weights=tabla.total, minlength=cantidad_productos)
+    lineas = np.bincount(tabla.producto, minlength=cantidad_productos)
+    return {tabla.productos[i]: float(ventas[i]) for i in np.flatnonzero(lineas)}
 
 def obtener_ventas_por_dia():
     """
@@ -200,19 +579,5 @@ def obtener_ventas_por_dia():
     Retorna una lista de tuplas (YYYY-MM-DD, total_ventas_dia) ordenada,
     con el total formateado como string de moneda.
     """
-    tickets = cargar_tickets()
-    ventas_dia = defaultdict(float)
-    for t in tickets:
-        if hasattr(t, 'fecha') and t.fecha:
-            if isinstance(t.fecha, str):
-                fecha = datetime.datetime.strptime(t.fecha[:19], "%Y-%m-%d %H:%M:%S")
-            else:
-                fecha = t.fecha
-            dia = fecha.strftime("%Y-%m-%d")
-            ventas_dia[dia] += t.total
-    ventas_ordenadas = sorted(ventas_dia.items())
-    formatted = []
-    for dia, total in ventas_ordenadas:
-        total_str = f"{total:,.0f}".replace(",", "X").replace(".", ",").replace("X", ".")
-        formatted.append((dia, f"Gs {total_str}"))
-    return formatted
+    vaciar_escrituras()
+    return formatear_totales(ROLLUP_VENTAS.totales(DATA_PATH, iterar_tickets, "dia"))
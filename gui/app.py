@@ -1,5 +1,6 @@
 import tkinter as tk
-from tkinter import ttk # Importar ttk para widgets estilizados
+from tkinter import messagebox, ttk # Importar ttk para widgets estilizados
+from controllers.stock_bajo_controller import suscribir_stock_bajo
 from gui.productos_view import mostrar_ventana_productos
 from gui.ventas_view import mostrar_ventana_ventas
 from gui.compras_view import mostrar_ventana_compras
@@ -9,6 +10,10 @@ from gui.gastos_adicionales_view import mostrar_ventana_gastos_adicionales
 from gui.gestion_ventas import mostrar_ventana_gestion_ventas
 from gui.gestion_compras import mostrar_ventana_gestion_compras
 from gui.informes_menu import mostrar_informes_menu
+from utils.export_utils import ejecutar_exportaciones_pendientes
+from utils.write_behind_utils import detener_escrituras
+
+
 def iniciar_app():
     root = tk.Tk()
     root.title("Sistema de Ventas - Cafetería")
@@ -82,7 +87,27 @@ def iniciar_app():
     ttk.Button(frame_reports, text="Eliminar Compras", command=mostrar_ventana_gestion_compras).pack(pady=5, fill=tk.X)
     ttk.Button(frame_reports, text="Gestionar Gastos Adicionales", command=mostrar_ventana_gastos_adicionales).pack(pady=5, fill=tk.X)
 
+    def alertar_stock_bajo(cruce):
+        if cruce.bajo:
+            messagebox.showwarning(
+                "Stock bajo",
+                f"{cruce.nombre} quedó en stock bajo (Stock: {cruce.stock}, Min: {cruce.stock_minimo}).",
+            )
+
+    # El aviso llega en el hilo que modificó el stock; se muestra desde el bucle de Tk.
+    cancelar_alertas = suscribir_stock_bajo(lambda cruce: root.after(0, alertar_stock_bajo, cruce))
+
+    def cerrar_app():
+        cancelar_alertas()
+        # Persiste las ventas diferidas antes de exportar y cerrar
+        detener_escrituras()
+        # Completa las exportaciones a Excel que quedaron en segundo plano
+        ejecutar_exportaciones_pendientes()
+        root.destroy()
+
+    root.protocol("WM_DELETE_WINDOW", cerrar_app)
+
     # Botón de Salir
-    ttk.Button(root, text="Salir", command=root.destroy, style="Exit.TButton").pack(pady=(30, 20), fill=tk.X, padx=50)
+    ttk.Button(root, text="Salir", command=cerrar_app, style="Exit.TButton").pack(pady=(30, 20), fill=tk.X, padx=50)
 
     root.mainloop()
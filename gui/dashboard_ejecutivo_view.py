@@ -2,7 +2,7 @@ import tkinter as tk
 from tkinter import ttk
 
 from controllers.dashboard_controller import (
-    calcular_metricas_dashboard_mensual,
+    calcular_metricas_dashboard_anual,
     meses_disponibles_dashboard,
 )
 from controllers.productos_controller import obtener_producto_por_id
@@ -155,13 +155,19 @@ def agregar_tab_dashboard_ejecutivo(notebook: ttk.Notebook) -> None:
                 font=("Helvetica", 10),
             ).pack(anchor="w", pady=(0, 6))
 
+    # Las métricas se calculan por año completo, de una sola pasada, y se
+    # reutilizan al cambiar de mes dentro del mismo año.
+    metricas_por_mes = {}
+
     def _cargar_mes(*_: object) -> None:
         mes = mes_var.get()
         if not mes:
             mensaje_var.set("No hay meses con datos para mostrar.")
             return
 
-        metricas = calcular_metricas_dashboard_mensual(mes)
+        if mes not in metricas_por_mes:
+            metricas_por_mes.update(calcular_metricas_dashboard_anual(int(mes[:4])))
+        metricas = metricas_por_mes[mes]
         periodo_var.set(f"Período: {mes}")
         mensaje_var.set("")
 
@@ -5,6 +5,7 @@ from tkinter import ttk
 from controllers.compras_controller import listar_compras
 from controllers.gastos_adicionales_controller import listar_gastos_adicionales
 from controllers.tickets_controller import listar_tickets
+from utils.fechas import rango_mes
 
 
 def _formatear_moneda(valor: float) -> str:
@@ -15,19 +16,6 @@ def _obtener_periodo_actual() -> str:
     return datetime.now().strftime("%Y-%m")
 
 
-def _parse_fecha(fecha):
-    if isinstance(fecha, datetime):
-        return fecha
-    if isinstance(fecha, str):
-        fecha = fecha[:19]
-        for formato in ("%Y-%m-%d %H:%M:%S", "%Y-%m-%d"):
-            try:
-                return datetime.strptime(fecha, formato)
-            except ValueError:
-                continue
-    return None
-
-
 def agregar_tab_estado_mes(notebook: ttk.Notebook) -> None:
     """Agregar una pestaña con el estado del mes."""
     frame = ttk.Frame(notebook)
@@ -54,9 +42,14 @@ def agregar_tab_estado_mes(notebook: ttk.Notebook) -> None:
     compras_mes = 0
     ventas_por_producto = {}
 
+    desde, hasta = rango_mes(periodo_actual)
+
+    def en_periodo(entidad):
+        segundos = entidad.epoch
+        return segundos is not None and desde <= segundos <= hasta
+
     for ticket in tickets:
-        fecha_ticket = _parse_fecha(ticket.fecha)
-        if not fecha_ticket or fecha_ticket.strftime("%Y-%m") != periodo_actual:
+        if not en_periodo(ticket):
             continue
         tickets_mes += 1
         total_ventas += ticket.total
@@ -66,15 +59,13 @@ def agregar_tab_estado_mes(notebook: ttk.Notebook) -> None:
             )
 
     for compra in compras:
-        fecha_compra = _parse_fecha(compra.fecha)
-        if not fecha_compra or fecha_compra.strftime("%Y-%m") != periodo_actual:
+        if not en_periodo(compra):
             continue
         compras_mes += 1
         total_compras += compra.total
 
     for gasto in gastos:
-        fecha_gasto = _parse_fecha(gasto.fecha)
-        if not fecha_gasto or fecha_gasto.strftime("%Y-%m") != periodo_actual:
+        if not en_periodo(gasto):
             continue
         total_gastos += gasto.monto
 
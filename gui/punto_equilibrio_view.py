@@ -6,18 +6,16 @@ from tkinter import ttk
 from controllers.gastos_adicionales_controller import listar_gastos_adicionales
 from controllers.pricing_controller import calcular_costo_variable_unitario
 from controllers.productos_controller import listar_productos
+from utils.fechas import clave_mes, rango_mes
 
 
 def _obtener_costos_fijos_mes_actual() -> tuple[str, float]:
-    hoy = datetime.now()
-    periodo = hoy.strftime("%Y-%m")
+    periodo = clave_mes(datetime.now())
+    desde, hasta = rango_mes(periodo)
     total = 0.0
     for gasto in listar_gastos_adicionales():
-        try:
-            fecha_gasto = datetime.strptime(gasto.fecha[:19], "%Y-%m-%d %H:%M:%S")
-        except ValueError:
-            continue
-        if fecha_gasto.strftime("%Y-%m") == periodo:
+        segundos = gasto.epoch
+        if segundos is not None and desde <= segundos <= hasta:
             total += gasto.monto
     return periodo, total
 
@@ -8,6 +8,7 @@ from controllers.tickets_controller import registrar_ticket
 from models.venta_detalle import VentaDetalle
 from controllers.recetas_controller import obtener_receta_por_producto_id
 from controllers.materia_prima_controller import obtener_materia_prima_por_id
+from controllers.disponibilidad_controller import ReservaCarrito
 
 def mostrar_ventana_ventas():
     ventana = tk.Toplevel()
@@ -95,27 +96,30 @@ def mostrar_ventana_ventas():
 
     # Lista para almacenar objetos VentaDetalle para el ticket actual
     venta_actual_items = []
+    # Materias primas comprometidas por el carrito y líneas del listado por producto
+    reserva = ReservaCarrito()
+    lineas_productos = {}
 
     # --- Funciones ---
 
     def calcular_disponibilidad_producto(producto_id):
-        receta = obtener_receta_por_producto_id(producto_id)
-        if not receta or not receta.ingredientes:
-            return float('inf')
-        min_unidades = float('inf')
-        for ingrediente in receta.ingredientes:
-            mp_id = ingrediente["materia_prima_id"]
-            cantidad_necesaria = ingrediente["cantidad_necesaria"]
-            materia_prima = obtener_materia_prima_por_id(mp_id)
-            if not materia_prima:
-                return 0
-            if cantidad_necesaria > 0:
-                unidades_posibles = materia_prima.stock / cantidad_necesaria
-                min_unidades = min(min_unidades, unidades_posibles)
-        return int(min_unidades) if min_unidades != float('inf') else float('inf')
+        # Descuenta lo que ya está en el carrito.
+        return reserva.unidades([producto_id])[producto_id]
+
+    def linea_producto(p, disponibilidad):
+        stock_info = ""
+        if disponibilidad == float('inf'):
+            stock_info = "(Stock ilimitado)"
+        elif disponibilidad > 0:
+            stock_info = f"(Stock: {disponibilidad} unidades)"
+        else:
+            stock_info = "(SIN STOCK)"
+        precio_formateado = f"{p.precio_unitario:,.0f}".replace(",", "X").replace(".", ",").replace("X", ".")
+        return f"ID: {p.id[:8]}... - {p.nombre} - Gs {precio_formateado} {stock_info}"
 
     def cargar_productos_disponibles(filtro=""):
         lista_productos.delete(0, tk.END)
+        lineas_productos.clear()
         filtro = filtro.lower()
         productos_filtrados = []
         global productos_disponibles
@@ -126,21 +130,41 @@ def mostrar_ventana_ventas():
         if not productos_filtrados:
             lista_productos.insert(tk.END, "No se encontraron productos.")
         else:
+            disponibilidades = reserva.unidades([p.id for p in productos_filtrados])
             for p in productos_filtrados:
-                disponibilidad = calcular_disponibilidad_producto(p.id)
-                stock_info = ""
-                if disponibilidad == float('inf'):
-                    stock_info = "(Stock ilimitado)"
-                elif disponibilidad > 0:
-                    stock_info = f"(Stock: {disponibilidad} unidades)"
-                else:
-                    stock_info = "(SIN STOCK)"
-                precio_formateado = f"{p.precio_unitario:,.0f}".replace(",", "X").replace(".", ",").replace("X", ".")
-                lista_productos.insert(tk.END, f"ID: {p.id[:8]}... - {p.nombre} - Gs {precio_formateado} {stock_info}")
+                lineas_productos[p.id] = (lista_productos.size(), p)
+                lista_productos.insert(tk.END, linea_producto(p, disponibilidades[p.id]))
         if lista_productos.size() > 0:
             lista_productos.selection_set(0)
             on_producto_seleccionado(None)
 
+    def actualizar_lineas_productos(producto_ids):
+        """Reescribe solo las líneas del listado de los productos indicados.
+
+        Cada línea se ubica por el id de su producto; si el listado ya no
+        coincide con el que armó ``cargar_productos_disponibles`` (o muestra
+        "No se encontraron productos."), se vuelve a cargar completo.
+        """
+        if not lineas_productos:
+            return
+        visibles = [pid for pid in producto_ids if pid in lineas_productos]
+        if not visibles:
+            return
+        if lista_productos.size() != len(lineas_productos) or any(
+            not lista_productos.get(lineas_productos[pid][0]).startswith(f"ID: {pid[:8]}...")
+            for pid in visibles
+        ):
+            cargar_productos_disponibles(entry_buscar.get())
+            return
+        seleccion = lista_productos.curselection()
+        disponibilidades = reserva.unidades(visibles)
+        for pid in visibles:
+            indice, p = lineas_productos[pid]
+            lista_productos.delete(indice)
+            lista_productos.insert(indice, linea_producto(p, disponibilidades[pid]))
+        for indice in seleccion:
+            lista_productos.selection_set(indice)
+
     def on_buscar(event):
         cargar_productos_disponibles(entry_buscar.get())
 
@@ -169,7 +193,9 @@ def mostrar_ventana_ventas():
             for ingrediente in receta.ingredientes:
                 mp = obtener_materia_prima_por_id(ingrediente["materia_prima_id"])
                 if mp:
-                    stock_info_text += f"  - {mp.nombre}: {mp.stock} {mp.unidad_medida} (Necesario por unidad: {ingrediente['cantidad_necesaria']} {mp.unidad_medida})\n"
+                    reservado = reserva.reservado(mp.id)
+                    en_carrito = f", {reservado:g} en el carrito" if reservado else ""
+                    stock_info_text += f"  - {mp.nombre}: {mp.stock} {mp.unidad_medida}{en_carrito} (Necesario por unidad: {ingrediente['cantidad_necesaria']} {mp.unidad_medida})\n"
                 else:
                     stock_info_text += f"  - {ingrediente['nombre_materia_prima']}: Materia prima no encontrada.\n"
             label_stock_disponible.config(text=stock_info_text)
@@ -220,13 +246,14 @@ def mostrar_ventana_ventas():
                 precio_unitario=producto_encontrado.precio_unitario
             )
             venta_actual_items.append(detalle_venta)
+            afectados = reserva.agregar(producto_encontrado.id, cantidad)
             lista_venta.insert(tk.END,
                                f"{detalle_venta.nombre_producto} x {detalle_venta.cantidad} = Gs {detalle_venta.total:,.0f}".replace(
                                    ",", "X").replace(".", ",").replace("X", "."))
             actualizar_total_ticket()
             entry_cantidad.delete(0, tk.END)
             entry_cantidad.focus_set()
-            cargar_productos_disponibles(entry_buscar.get())
+            actualizar_lineas_productos(afectados)
             on_producto_seleccionado(None)
         except Exception as e:
             messagebox.showerror("Error", f"Ocurrió un error al agregar producto al ticket: {e}")
@@ -259,6 +286,7 @@ def mostrar_ventana_ventas():
             messagebox.showinfo("Factura Generada",
                                 f"Factura generada con éxito para {cliente}.\nTotal: Gs {ticket_generado.total:,.0f}\nID Ticket: {ticket_generado.id[:8]}...".replace(",", "X").replace(".", ",").replace("X", "."))
             venta_actual_items.clear()
+            reserva.vaciar()
             lista_venta.delete(0, tk.END)
             label_total.config(text="Total: Gs 0")
             entry_cliente.delete(0, tk.END)
@@ -281,6 +309,7 @@ def mostrar_ventana_ventas():
                         messagebox.showinfo("Factura Generada",
                                             f"Factura generada con éxito para {cliente}.\nTotal: Gs {ticket_generado.total:,.0f}\nID Ticket: {ticket_generado.id[:8]}...".replace(",", "X").replace(".", ",").replace("X", "."))
                         venta_actual_items.clear()
+                        reserva.vaciar()
                         lista_venta.delete(0, tk.END)
                         label_total.config(text="Total: Gs 0")
                         entry_cliente.delete(0, tk.END)
@@ -5,13 +5,16 @@ métricas básicas para validar integración en dispositivos móviles.
 """
 
 from kivy.app import App
+from kivy.clock import Clock
 from kivy.core.window import Window
 from kivy.metrics import dp
 from kivy.uix.boxlayout import BoxLayout
 from kivy.uix.label import Label
 from kivy.uix.scrollview import ScrollView
 
+from controllers.materia_prima_controller import materias_con_stock_bajo
 from controllers.productos_controller import listar_productos
+from controllers.stock_bajo_controller import suscribir_stock_bajo
 from controllers.tickets_controller import listar_tickets
 
 
@@ -32,15 +35,14 @@ class DashboardCard(BoxLayout):
                 valign="middle",
             )
         )
-        self.add_widget(
-            Label(
-                text=valor,
-                font_size="24sp",
-                color=(0.1, 0.4, 0.2, 1),
-                halign="left",
-                valign="middle",
-            )
+        self.valor = Label(
+            text=valor,
+            font_size="24sp",
+            color=(0.1, 0.4, 0.2, 1),
+            halign="left",
+            valign="middle",
         )
+        self.add_widget(self.valor)
 
 
 class CafeMobileApp(App):
@@ -70,11 +72,15 @@ class CafeMobileApp(App):
         productos = listar_productos()
         tickets = listar_tickets()
         total_ventas = sum(ticket.total for ticket in tickets)
+        self.card_stock_bajo = DashboardCard(
+            "Materias primas con stock bajo", str(len(materias_con_stock_bajo()))
+        )
 
         cards = [
             DashboardCard("Productos registrados", str(len(productos))),
             DashboardCard("Tickets emitidos", str(len(tickets))),
             DashboardCard("Ventas acumuladas", f"Gs {total_ventas:,.0f}"),
+            self.card_stock_bajo,
             DashboardCard(
                 "Estado",
                 "Base móvil Kivy lista.\nSiguiente paso: pantallas de Ventas y Stock.",
@@ -87,8 +93,18 @@ class CafeMobileApp(App):
         scroll.add_widget(content)
         root.add_widget(scroll)
 
+        # Las alertas llegan en el hilo que cambió el stock; Kivy actualiza en su reloj.
+        self._cancelar_alertas = suscribir_stock_bajo(
+            lambda cruce: Clock.schedule_once(lambda _dt: self._on_cruce_stock(cruce))
+        )
         return root
 
+    def _on_cruce_stock(self, cruce):
+        self.card_stock_bajo.valor.text = str(len(materias_con_stock_bajo()))
+
+    def on_stop(self):
+        self._cancelar_alertas()
+
 
 if __name__ == "__main__":
     CafeMobileApp().run()
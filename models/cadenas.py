@@ -0,0 +1,14 @@
+"""Cadenas compartidas entre las instancias de los modelos.
+
+Los ids y nombres de productos, materias primas y proveedores se repiten en
+cada línea de ticket, compra o movimiento. ``internar`` hace que todas las
+instancias compartan un único ``str`` por valor en lugar de la copia que deja
+cada registro leído del JSON.
+"""
+
+import sys
+
+
+def internar(valor):
+    """Retorna la copia compartida de *valor* si es un ``str``; si no, *valor*."""
+    return sys.intern(valor) if type(valor) is str else valor
@@ -1,12 +1,17 @@
 import uuid
 from datetime import datetime
 
+from models.cadenas import internar
+from models.fechado import ConFecha
+
+
+class Compra(ConFecha):
+    __slots__ = ("id", "fecha", "proveedor_id", "items_compra", "total")
 
-class Compra:
     def __init__(self, proveedor_id, items_compra=None, id=None, fecha=None):
         self.id = id or str(uuid.uuid4())  # ID único para la compra
         self.fecha = fecha or datetime.now().strftime("%Y-%m-%d %H:%M:%S")  # Fecha y hora de la compra
-        self.proveedor_id = proveedor_id  # ID del proveedor asociado a la compra
+        self.proveedor_id = internar(proveedor_id)  # ID del proveedor asociado a la compra
         self.items_compra = items_compra if items_compra is not None else []  # Lista de objetos CompraDetalle
 
         # Calcula el total de la compra sumando los totales de cada item_compra
@@ -33,10 +38,14 @@ class Compra:
 
         # Deserializa cada item de compra a un objeto CompraDetalle
         items_compra = [CompraDetalle.from_dict(item_data) for item_data in data.get("items_compra", [])]
+        fecha = data.get("fecha")
+        for item in items_compra:
+            if item.fecha_item == fecha:
+                item.fecha_item = fecha  # Una sola cadena para la fecha de la compra y la de sus ítems
 
         return Compra(
             id=data.get("id"),
-            fecha=data.get("fecha"),
+            fecha=fecha,
             proveedor_id=data.get("proveedor_id"),
             items_compra=items_compra
         )
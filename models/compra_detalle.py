@@ -1,10 +1,22 @@
 from datetime import datetime
 
+from models.cadenas import internar
+
 class CompraDetalle:
+    __slots__ = (
+        "fecha_item",
+        "producto_id",
+        "nombre_producto",
+        "cantidad",
+        "costo_unitario",
+        "descripcion_adicional",
+        "total",
+    )
+
     def __init__(self, producto_id, nombre_producto, cantidad, costo_unitario, descripcion_adicional="", fecha_item=None):
         self.fecha_item = fecha_item or datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        self.producto_id = producto_id
-        self.nombre_producto = nombre_producto
+        self.producto_id = internar(producto_id)
+        self.nombre_producto = internar(nombre_producto)
         self.cantidad = cantidad
         self.costo_unitario = costo_unitario
         self.descripcion_adicional = descripcion_adicional # ¡Nuevo atributo!
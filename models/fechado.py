@@ -0,0 +1,36 @@
+"""Fecha interpretada una sola vez por instancia."""
+
+from utils.fechas import epoch, parse_fecha_opcional
+
+_SIN_INTERPRETAR = object()
+
+
+class ConFecha:
+    """Agrega ``fecha_dt`` y ``epoch`` a un modelo con atributo ``fecha`` (texto).
+
+    El ``datetime`` se calcula la primera vez que se pide y se vuelve a
+    calcular solo si ``fecha`` cambió.
+    """
+
+    __slots__ = ("_fecha_interpretada",)
+
+    def _interpretada(self):
+        try:
+            fecha, valor, segundos = self._fecha_interpretada
+        except AttributeError:
+            fecha = _SIN_INTERPRETAR
+        if fecha is not self.fecha:
+            valor = parse_fecha_opcional(self.fecha)
+            segundos = None if valor is None else epoch(valor)
+            self._fecha_interpretada = (self.fecha, valor, segundos)
+        return valor, segundos
+
+    @property
+    def fecha_dt(self):
+        """``datetime`` de ``fecha``, o ``None`` si es inválida."""
+        return self._interpretada()[0]
+
+    @property
+    def epoch(self):
+        """``fecha`` en segundos epoch, o ``None`` si es inválida."""
+        return self._interpretada()[1]
@@ -1,13 +1,18 @@
 import uuid
 from datetime import datetime
 
-class GastoAdicional:
+from models.cadenas import internar
+from models.fechado import ConFecha
+
+class GastoAdicional(ConFecha):
     """
     Representa un gasto adicional o indirecto (ej. fósforos, gas, electricidad).
     """
+    __slots__ = ("id", "nombre", "monto", "fecha", "descripcion")
+
     def __init__(self, nombre: str, monto: float, fecha: str = None, descripcion: str = None, id: str = None):
         self.id = id if id else str(uuid.uuid4())
-        self.nombre = nombre
+        self.nombre = internar(nombre)
         self.monto = monto
         # Si no se proporciona una fecha, usar la fecha y hora actual
         self.fecha = fecha if fecha else datetime.now().strftime("%Y-%m-%d %H:%M:%S")
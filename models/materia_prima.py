@@ -1,10 +1,14 @@
 import uuid
 
+from models.cadenas import internar
+
 class MateriaPrima:
+    __slots__ = ("id", "nombre", "unidad_medida", "costo_unitario", "stock", "stock_minimo")
+
     def __init__(self, nombre, unidad_medida, costo_unitario, stock=0, stock_minimo=0, id=None):
-        self.id = id or str(uuid.uuid4()) # ID único para la materia prima
-        self.nombre = nombre.strip() # Nombre de la materia prima (ej: "Granos de Café", "Leche")
-        self.unidad_medida = unidad_medida.strip() # Unidad de medida (ej: "kg", "litros", "unidades")
+        self.id = internar(id or str(uuid.uuid4())) # ID único para la materia prima
+        self.nombre = internar(nombre.strip()) # Nombre de la materia prima (ej: "Granos de Café", "Leche")
+        self.unidad_medida = internar(unidad_medida.strip()) # Unidad de medida (ej: "kg", "litros", "unidades")
         self.costo_unitario = costo_unitario # Costo por unidad de compra
         self.stock = stock # Cantidad actual en inventario
         self.stock_minimo = stock_minimo # Cantidad mínima deseada en inventario
@@ -0,0 +1,49 @@
+import uuid
+from datetime import datetime
+
+from models.cadenas import internar
+from models.fechado import ConFecha
+
+# Origen de cada cambio de stock registrado en el libro de movimientos.
+TIPOS_MOVIMIENTO = ("venta", "compra", "ajuste", "reversion")
+
+
+class MovimientoStock(ConFecha):
+    """
+    Entrada del libro de movimientos de inventario: un cambio de stock de una
+    materia prima con su origen (venta, compra, ajuste manual o reversión).
+    """
+    __slots__ = ("id", "materia_prima_id", "tipo", "cantidad", "fecha", "referencia")
+
+    def __init__(self, materia_prima_id, tipo, cantidad, fecha=None, referencia=None, id=None):
+        if tipo not in TIPOS_MOVIMIENTO:
+            raise ValueError(f"Tipo de movimiento inválido: '{tipo}'.")
+        self.id = id or str(uuid.uuid4())
+        self.materia_prima_id = internar(materia_prima_id)
+        self.tipo = internar(tipo)
+        self.cantidad = cantidad  # Positiva si entra stock, negativa si sale
+        self.fecha = fecha or datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        self.referencia = referencia  # ID del ticket o la compra que lo originó, si lo hay
+
+    def to_dict(self):
+        """Convierte el movimiento a un diccionario para serialización JSON."""
+        return {
+            "id": self.id,
+            "materia_prima_id": self.materia_prima_id,
+            "tipo": self.tipo,
+            "cantidad": self.cantidad,
+            "fecha": self.fecha,
+            "referencia": self.referencia,
+        }
+
+    @staticmethod
+    def from_dict(data):
+        """Crea un MovimientoStock a partir de un diccionario."""
+        return MovimientoStock(
+            id=data.get("id"),
+            materia_prima_id=data.get("materia_prima_id"),
+            tipo=data.get("tipo"),
+            cantidad=data.get("cantidad", 0),
+            fecha=data.get("fecha"),
+            referencia=data.get("referencia"),
+        )
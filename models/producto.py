@@ -1,9 +1,13 @@
 import uuid
 
+from models.cadenas import internar
+
 class Producto:
+    __slots__ = ("id", "nombre", "precio_unitario", "disponible_venta")
+
     def __init__(self, nombre, precio_unitario, id=None, disponible_venta=True):
-        self.id = id or str(uuid.uuid4())
-        self.nombre = nombre
+        self.id = internar(id or str(uuid.uuid4()))
+        self.nombre = internar(nombre)
         self.precio_unitario = precio_unitario
         self.disponible_venta = disponible_venta
         # El atributo 'stock' ha sido removido de aquí.
@@ -1,12 +1,16 @@
 import uuid
 from datetime import datetime
 
+from models.cadenas import internar
+
 class Receta:
+    __slots__ = ("id", "producto_id", "nombre_producto", "ingredientes", "rendimiento", "procedimiento")
+
     def __init__(self, producto_id, nombre_producto, ingredientes=None, rendimiento=None,
                  procedimiento=None, id=None):
         self.id = id or str(uuid.uuid4())  # ID único para la receta
-        self.producto_id = producto_id  # ID del producto terminado al que pertenece esta receta
-        self.nombre_producto = nombre_producto  # Nombre del producto terminado
+        self.producto_id = internar(producto_id)  # ID del producto terminado al que pertenece esta receta
+        self.nombre_producto = internar(nombre_producto)  # Nombre del producto terminado
         # ingredientes será una lista de diccionarios, ej:
         # [{"materia_prima_id": "uuid1", "nombre_materia_prima": "Granos de Café", "cantidad_necesaria": 20, "unidad_medida": "gramos"}]
         self.ingredientes = ingredientes if ingredientes is not None else []
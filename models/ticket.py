@@ -1,17 +1,62 @@
 import uuid
 from datetime import datetime
+from typing import NamedTuple
 
+from models.cadenas import internar
+from models.fechado import ConFecha
+from utils.fechas import epoch
+
+
+def _total_items(items_data):
+    """Total de los ítems serializados, calculado igual que ``VentaDetalle``."""
+    return round(
+        sum(
+            round((item.get("cantidad") or 0) * (item.get("precio_unitario") or 0), 2)
+            for item in items_data
+        ),
+        2,
+    )
+
+
+def _total_de(data, verificar_total, recalcular):
+    """Total guardado en *data*; si falta, no es numérico o con *verificar_total*, ``recalcular()``."""
+    total = data.get("total")
+    if verificar_total or not isinstance(total, (int, float)) or isinstance(total, bool):
+        return recalcular()
+    return total
+
+
+class Ticket(ConFecha):
+    __slots__ = ("id", "fecha", "cliente", "total", "_items_venta", "_items_pendientes")
 
-class Ticket:
     def __init__(self, cliente, items_venta=None, id=None, fecha=None):
         self.id = id or str(uuid.uuid4())  # ID único para el ticket
         self.fecha = fecha or datetime.now().strftime("%Y-%m-%d %H:%M:%S")  # Fecha y hora del ticket
-        self.cliente = cliente  # Nombre del cliente asociado al ticket
+        self.cliente = internar(cliente)  # Nombre del cliente asociado al ticket
         self.items_venta = items_venta if items_venta is not None else []  # Lista de objetos VentaDetalle
 
         # Calcula el total del ticket sumando los totales de cada item_venta
         self.total = round(sum(item.total for item in self.items_venta), 2)
 
+    @property
+    def items_venta(self):
+        """Lista de ``VentaDetalle``; en un ticket leído se construye al primer acceso."""
+        if self._items_pendientes is not None:
+            from models.venta_detalle import VentaDetalle  # Importación local para evitar circular
+
+            items_venta = [VentaDetalle.from_dict(item_data) for item_data in self._items_pendientes]
+            for item in items_venta:
+                if item.fecha_item == self.fecha:
+                    item.fecha_item = self.fecha  # Una sola cadena para la fecha del ticket y la de sus ítems
+            self._items_venta = items_venta
+            self._items_pendientes = None
+        return self._items_venta
+
+    @items_venta.setter
+    def items_venta(self, items_venta):
+        self._items_venta = items_venta
+        self._items_pendientes = None
+
     def to_dict(self):
         """
         Convierte el objeto Ticket a un diccionario para serialización JSON.
@@ -25,18 +70,79 @@ class Ticket:
         }
 
     @staticmethod
-    def from_dict(data):
+    def from_dict(data, verificar_total=False):
         """
         Crea un objeto Ticket a partir de un diccionario (deserialización JSON).
+
+        Los ``VentaDetalle`` se construyen recién cuando se accede a
+        ``items_venta``, por lo que los listados que solo muestran la cabecera
+        no los crean. Se usa el ``total`` guardado; si falta, o con
+        *verificar_total*, se recalcula desde los ítems serializados.
         """
-        from models.venta_detalle import VentaDetalle  # Importación local para evitar circular
+        ticket = Ticket.__new__(Ticket)
+        ticket.id = data.get("id") or str(uuid.uuid4())
+        ticket.fecha = data.get("fecha") or datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        ticket.cliente = internar(data.get("cliente"))
+        ticket._items_venta = None
+        ticket._items_pendientes = data.get("items_venta") or []
+
+        ticket.total = _total_de(data, verificar_total, lambda: _total_items(ticket._items_pendientes))
+        return ticket
 
-        # Deserializa cada item de venta a un objeto VentaDetalle
-        items_venta = [VentaDetalle.from_dict(item_data) for item_data in data.get("items_venta", [])]
 
-        return Ticket(
-            id=data.get("id"),
-            fecha=data.get("fecha"),
-            cliente=data.get("cliente"),
-            items_venta=items_venta
+class ItemResumen(NamedTuple):
+    """Ítem de venta de solo lectura para cálculos sobre muchos tickets."""
+
+    producto_id: str
+    nombre_producto: str
+    cantidad: float
+    precio_unitario: float
+    total: float
+
+
+class ResumenTicket(NamedTuple):
+    """Ticket de solo lectura, sin los objetos ``VentaDetalle``.
+
+    Expone los mismos atributos que leen los cálculos agregados (``fecha``,
+    ``total``, ``items_venta`` con ``producto_id``, ``cantidad`` y ``total``)
+    y el ``total`` sigue la misma regla que ``Ticket.from_dict``.
+    """
+
+    id: str
+    fecha: str
+    cliente: str
+    total: float
+    items_venta: tuple
+
+    @staticmethod
+    def from_dict(data, verificar_total=False):
+        """Crea el resumen de un ticket serializado.
+
+        Como en ``Ticket.from_dict`` se usa el ``total`` guardado; si falta, o
+        con *verificar_total*, se recalcula desde los ítems.
+        """
+        items = []
+        for item in data.get("items_venta") or []:
+            cantidad = item.get("cantidad") or 0
+            precio_unitario = item.get("precio_unitario") or 0
+            items.append(
+                ItemResumen(
+                    internar(item.get("producto_id")),
+                    internar(item.get("nombre_producto")),
+                    cantidad,
+                    precio_unitario,
+                    round(cantidad * precio_unitario, 2),
+                )
+            )
+        return ResumenTicket(
+            data.get("id"),
+            data.get("fecha"),
+            data.get("cliente"),
+            _total_de(data, verificar_total, lambda: round(sum(item.total for item in items), 2)),
+            tuple(items),
         )
+
+    @property
+    def epoch(self):
+        """``fecha`` en segundos epoch, o ``None`` si es inválida."""
+        return epoch(self.fecha)
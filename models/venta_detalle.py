@@ -1,11 +1,15 @@
 from datetime import datetime
 
+from models.cadenas import internar
+
 class VentaDetalle: # Renombrada de Venta a VentaDetalle
+    __slots__ = ("fecha_item", "producto_id", "nombre_producto", "cantidad", "precio_unitario", "total")
+
     def __init__(self, producto_id, nombre_producto, cantidad, precio_unitario, fecha_item=None):
         # La fecha aquí es para el item individual, aunque el ticket tendrá su propia fecha
         self.fecha_item = fecha_item or datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        self.producto_id = producto_id
-        self.nombre_producto = nombre_producto
+        self.producto_id = internar(producto_id)
+        self.nombre_producto = internar(nombre_producto)
         self.cantidad = cantidad
         self.precio_unitario = precio_unitario
         self.total = round(cantidad * precio_unitario, 2) # Total por este item de venta
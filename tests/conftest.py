@@ -0,0 +1,7 @@
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def sin_exportacion_excel(monkeypatch):
+    """Las pruebas no programan exportaciones a Excel en segundo plano."""
+    monkeypatch.setenv("CAFE_EXPORTAR_EXCEL", "manual")
@@ -0,0 +1,120 @@
+import json
+
+import pytest
+
+from controllers import productos_controller
+from utils import storage
+from utils.cache_utils import CacheRepositorios, REPOSITORIOS
+
+
+@pytest.fixture(params=["json", "sqlite"])
+def productos_path(request, tmp_path, monkeypatch):
+    monkeypatch.setenv("CAFE_STORAGE_BACKEND", request.param)
+    monkeypatch.setattr(storage, "_ALMACENES", {})
+    path = str(tmp_path / "productos.json")
+    monkeypatch.setattr(productos_controller, "DATA_PATH", path)
+    return path
+
+
+def test_lecturas_repetidas_no_recargan(productos_path):
+    cache = CacheRepositorios()
+    cargas = []
+
+    def cargar():
+        cargas.append(1)
+        return []
+
+    assert cache.obtener(productos_path, cargar) is cache.obtener(productos_path, cargar)
+    assert len(cargas) == 1
+    assert cache.estadisticas()["productos"] == {"aciertos": 1, "fallos": 1}
+
+
+def test_escrituras_actualizan_el_cache_en_el_lugar(productos_path):
+    REPOSITORIOS.reiniciar_estadisticas()
+    producto = productos_controller.agregar_producto("Café", 10)
+    productos_controller.editar_producto(producto.id, "Café doble", 15)
+    productos_controller.agregar_producto("Té", 8)
+
+    cargados = productos_controller.cargar_productos()
+    assert [p.nombre for p in cargados] == ["Café doble", "Té"]
+    assert productos_controller.obtener_producto_por_id(producto.id) is cargados[0]
+
+    productos_controller.eliminar_producto(producto.id)
+    assert [p.nombre for p in productos_controller.cargar_productos()] == ["Té"]
+    # Solo la primera lectura llega al almacén.
+    assert REPOSITORIOS.estadisticas()["productos"]["fallos"] == 1
+
+
+def test_cambios_externos_invalidan_la_entrada(productos_path):
+    productos_controller.agregar_producto("Café", 10)
+    assert len(productos_controller.cargar_productos()) == 1
+
+    # Otro proceso reescribe la colección por fuera de los controladores.
+    almacen = storage.obtener_almacen()
+    registros = almacen.cargar(productos_path)
+    registros.append({"id": "p2", "nombre": "Té", "precio_unitario": 8})
+    almacen.guardar(productos_path, registros)
+    assert [p.nombre for p in productos_controller.cargar_productos()] == ["Café", "Té"]
+
+
+def test_listar_retorna_copia_de_la_lista(productos_path):
+    productos_controller.agregar_producto("Café", 10)
+    productos_controller.agregar_producto("Agua", 5)
+    listado = productos_controller.listar_productos()
+    listado.sort(key=lambda p: p.nombre)
+    assert [p.nombre for p in productos_controller.cargar_productos()] == ["Café", "Agua"]
+
+
+def test_archivo_json_modificado_a_mano(tmp_path, monkeypatch):
+    monkeypatch.setenv("CAFE_STORAGE_BACKEND", "json")
+    monkeypatch.setattr(storage, "_ALMACENES", {})
+    path = tmp_path / "productos.json"
+    monkeypatch.setattr(productos_controller, "DATA_PATH", str(path))
+    path.write_text(json.dumps([{"id": "p1", "nombre": "A", "precio_unitario": 1}]), encoding="utf-8")
+    assert len(productos_controller.cargar_productos()) == 1
+    path.write_text(
+        json.dumps(
+            [
+                {"id": "p1", "nombre": "A", "precio_unitario": 1},
+                {"id": "p2", "nombre": "B", "precio_unitario": 2},
+            ]
+        ),
+        encoding="utf-8",
+    )
+    assert len(productos_controller.cargar_productos()) == 2
+
+
+class _Entidad:
+    def __init__(self, id, producto_id):
+        self.id = id
+        self.producto_id = producto_id
+
+
+def test_indices_se_mantienen_con_altas_y_bajas(productos_path):
+    cache = CacheRepositorios()
+    datos = [_Entidad("r1", "p1"), _Entidad("r2", "p1")]
+    cargar = lambda: list(datos)  # noqa: E731
+
+    assert cache.buscar(productos_path, cargar, "r2") is datos[1]
+    # Con claves repetidas se conserva la primera entidad, como en un recorrido lineal.
+    assert cache.buscar(productos_path, cargar, "p1", campo="producto_id") is datos[0]
+
+    nueva = _Entidad("r3", "p2")
+    cache.agregar(productos_path, lambda: True, nueva)
+    assert cache.buscar(productos_path, cargar, "r3") is nueva
+    assert cache.buscar(productos_path, cargar, "p2", campo="producto_id") is nueva
+
+    cache.quitar(productos_path, lambda: True, "r1")
+    assert cache.buscar(productos_path, cargar, "r1") is None
+    assert cache.buscar(productos_path, cargar, "p1", campo="producto_id") is datos[1]
+    assert cache.estadisticas()["productos"]["fallos"] == 1
+
+
+def test_obtener_por_id_sigue_las_altas_y_bajas(productos_path):
+    assert productos_controller.cargar_productos() == []
+    cafe = productos_controller.agregar_producto("Café", 10)
+    assert productos_controller.obtener_producto_por_id(cafe.id) is cafe
+    te = productos_controller.agregar_producto("Té", 8)
+    assert productos_controller.obtener_producto_por_id(te.id) is te
+    productos_controller.eliminar_producto(cafe.id)
+    assert productos_controller.obtener_producto_por_id(cafe.id) is None
@@ -0,0 +1,99 @@
+import os
+
+import numpy as np
+import pytest
+
+from models.ticket import ResumenTicket
+from utils.columnas_utils import ColumnasVentas, columnas_path
+from utils.storage import obtener_almacen
+
+
+def _ticket(id, fecha, items):
+    return {
+        "id": id,
+        "fecha": fecha,
+        "cliente": "Ana",
+        "items_venta": [
+            {"producto_id": p, "nombre_producto": p.upper(), "cantidad": c, "precio_unitario": precio}
+            for p, c, precio in items
+        ],
+    }
+
+
+def _cargar(path):
+    return lambda: (ResumenTicket.from_dict(t) for t in obtener_almacen().iterar(path))
+
+
+def _no_recorrer():
+    raise AssertionError("No debería recorrer la colección")
+
+
+@pytest.fixture
+def path(tmp_path):
+    path = str(tmp_path / "tickets.json")
+    obtener_almacen().guardar(
+        path,
+        [
+            _ticket("t1", "2024-01-10 10:00:00", [("p1", 2, 10), ("p2", 1, 5)]),
+            _ticket("t2", "2024-02-01 09:30:00", [("p1", 1, 10)]),
+            _ticket("t3", "fecha rota", [("p3", 1, 7)]),
+        ],
+    )
+    return path
+
+
+def test_reconstruye_y_filtra_periodo(path):
+    tabla = ColumnasVentas().tabla(path, _cargar(path))
+
+    assert tabla.productos == ["p1", "p2", "p3"]
+    assert tabla.nombres == ["P1", "P2", "P3"]
+    assert isinstance(tabla.total, np.memmap)
+    assert tabla.ticket_total.tolist() == [25, 10, 7]
+    assert tabla.total.tolist() == [20, 5, 10, 7]
+    assert tabla.ticket.tolist() == [0, 0, 1, 2]
+
+    enero = tabla.periodo("2024-01-01", "2024-01-31 23:59:59")
+    assert enero.ticket_total.tolist() == [25]
+    assert enero.producto.tolist() == [0, 1]
+    # La fecha inválida queda fuera de todo período.
+    assert tabla.periodo().ticket_total.tolist() == [25, 10]
+
+
+def test_altas_y_bajas_sin_reconstruir(path):
+    columnas = ColumnasVentas()
+    columnas.tabla(path, _cargar(path))
+    almacen = obtener_almacen()
+
+    nuevo = _ticket("t4", "2024-02-02 12:00:00", [("p4", 3, 2)])
+    columnas.aplicar(path, lambda: almacen.agregar(path, nuevo), sumar=[ResumenTicket.from_dict(nuevo)])
+    viejo = ResumenTicket.from_dict(almacen.obtener(path, "t1"))
+    columnas.aplicar(path, lambda: almacen.eliminar(path, "t1"), restar=[viejo])
+
+    tabla = columnas.tabla(path, _no_recorrer)
+    assert tabla.ticket_total.tolist() == [10, 7, 6]
+    assert [tabla.productos[p] for p in tabla.producto] == ["p1", "p3", "p4"]
+
+    # Otra instancia (otro proceso) abre las mismas columnas desde el disco.
+    assert ColumnasVentas().tabla(path, _no_recorrer).total.tolist() == tabla.total.tolist()
+
+
+def test_cambio_externo_reconstruye(path):
+    columnas = ColumnasVentas()
+    columnas.tabla(path, _cargar(path))
+    obtener_almacen().agregar(path, _ticket("t4", "2024-03-01 08:00:00", [("p1", 1, 10)]))
+
+    assert columnas.tabla(path, _cargar(path)).ticket_total.tolist() == [25, 10, 7, 10]
+
+
+def test_descarta_escritura_interrumpida(path):
+    columnas = ColumnasVentas()
+    columnas.tabla(path, _cargar(path))
+    # Bytes de una escritura que no llegó a actualizar el meta.
+    with open(os.path.join(columnas_path(path), "lineas_total.bin"), "ab") as f:
+        f.write(b"\xff" * 8)
+
+    nuevo = _ticket("t4", "2024-02-02 12:00:00", [("p2", 2, 5)])
+    columnas.aplicar(
+        path, lambda: obtener_almacen().agregar(path, nuevo), sumar=[ResumenTicket.from_dict(nuevo)]
+    )
+    assert ColumnasVentas().tabla(path, _no_recorrer).total.tolist() == [20, 5, 10, 7, 10]
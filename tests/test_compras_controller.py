@@ -1,10 +1,12 @@
 import os
 import json
+import sys
 import tempfile
 import unittest
-from unittest.mock import patch
+from types import SimpleNamespace
+from unittest.mock import Mock, patch
 
-from controllers import compras_controller
+from controllers import compras_controller, materia_prima_controller
 from models.compra import Compra
 from models.compra_detalle import CompraDetalle
 from models.proveedor import Proveedor
@@ -40,7 +42,7 @@ class TestCargarCompras(unittest.TestCase):
         # Ensure the controller's path points to compras.json
         self.assertEqual(os.path.basename(compras_controller.DATA_PATH), "compras.json")
 
-    @patch("controllers.compras_controller.actualizar_stock_materia_prima")
+    @patch("controllers.compras_controller.ajustar_stock_materias_primas")
     def test_registrar_compra_con_fecha(self, mock_actualizar_stock):
         detalle = CompraDetalle(producto_id=2, nombre_producto="Azucar", cantidad=1, costo_unitario=5)
         fecha_custom = "2024-05-01 10:30:00"
@@ -51,6 +53,24 @@ class TestCargarCompras(unittest.TestCase):
         self.assertEqual(len(compras), 2)
         self.assertTrue(any(c.fecha == fecha_custom for c in compras))
 
+    def test_ajuste_rechazado_no_guarda_la_compra(self):
+        detalle = CompraDetalle(producto_id="no-existe", nombre_producto="Leche", cantidad=1, costo_unitario=5)
+        with patch.object(
+            materia_prima_controller, "DATA_PATH", os.path.join(self.temp_dir.name, "materias_primas.json")
+        ), patch("controllers.compras_controller.exportar_compras_excel") as exportar:
+            with self.assertRaises(ValueError):
+                compras_controller.registrar_compra(Proveedor("Proveedor Z"), [detalle])
+        exportar.assert_not_called()
+        self.assertEqual(len(compras_controller.cargar_compras()), 1)
+
+    def test_error_al_exportar_no_interrumpe(self):
+        pandas = SimpleNamespace(DataFrame=Mock(from_records=Mock(side_effect=ValueError("hoja inválida"))))
+        with patch.dict(sys.modules, {"pandas": pandas}), self.assertLogs(
+            "controllers.compras_controller", "WARNING"
+        ) as logs:
+            compras_controller.exportar_compras_excel(en_segundo_plano=False)
+        self.assertIn("hoja inválida", logs.output[0])
+
 
 if __name__ == "__main__":
     unittest.main()
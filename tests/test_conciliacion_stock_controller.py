@@ -0,0 +1,106 @@
+import json
+
+import pytest
+
+from controllers import compras_controller
+from controllers import conciliacion_stock_controller
+from controllers import materia_prima_controller
+from controllers import recetas_controller
+from controllers import tickets_controller
+from utils.cache_utils import REPOSITORIOS
+
+
+def _write(path, data):
+    path.write_text(json.dumps(data), encoding="utf-8")
+
+
+@pytest.fixture
+def datos(monkeypatch, tmp_path):
+    monkeypatch.setattr(materia_prima_controller, "DATA_PATH", str(tmp_path / "materias_primas.json"))
+    monkeypatch.setattr(recetas_controller, "DATA_PATH", str(tmp_path / "recetas.json"))
+    monkeypatch.setattr(tickets_controller, "DATA_PATH", str(tmp_path / "tickets.json"))
+    monkeypatch.setattr(compras_controller, "DATA_PATH", str(tmp_path / "compras.json"))
+    REPOSITORIOS.invalidar()
+    _write(
+        tmp_path / "materias_primas.json",
+        [
+            {"id": "m1", "nombre": "Cafe", "unidad_medida": "kg", "costo_unitario": 100, "stock": 4},
+            {"id": "m2", "nombre": "Leche", "unidad_medida": "l", "costo_unitario": 10, "stock": 6},
+            {"id": "m3", "nombre": "Azucar", "unidad_medida": "kg", "costo_unitario": 5, "stock": 2},
+        ],
+    )
+    _write(
+        tmp_path / "recetas.json",
+        [
+            {
+                "id": "r1",
+                "producto_id": "p1",
+                "nombre_producto": "Cortado",
+                "ingredientes": [
+                    {"materia_prima_id": "m1", "cantidad_necesaria": 0.5},
+                    {"materia_prima_id": "m2", "cantidad_necesaria": 1},
+                ],
+                "rendimiento": 1,
+            }
+        ],
+    )
+    venta = {"producto_id": "p1", "nombre_producto": "Cortado", "precio_unitario": 1000}
+    _write(
+        tmp_path / "tickets.json",
+        [
+            {"id": "t0", "fecha": "2024-02-28 10:00:00", "cliente": "A", "items_venta": [dict(venta, cantidad=50)]},
+            {"id": "t1", "fecha": "2024-03-02 10:00:00", "cliente": "A", "items_venta": [dict(venta, cantidad=4)]},
+            {"id": "t2", "fecha": "2024-03-31 18:00:00", "cliente": "B", "items_venta": [dict(venta, cantidad=2)]},
+        ],
+    )
+    compra = {"descripcion_adicional": "", "fecha_item": "2024-03-10 09:00:00"}
+    _write(
+        tmp_path / "compras.json",
+        [
+            {
+                "id": "c1",
+                "fecha": "2024-03-10 09:00:00",
+                "proveedor_id": "prov",
+                "items_compra": [
+                    dict(compra, producto_id="m1", nombre_producto="Cafe", cantidad=5, costo_unitario=100),
+                    dict(compra, producto_id="m2", nombre_producto="Leche", cantidad=4, costo_unitario=10),
+                ],
+            },
+            {
+                "id": "c2",
+                "fecha": "2024-04-01 09:00:00",
+                "proveedor_id": "prov",
+                "items_compra": [
+                    dict(compra, producto_id="m1", nombre_producto="Cafe", cantidad=99, costo_unitario=100)
+                ],
+            },
+        ],
+    )
+    yield
+    REPOSITORIOS.invalidar()
+
+
+def test_conciliar_consumo(datos):
+    reporte = conciliacion_stock_controller.conciliar_consumo(
+        "2024-03-01", "2024-03-31", {"m1": 2, "m2": 8, "m3": 2}, {"m1": 2, "m2": 6, "m3": 2}
+    )
+    por_id = {r.materia_prima_id: r for r in reporte}
+    cafe, leche = por_id["m1"], por_id["m2"]
+
+    # Café: 2 + 5 - 2 = 5 consumidos contra 6 x 0.5 = 3 según recetas.
+    assert (cafe.compras, cafe.consumo_real, cafe.consumo_teorico) == (5, 5, 3)
+    assert (cafe.diferencia, cafe.merma, cafe.porcentaje, cafe.costo_diferencia) == (2, 2, 66.67, 200)
+    # Leche: 8 + 4 - 6 = 6, exactamente lo vendido.
+    assert (leche.consumo_real, leche.consumo_teorico, leche.diferencia, leche.merma) == (6, 6, 0, 0)
+    assert por_id["m3"].porcentaje is None
+    assert [r.materia_prima_id for r in reporte] == ["m1", "m2", "m3"]
+
+
+def test_sobrante_y_conteo_final_actual(datos):
+    reporte = conciliacion_stock_controller.conciliar_consumo(
+        "2024-03-01 00:00:00", "2024-03-31", {"m1": 1, "m2": 9}
+    )
+    assert [r.materia_prima_id for r in reporte] == ["m2", "m1"]
+    cafe = reporte[1]
+    # Stock actual 4: 1 + 5 - 4 = 2 contra 3 teóricos.
+    assert (cafe.stock_final, cafe.diferencia, cafe.merma) == (4, -1, 0)
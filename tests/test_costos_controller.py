@@ -0,0 +1,86 @@
+import json
+
+import pytest
+
+from controllers import costos_controller
+from controllers import materia_prima_controller
+from controllers import movimientos_stock_controller
+from controllers import recetas_controller
+
+
+def _write(path, data):
+    path.write_text(json.dumps(data), encoding="utf-8")
+
+
+@pytest.fixture
+def datos(monkeypatch, tmp_path):
+    materias = tmp_path / "materias_primas.json"
+    recetas = tmp_path / "recetas.json"
+    monkeypatch.setattr(materia_prima_controller, "DATA_PATH", str(materias))
+    monkeypatch.setattr(recetas_controller, "DATA_PATH", str(recetas))
+    monkeypatch.setattr(movimientos_stock_controller, "DATA_PATH", str(tmp_path / "movimientos_stock.json"))
+    _write(
+        materias,
+        [
+            {"id": "m1", "nombre": "Harina", "unidad_medida": "kg", "costo_unitario": 10, "stock": 100},
+            {"id": "m2", "nombre": "Leche", "unidad_medida": "l", "costo_unitario": 4, "stock": 100},
+        ],
+    )
+    _write(
+        recetas,
+        [
+            {
+                "id": "r1",
+                "producto_id": "p1",
+                "nombre_producto": "Pan",
+                "ingredientes": [{"materia_prima_id": "m1", "cantidad_necesaria": 2}],
+                "rendimiento": 4,
+            },
+            {
+                "id": "r2",
+                "producto_id": "p2",
+                "nombre_producto": "Café con leche",
+                "ingredientes": [{"materia_prima_id": "m2", "cantidad_necesaria": 1}],
+                "rendimiento": 1,
+            },
+        ],
+    )
+    costos_controller.invalidar_costos()
+    yield
+    costos_controller.invalidar_costos()
+
+
+def test_tabla_de_costos(datos):
+    assert costos_controller.costo_lote_producto("p1") == 20
+    assert costos_controller.costo_unitario_producto("p1") == 5
+    assert costos_controller.costo_unitario_producto("p2") == 4
+    assert costos_controller.costo_unitario_producto("sin_receta") == 0
+
+
+def test_cambio_de_costo_recalcula_solo_productos_afectados(datos, monkeypatch):
+    costos_controller.tabla_costos()
+    recalculados = []
+    original = costos_controller.MotorCostos._recalcular
+
+    def espiar(self, producto_id):
+        recalculados.append(producto_id)
+        return original(self, producto_id)
+
+    monkeypatch.setattr(costos_controller.MotorCostos, "_recalcular", espiar)
+
+    mp = materia_prima_controller.obtener_materia_prima_por_id("m2")
+    materia_prima_controller.editar_materia_prima("m2", mp.nombre, mp.unidad_medida, 6, mp.stock)
+    assert costos_controller.costo_unitario_producto("p2") == 6
+    assert recalculados == ["p2"]
+
+    # Un cambio de stock no altera costos ni recalcula productos.
+    materia_prima_controller.actualizar_stock_materia_prima("m1", -1)
+    assert costos_controller.costo_unitario_producto("p1") == 5
+    assert recalculados == ["p2"]
+
+    receta = recetas_controller.obtener_receta_por_producto_id("p1")
+    recetas_controller.editar_receta(
+        receta.id, [{"materia_prima_id": "m1", "cantidad_necesaria": 4}], 4
+    )
+    assert costos_controller.costo_unitario_producto("p1") == 10
+    assert recalculados == ["p2", "p1"]
@@ -188,3 +188,43 @@ def test_calcular_metricas_dashboard_mensual_con_costos_pendientes(monkeypatch,
     assert metricas.costos_produccion == 0
     assert metricas.costos_produccion_pendientes is True
     assert metricas.top_productos[0]["costo_pendiente"] is True
+
+
+def _ticket(id_, fecha, total):
+    item = {
+        "fecha_item": fecha,
+        "producto_id": "p1",
+        "nombre_producto": "Producto 1",
+        "cantidad": 1,
+        "precio_unitario": total,
+        "total": total,
+    }
+    return {"id": id_, "fecha": fecha, "cliente": "Ana", "items_venta": [item], "total": total}
+
+
+def test_calcular_metricas_dashboard_anual_coincide_con_mensual(monkeypatch, tmp_path):
+    tickets, gastos, materias, recetas = _configurar_paths(monkeypatch, tmp_path)
+    _write(
+        tickets,
+        [
+            _ticket("t1", "2025-06-10 10:00:00", 20),
+            _ticket("t2", "2025-06-11 10:00:00", 10),
+            _ticket("t3", "2025-07-01 11:00:00", 5),
+            _ticket("t4", "2024-07-01 11:00:00", 99),
+        ],
+    )
+    _write(
+        gastos,
+        [{"id": "g1", "nombre": "Luz", "monto": 3, "fecha": "2025-07-02 09:00:00", "descripcion": ""}],
+    )
+    _write(materias, [])
+    _write(recetas, [])
+
+    anual = dashboard_controller.calcular_metricas_dashboard_anual(2025)
+
+    assert sorted(anual) == [f"2025-{m:02d}" for m in range(1, 13)]
+    assert anual["2025-06"] == dashboard_controller.calcular_metricas_dashboard_mensual("2025-06")
+    assert anual["2025-06"].ticket_promedio == 15
+    assert anual["2025-07"].ventas_totales == 5
+    assert anual["2025-07"].gastos_adicionales == 3
+    assert anual["2025-01"].ventas_totales == 0
@@ -0,0 +1,110 @@
+import json
+
+import pytest
+
+from controllers import disponibilidad_controller
+from controllers import materia_prima_controller
+from controllers import movimientos_stock_controller
+from controllers import recetas_controller
+
+
+def _write(path, data):
+    path.write_text(json.dumps(data), encoding="utf-8")
+
+
+@pytest.fixture
+def datos(monkeypatch, tmp_path):
+    materias = tmp_path / "materias_primas.json"
+    recetas = tmp_path / "recetas.json"
+    monkeypatch.setattr(materia_prima_controller, "DATA_PATH", str(materias))
+    monkeypatch.setattr(recetas_controller, "DATA_PATH", str(recetas))
+    monkeypatch.setattr(movimientos_stock_controller, "DATA_PATH", str(tmp_path / "movimientos_stock.json"))
+    _write(
+        materias,
+        [
+            {"id": "m1", "nombre": "Harina", "unidad_medida": "kg", "costo_unitario": 10, "stock": 9},
+            {"id": "m2", "nombre": "Leche", "unidad_medida": "l", "costo_unitario": 4, "stock": 2.5},
+        ],
+    )
+    _write(
+        recetas,
+        [
+            {
+                "id": "r1",
+                "producto_id": "p1",
+                "nombre_producto": "Pan",
+                "ingredientes": [{"materia_prima_id": "m1", "cantidad_necesaria": 2}],
+                "rendimiento": 1,
+            },
+            {
+                "id": "r2",
+                "producto_id": "p2",
+                "nombre_producto": "Café con leche",
+                "ingredientes": [
+                    {"materia_prima_id": "m1", "cantidad_necesaria": 1},
+                    {"materia_prima_id": "m2", "cantidad_necesaria": 0.5},
+                ],
+                "rendimiento": 1,
+            },
+            {
+                "id": "r3",
+                "producto_id": "p3",
+                "nombre_producto": "Torta",
+                "ingredientes": [{"materia_prima_id": "m9", "cantidad_necesaria": 1}],
+                "rendimiento": 1,
+            },
+        ],
+    )
+    disponibilidad_controller.invalidar_disponibilidad()
+    yield
+    disponibilidad_controller.invalidar_disponibilidad()
+
+
+def test_unidades_producibles(datos):
+    assert disponibilidad_controller.unidades_producibles(["p1", "p2", "p3", "sin_receta"]) == {
+        "p1": 4,
+        "p2": 5,
+        "p3": 0,
+        "sin_receta": float("inf"),
+    }
+    assert isinstance(disponibilidad_controller.unidades_producibles_producto("p1"), int)
+
+
+def test_matriz_se_reconstruye_solo_al_cambiar_recetas(datos, monkeypatch):
+    disponibilidad_controller.unidades_producibles(["p1"])
+    construcciones = []
+    original = disponibilidad_controller.MatrizDisponibilidad._construir
+
+    def espiar(self, recetas):
+        construcciones.append(len(recetas))
+        return original(self, recetas)
+
+    monkeypatch.setattr(disponibilidad_controller.MatrizDisponibilidad, "_construir", espiar)
+
+    materia_prima_controller.actualizar_stock_materia_prima("m2", -1.5)
+    assert disponibilidad_controller.unidades_producibles_producto("p2") == 2
+    assert construcciones == []
+
+    receta = recetas_controller.obtener_receta_por_producto_id("p1")
+    recetas_controller.editar_receta(
+        receta.id, [{"materia_prima_id": "m1", "cantidad_necesaria": 3}], 1
+    )
+    assert disponibilidad_controller.unidades_producibles_producto("p1") == 3
+    assert construcciones == [3]
+
+
+def test_reserva_carrito_descuenta_y_senala_relacionados(datos):
+    reserva = disponibilidad_controller.ReservaCarrito()
+    assert reserva.agregar("p1", 2) == {"p1", "p2"}
+    assert reserva.reservado("m1") == 4
+    # Quedan 5 de harina: 2 panes o 5 cafés con leche (limitados por la leche).
+    assert reserva.unidades(["p1", "p2", "p3"]) == {"p1": 2, "p2": 5, "p3": 0}
+    assert reserva.agregar("p2", 2) == {"p1", "p2"}
+    assert reserva.unidades(["p1", "p2"]) == {"p1": 1, "p2": 3}
+    assert reserva.agregar("p3", 1) == {"p3"}
+    # Las unidades sin reservas no cambian.
+    assert disponibilidad_controller.unidades_producibles(["p1", "p2"]) == {"p1": 4, "p2": 5}
+
+    reserva.vaciar()
+    assert reserva.reservado("m1") == 0
+    assert reserva.unidades(["p1", "p2"]) == {"p1": 4, "p2": 5}
@@ -0,0 +1,46 @@
+import threading
+
+from utils.export_utils import ExportadorEnSegundoPlano
+
+
+def test_rafaga_de_exportaciones_se_agrupa():
+    llamadas = []
+    listo = threading.Event()
+    exportador = ExportadorEnSegundoPlano(demora=0.05)
+
+    for i in range(10):
+        exportador.programar("tickets", lambda i=i: (llamadas.append(i), listo.set()))
+
+    assert listo.wait(2)
+    exportador.detener()
+    assert llamadas == [9]
+
+
+def test_ejecutar_pendientes_corre_en_el_momento():
+    llamadas = []
+    exportador = ExportadorEnSegundoPlano(demora=60)
+    exportador.programar("compras", lambda: llamadas.append("compras"))
+    exportador.programar("tickets", lambda: llamadas.append("tickets"))
+
+    exportador.ejecutar_pendientes()
+
+    assert sorted(llamadas) == ["compras", "tickets"]
+    assert exportador.pendientes() == []
+    exportador.detener()
+
+
+def test_error_en_exportacion_no_detiene_las_demas(caplog):
+    llamadas = []
+    exportador = ExportadorEnSegundoPlano(demora=60)
+
+    def fallar():
+        raise OSError("disco lleno")
+
+    exportador.programar("compras", fallar)
+    exportador.programar("tickets", lambda: llamadas.append("tickets"))
+
+    exportador.ejecutar_pendientes()
+
+    assert llamadas == ["tickets"]
+    assert "disco lleno" in caplog.text
+    exportador.detener()
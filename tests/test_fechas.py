@@ -0,0 +1,54 @@
+import datetime
+
+import pytest
+
+from models.gasto_adicional import GastoAdicional
+from utils import fechas
+
+
+def test_parse_fecha():
+    assert fechas.parse_fecha("2024-03-05 10:20:30") == datetime.datetime(2024, 3, 5, 10, 20, 30)
+    assert fechas.parse_fecha("2024-03-05") == datetime.datetime(2024, 3, 5)
+    # Sin ceros a la izquierda también se acepta, como con ``strptime``.
+    assert fechas.parse_fecha("2024-3-5 1:2:3") == datetime.datetime(2024, 3, 5, 1, 2, 3)
+    assert fechas.parse_fecha("2024-03-05 10:20:30.123456") == datetime.datetime(2024, 3, 5, 10, 20, 30)
+    assert fechas.parse_fecha_opcional("2024-W10-1") is None
+    assert fechas.parse_fecha_opcional("2024-02-30") is None
+    assert fechas.parse_fecha_opcional(None) is None
+    with pytest.raises(ValueError):
+        fechas.parse_fecha("ayer")
+    with pytest.raises(TypeError):
+        fechas.parse_fecha(20240305)
+
+
+def test_interpreta_cada_cadena_una_vez():
+    fechas._interpretar.cache_clear()
+    for _ in range(3):
+        fechas.epoch("2023-07-01 08:00:00")
+    info = fechas._interpretar.cache_info()
+    assert (info.misses, info.hits) == (1, 2)
+
+
+def test_epoch_y_claves_de_periodo():
+    assert fechas.epoch("1970-01-02 00:00:01") == 86401
+    assert fechas.epoch(datetime.date(1970, 1, 2)) == 86400
+    assert fechas.epoch("sin fecha") is None
+    valor = fechas.parse_fecha("2024-12-30 10:00:00")
+    assert (fechas.clave_mes(valor), fechas.clave_semana(valor), fechas.clave_dia(valor)) == (
+        "2024-12",
+        "2025-W01",
+        "2024-12-30",
+    )
+    desde, hasta = fechas.rango_mes("2024-12")
+    assert (desde, hasta) == (fechas.epoch("2024-12-01"), fechas.epoch("2024-12-31 23:59:59"))
+
+
+def test_modelo_guarda_su_fecha_interpretada():
+    gasto = GastoAdicional("Luz", 10, fecha="2024-05-01 09:00:00")
+    assert gasto.fecha_dt == datetime.datetime(2024, 5, 1, 9)
+    assert gasto.epoch == fechas.epoch("2024-05-01 09:00:00")
+
+    gasto.fecha = "2024-06-01 09:00:00"
+    assert gasto.fecha_dt.month == 6
+    gasto.fecha = "rota"
+    assert (gasto.fecha_dt, gasto.epoch) == (None, None)
@@ -0,0 +1,138 @@
+import json
+import os
+from datetime import datetime, timedelta
+
+from controllers import productos_controller
+from utils import history_utils, storage
+from utils.json_utils import write_json
+
+
+def _objetos(tmp_path):
+    return sorted(p.name for p in (tmp_path / "history" / "tickets" / "objects").rglob("*.json"))
+
+
+def _registros(n, inicio=0):
+    return [{"id": f"t{i}", "cliente": f"Cliente {i}", "total": i * 100} for i in range(inicio, inicio + n)]
+
+
+def test_write_json_versiona_solo_los_chunks_modificados(tmp_path):
+    path = str(tmp_path / "tickets.json")
+    datos = _registros(500)
+    assert write_json(path, datos)
+    objetos_iniciales = _objetos(tmp_path)
+    assert len(objetos_iniciales) > 1
+
+    datos.append({"id": "nuevo", "cliente": "Nuevo", "total": 1})
+    assert write_json(path, datos)
+    nuevos = set(_objetos(tmp_path)) - set(objetos_iniciales)
+    # Agregar un registro al final solo reescribe el último chunk.
+    assert len(nuevos) == 1
+    assert len(history_utils.listar_versiones(path)) == 2
+
+
+def test_restaurar_version_anterior(tmp_path):
+    path = str(tmp_path / "tickets.json")
+    write_json(path, _registros(3))
+    write_json(path, _registros(5))
+    primera, ultima = history_utils.listar_versiones(path)
+
+    assert history_utils.cargar_version(path, ultima) == _registros(5)
+    assert history_utils.restaurar_version(path, primera)
+    assert storage.obtener_almacen().cargar(path) == _registros(3)
+
+    destino = history_utils.exportar_version(path, ultima, str(tmp_path / "export"))
+    with open(destino, encoding="utf-8") as f:
+        assert json.load(f) == _registros(5)
+
+
+def test_primera_escritura_conserva_contenido_previo(tmp_path):
+    path = tmp_path / "tickets.json"
+    path.write_text(json.dumps(_registros(2)), encoding="utf-8")
+    write_json(str(path), _registros(4))
+    versiones = history_utils.listar_versiones(str(path))
+    assert history_utils.cargar_version(str(path), versiones[0]) == _registros(2)
+
+
+def test_retencion_elimina_versiones_y_chunks_huerfanos(tmp_path, monkeypatch):
+    monkeypatch.setattr(history_utils, "MAX_VERSIONES", 2)
+    monkeypatch.setattr(history_utils, "MARGEN_RETENCION", 1000)
+    path = str(tmp_path / "tickets.json")
+    for i in range(5):
+        write_json(path, _registros(1, inicio=i))
+
+    futuro = datetime.now() + timedelta(days=history_utils.DIAS_RETENCION + 1)
+    eliminadas = history_utils.aplicar_retencion(path, ahora=futuro)
+
+    assert eliminadas == 3
+    assert len(history_utils.listar_versiones(path)) == 2
+    assert len(_objetos(tmp_path)) == 2
+    assert history_utils.cargar_version(path) == _registros(1, inicio=4)
+    assert os.path.exists(path)
+
+
+def test_restaurar_vacia_el_journal(tmp_path, monkeypatch):
+    monkeypatch.setenv("CAFE_STORAGE_BACKEND", "json")
+    monkeypatch.setattr(storage, "_ALMACENES", {})
+    monkeypatch.setattr(productos_controller, "DATA_PATH", str(tmp_path / "productos.json"))
+    productos_controller.agregar_producto("A", 1000)
+    productos_controller.guardar_productos(productos_controller.cargar_productos())
+    (version,) = history_utils.listar_versiones(productos_controller.DATA_PATH)
+    productos_controller.agregar_producto("B", 2000)
+    assert [p.nombre for p in productos_controller.cargar_productos()] == ["A", "B"]
+
+    assert history_utils.restaurar_version(productos_controller.DATA_PATH, version)
+
+    assert [p.nombre for p in productos_controller.cargar_productos()] == ["A"]
+
+
+def test_compactar_el_journal_registra_una_version(tmp_path, monkeypatch):
+    monkeypatch.setenv("CAFE_STORAGE_BACKEND", "json")
+    monkeypatch.setattr(storage, "_ALMACENES", {})
+    almacen = storage.obtener_almacen()
+    path = str(tmp_path / "productos.json")
+    almacen.guardar(path, _registros(1))
+    almacen.agregar(path, _registros(1, inicio=1)[0])
+    assert len(history_utils.listar_versiones(path)) == 1
+
+    assert almacen.compactar(path)
+    assert history_utils.cargar_version(path) == _registros(2)
+
+
+def test_restaurar_version_de_coleccion_particionada(tmp_path, monkeypatch):
+    monkeypatch.setenv("CAFE_STORAGE_BACKEND", "json")
+    monkeypatch.setattr(storage, "_ALMACENES", {})
+    almacen = storage.obtener_almacen()
+    path = str(tmp_path / "tickets.json")
+    enero = {"id": "t1", "fecha": "2024-01-05 10:00:00", "total": 10}
+    febrero = {"id": "t2", "fecha": "2024-02-05 10:00:00", "total": 20}
+    almacen.guardar(path, [enero])
+    almacen.agregar(path, febrero)
+    assert almacen.compactar(path)
+    version = history_utils.listar_versiones(path)[-1]
+    assert almacen.eliminar(path, "t1")
+    almacen.agregar(path, {"id": "t3", "fecha": "2024-03-05 10:00:00", "total": 30})
+    assert almacen.compactar(path)
+
+    assert history_utils.cargar_version(path, version) == [enero, febrero]
+    assert history_utils.restaurar_version(path, version)
+
+    assert almacen.cargar(path) == [enero, febrero]
+    manifest = json.loads((tmp_path / "tickets" / "manifest.json").read_text(encoding="utf-8"))
+    assert manifest["meses"] == ["2024-01", "2024-02"]
+
+
+def test_versiones_heredadas_se_listan_y_restauran(tmp_path):
+    path = str(tmp_path / "productos.json")
+    heredada = tmp_path / "history" / "productos" / "20230101120000.json"
+    heredada.parent.mkdir(parents=True)
+    heredada.write_text(json.dumps(_registros(2)), encoding="utf-8")
+    write_json(path, _registros(3))
+
+    versiones = history_utils.listar_versiones(path)
+    assert versiones[0] == "20230101120000"
+    assert len(versiones) == 2
+    assert history_utils.cargar_version(path, "20230101120000") == _registros(2)
+
+    assert history_utils.restaurar_version(path, "20230101120000", destino=path)
+    assert json.loads((tmp_path / "productos.json").read_text(encoding="utf-8")) == _registros(2)
+    assert heredada.exists()
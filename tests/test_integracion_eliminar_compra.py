@@ -22,7 +22,7 @@ class TestIntegracionEliminarCompra(unittest.TestCase):
         compras_controller.DATA_PATH = self.original_path
         self.temp_dir.cleanup()
 
-    @patch("controllers.compras_controller.actualizar_stock_materia_prima")
+    @patch("controllers.compras_controller.ajustar_stock_materias_primas")
     def test_registro_y_eliminacion_actualiza_reportes(self, mock_actualizar):
         detalle = CompraDetalle(producto_id=1, nombre_producto="Cafe", cantidad=2, costo_unitario=10)
         proveedor = Proveedor("Proveedor X")
@@ -34,7 +34,9 @@ class TestIntegracionEliminarCompra(unittest.TestCase):
         self.assertEqual(len(compras_mes), 1)
         self.assertEqual(compras_mes[0][0], "2024-05")
 
-        with patch("controllers.compras_controller.exportar_compras_excel") as mock_export:
+        with patch.dict(os.environ, {"CAFE_EXPORTAR_EXCEL": "auto"}), patch(
+            "controllers.compras_controller.exportar_compras_excel"
+        ) as mock_export:
             compras_controller.eliminar_compra(compra.id)
             self.assertGreaterEqual(mock_export.call_count, 1)
 
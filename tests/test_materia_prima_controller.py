@@ -2,21 +2,27 @@ import os
 import json
 import tempfile
 import unittest
+from unittest.mock import patch
 
 from controllers import materia_prima_controller as mp_controller
+from controllers import movimientos_stock_controller
+from utils.storage import AlmacenJSON
 
 
 class TestMateriaPrimaController(unittest.TestCase):
     def setUp(self):
         self.original_path = mp_controller.DATA_PATH
+        self.original_movimientos_path = movimientos_stock_controller.DATA_PATH
         self.temp_dir = tempfile.TemporaryDirectory()
         self.temp_file = os.path.join(self.temp_dir.name, "materias.json")
         with open(self.temp_file, "w", encoding="utf-8") as f:
             json.dump([], f)
         mp_controller.DATA_PATH = self.temp_file
+        movimientos_stock_controller.DATA_PATH = os.path.join(self.temp_dir.name, "movimientos_stock.json")
 
     def tearDown(self):
         mp_controller.DATA_PATH = self.original_path
+        movimientos_stock_controller.DATA_PATH = self.original_movimientos_path
         self.temp_dir.cleanup()
 
     def test_validar_materia_prima_con_stock_minimo(self):
@@ -39,6 +45,47 @@ class TestMateriaPrimaController(unittest.TestCase):
         nombres = sorted(mp.nombre for mp in bajas)
         self.assertEqual(nombres, ["Azucar", "Cafe"])
 
+    def test_ajustar_stock_en_lote_escribe_una_vez(self):
+        cafe = mp_controller.agregar_materia_prima("Cafe", "kg", 10, 5)
+        azucar = mp_controller.agregar_materia_prima("Azucar", "kg", 10, 2)
+        journal = os.path.splitext(self.temp_file)[0] + ".journal"
+        with open(journal, encoding="utf-8") as f:
+            lineas = len(f.readlines())
+
+        mp_controller.ajustar_stock_materias_primas(
+            [(cafe.id, 3), (azucar.id, 1), (cafe.id, -1)]
+        )
+        with open(journal, encoding="utf-8") as f:
+            self.assertEqual(len(f.readlines()), lineas + 1)
+        mp_controller.clear_materias_cache()
+        stocks = {mp.nombre: mp.stock for mp in mp_controller.listar_materias_primas()}
+        self.assertEqual(stocks, {"Cafe": 7, "Azucar": 3})
+
+    def test_ajustar_stock_en_lote_valida_todos_los_ajustes(self):
+        cafe = mp_controller.agregar_materia_prima("Cafe", "kg", 10, 5)
+        azucar = mp_controller.agregar_materia_prima("Azucar", "kg", 10, 2)
+        with self.assertRaises(ValueError):
+            mp_controller.ajustar_stock_materias_primas({cafe.id: 1, azucar.id: -3})
+        self.assertEqual(mp_controller.obtener_materia_prima_por_id(cafe.id).stock, 5)
+
+        actualizadas = mp_controller.ajustar_stock_materias_primas(
+            {cafe.id: 1, azucar.id: -3, "no-existe": 1}, omitir_invalidos=True
+        )
+        self.assertEqual([mp.id for mp in actualizadas], [cafe.id])
+        self.assertEqual(mp_controller.obtener_materia_prima_por_id(cafe.id).stock, 6)
+        self.assertEqual(mp_controller.obtener_materia_prima_por_id(azucar.id).stock, 2)
+
+    def test_ajustar_stock_falla_si_no_se_guarda(self):
+        cafe = mp_controller.agregar_materia_prima("Cafe", "kg", 10, 5)
+        with patch.object(AlmacenJSON, "actualizar_varios", return_value=False), patch.object(
+            mp_controller, "registrar_movimientos"
+        ) as registrar:
+            with self.assertRaises(OSError):
+                mp_controller.ajustar_stock_materias_primas({cafe.id: 1})
+            registrar.assert_not_called()
+
+        self.assertEqual(mp_controller.ajustar_stock_materias_primas({cafe.id: 1}, solo_validar=True)[0].stock, 5)
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,130 @@
+import gc
+import json
+import tracemalloc
+import uuid
+
+from models.compra import Compra
+from models.ticket import ResumenTicket, Ticket
+
+# Memoria máxima de 100.000 líneas de venta cargadas como modelos, con sus
+# tickets (4 líneas por ticket). Con un ``__dict__`` por instancia y una copia
+# de cada id y nombre por línea ocupaban unos 51 MB.
+PRESUPUESTO_100K_LINEAS = 30 * 1024 * 1024
+
+
+def _tickets_json(cantidad_tickets, lineas_por_ticket=4):
+    productos = [(str(uuid.uuid4()), f"Producto {i}") for i in range(80)]
+    tickets = []
+    for i in range(cantidad_tickets):
+        fecha = f"2024-01-{i % 28 + 1:02d} 10:{i % 60:02d}:00"
+        items = []
+        for j in range(lineas_por_ticket):
+            producto_id, nombre = productos[(i + j) % len(productos)]
+            items.append(
+                {
+                    "fecha_item": fecha,
+                    "producto_id": producto_id,
+                    "nombre_producto": nombre,
+                    "cantidad": 2,
+                    "precio_unitario": 1500,
+                }
+            )
+        tickets.append({"id": str(uuid.uuid4()), "fecha": fecha, "cliente": "Ana", "items_venta": items})
+    return json.dumps(tickets)
+
+
+def test_lineas_comparten_ids_y_nombres():
+    tickets = [Ticket.from_dict(t) for t in json.loads(_tickets_json(100, 1))]
+    primero, otro = tickets[0].items_venta[0], tickets[80].items_venta[0]
+    assert primero.producto_id == otro.producto_id
+    assert primero.producto_id is otro.producto_id
+    assert primero.nombre_producto is otro.nombre_producto
+    assert primero.fecha_item is tickets[0].fecha
+    assert not hasattr(primero, "__dict__")
+    assert not hasattr(tickets[0], "__dict__")
+
+
+def test_compra_comparte_fecha_con_sus_items():
+    compra = Compra.from_dict(
+        json.loads(
+            json.dumps(
+                {
+                    "id": "c1",
+                    "fecha": "2024-03-10 09:00:00",
+                    "proveedor_id": "prov",
+                    "items_compra": [
+                        {
+                            "fecha_item": "2024-03-10 09:00:00",
+                            "producto_id": "m1",
+                            "nombre_producto": "Cafe",
+                            "cantidad": 5,
+                            "costo_unitario": 100,
+                        }
+                    ],
+                }
+            )
+        )
+    )
+    assert compra.items_compra[0].fecha_item is compra.fecha
+    assert compra.total == 500
+
+
+def test_presupuesto_de_memoria_por_100k_lineas():
+    # Se mide un cuarto del volumen para que la prueba sea rápida.
+    texto = _tickets_json(6250)
+    gc.collect()
+    tracemalloc.start()
+    try:
+        datos = json.loads(texto)
+        tickets = [Ticket.from_dict(t) for t in datos]
+        # Con los ítems construidos se liberan los diccionarios leídos.
+        for ticket in tickets:
+            ticket.items_venta
+        del datos
+        gc.collect()
+        usada, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    lineas = sum(len(t.items_venta) for t in tickets)
+    assert lineas == 25000
+    assert usada * 100000 / lineas < PRESUPUESTO_100K_LINEAS
+
+
+def test_items_se_construyen_al_acceder(monkeypatch):
+    from models import venta_detalle
+
+    construidos = []
+    original = venta_detalle.VentaDetalle.from_dict
+    monkeypatch.setattr(
+        venta_detalle.VentaDetalle,
+        "from_dict",
+        staticmethod(lambda data: construidos.append(data) or original(data)),
+    )
+    ticket = Ticket.from_dict(json.loads(_tickets_json(1))[0])
+    assert (ticket.cliente, ticket.total) == ("Ana", 12000)
+    assert construidos == []
+
+    assert [item.total for item in ticket.items_venta] == [3000] * 4
+    assert ticket.items_venta[0].fecha_item is ticket.fecha
+    assert len(construidos) == 4
+    ticket.to_dict()
+    assert len(construidos) == 4
+
+
+def test_total_guardado_o_verificado():
+    datos = json.loads(_tickets_json(1))[0]
+    assert Ticket.from_dict(datos).total == 12000
+
+    datos["total"] = 1
+    for clase in (Ticket, ResumenTicket):
+        assert clase.from_dict(datos).total == 1
+        assert clase.from_dict(datos, verificar_total=True).total == 12000
+    del datos["total"]
+    assert Ticket.from_dict(datos).total == ResumenTicket.from_dict(datos).total == 12000
+
+
+def test_items_venta_nulos():
+    datos = {"id": "t1", "fecha": "2024-01-05 10:00:00", "cliente": "Ana", "items_venta": None}
+    resumen = ResumenTicket.from_dict(datos)
+    assert resumen.items_venta == ()
+    assert resumen.total == 0
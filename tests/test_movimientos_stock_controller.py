@@ -0,0 +1,131 @@
+import json
+
+import pytest
+
+from controllers import (
+    compras_controller,
+    materia_prima_controller,
+    movimientos_stock_controller,
+    recetas_controller,
+    tickets_controller,
+)
+from models.compra_detalle import CompraDetalle
+from models.proveedor import Proveedor
+from models.venta_detalle import VentaDetalle
+from utils import storage
+from utils.cache_utils import REPOSITORIOS
+from utils.rollup_utils import rollup_path
+
+
+@pytest.fixture(params=["json", "sqlite"])
+def datos(request, monkeypatch, tmp_path):
+    monkeypatch.setenv("CAFE_STORAGE_BACKEND", request.param)
+    monkeypatch.setattr(storage, "_ALMACENES", {})
+    monkeypatch.setattr(tickets_controller, "DATA_PATH", str(tmp_path / "tickets.json"))
+    monkeypatch.setattr(compras_controller, "DATA_PATH", str(tmp_path / "compras.json"))
+    monkeypatch.setattr(materia_prima_controller, "DATA_PATH", str(tmp_path / "materias_primas.json"))
+    monkeypatch.setattr(recetas_controller, "DATA_PATH", str(tmp_path / "recetas.json"))
+    monkeypatch.setattr(
+        movimientos_stock_controller, "DATA_PATH", str(tmp_path / "movimientos_stock.json")
+    )
+    movimientos_stock_controller.SALDOS_MOVIMIENTOS.invalidar()
+    REPOSITORIOS.invalidar()
+    with open(recetas_controller.DATA_PATH, "w", encoding="utf-8") as f:
+        json.dump(
+            [
+                {
+                    "id": "r1",
+                    "producto_id": "p1",
+                    "nombre_producto": "Espresso",
+                    "ingredientes": [{"materia_prima_id": "m1", "cantidad_necesaria": 1}],
+                    "rendimiento": 1,
+                }
+            ],
+            f,
+        )
+    yield tmp_path
+    REPOSITORIOS.invalidar()
+
+
+def _historial(datos):
+    mp = materia_prima_controller.agregar_materia_prima("Cafe", "kg", 100, 10)
+    REPOSITORIOS.invalidar(recetas_controller.DATA_PATH)
+    recetas = json.loads((datos / "recetas.json").read_text(encoding="utf-8"))
+    recetas[0]["ingredientes"][0]["materia_prima_id"] = mp.id
+    (datos / "recetas.json").write_text(json.dumps(recetas), encoding="utf-8")
+
+    compra = compras_controller.registrar_compra(
+        Proveedor("Prov"), [CompraDetalle(mp.id, "Cafe", 5, 100)], fecha="2024-02-10 09:00:00"
+    )
+    tickets_controller.registrar_ticket(
+        "Ana", [VentaDetalle("p1", "Espresso", 3, 1000)], fecha="2024-03-05 08:00:00"
+    )
+    tickets_controller.registrar_ticket(
+        "Bob", [VentaDetalle("p1", "Espresso", 2, 1000)], fecha="2024-03-20 08:00:00"
+    )
+    materia_prima_controller.establecer_stock_materia_prima(mp.id, 12)
+    return mp, compra
+
+
+def test_movimientos_por_origen(datos):
+    mp, compra = _historial(datos)
+    movimientos = movimientos_stock_controller.movimientos_materia_prima(mp.id)
+    assert [(m.tipo, m.cantidad) for m in movimientos] == [
+        ("compra", 5),
+        ("venta", -3),
+        ("venta", -2),
+        ("ajuste", 10),
+        ("ajuste", 2),
+    ]
+    assert movimientos[0].referencia == compra.id
+
+    compras_controller.eliminar_compra(compra.id)
+    ultimo = movimientos_stock_controller.movimientos_materia_prima(mp.id)[-1]
+    assert (ultimo.tipo, ultimo.cantidad, ultimo.referencia) == ("reversion", -5, compra.id)
+
+
+def test_stock_a_fecha(datos):
+    mp, _ = _historial(datos)
+    # El alta con stock inicial se registró hoy: antes el stock era 0.
+    assert materia_prima_controller.stock_a_fecha(mp.id, "2024-01-31") == 0
+    assert materia_prima_controller.stock_a_fecha(mp.id, "2024-02-10") == 5
+    assert materia_prima_controller.stock_a_fecha(mp.id, "2024-03-05 08:00:00") == 2
+    assert materia_prima_controller.stock_a_fecha(mp.id, "2024-03-31") == 0
+    assert materia_prima_controller.stock_a_fecha(mp.id, "2999-01-01") == 12
+
+    # Los checkpoints persisten y se reconstruyen si el libro cambia por fuera.
+    ruta = rollup_path(movimientos_stock_controller.DATA_PATH)
+    with open(ruta, encoding="utf-8") as f:
+        assert json.load(f)["saldos"][mp.id]["2024-03"] == -5
+    storage.obtener_almacen().agregar(
+        movimientos_stock_controller.DATA_PATH,
+        {"id": "x", "materia_prima_id": mp.id, "tipo": "ajuste", "cantidad": 1, "fecha": "2024-01-01 00:00:00"},
+    )
+    assert materia_prima_controller.stock_a_fecha(mp.id, "2024-01-31") == 0
+    assert materia_prima_controller.stock_a_fecha(mp.id, "2024-02-29") == 5
+
+
+def test_rango_con_libro_en_cache_lee_solo_el_mes(datos, monkeypatch):
+    mp, _ = _historial(datos)
+    movimientos_stock_controller.cargar_movimientos()
+    assert REPOSITORIOS.en_cache(movimientos_stock_controller.DATA_PATH)
+
+    almacen = storage.obtener_almacen()
+    rangos = []
+    original = type(almacen).rango
+
+    def espiar(self, path, inicio=None, fin=None):
+        rangos.append((inicio, fin))
+        return original(self, path, inicio, fin)
+
+    monkeypatch.setattr(type(almacen), "rango", espiar)
+    monkeypatch.setattr(
+        movimientos_stock_controller,
+        "cargar_movimientos",
+        lambda: pytest.fail("no debe recorrer el libro completo"),
+    )
+    marzo = movimientos_stock_controller.movimientos_materia_prima(
+        mp.id, "2024-03-01 00:00:00", "2024-03-31 23:59:59"
+    )
+    assert [m.cantidad for m in marzo] == [-3, -2]
+    assert rangos == [("2024-03-01 00:00:00", "2024-03-31 23:59:59")]
@@ -0,0 +1,120 @@
+import json
+import math
+
+import pytest
+
+from controllers import materia_prima_controller
+from controllers import pronostico_stock_controller
+from controllers import recetas_controller
+from controllers import tickets_controller
+from utils.cache_utils import REPOSITORIOS
+
+
+def _write(path, data):
+    path.write_text(json.dumps(data), encoding="utf-8")
+
+
+def _ticket(id, fecha, items):
+    return {
+        "id": id,
+        "fecha": fecha,
+        "cliente": "Ana",
+        "items_venta": [
+            {"producto_id": p, "nombre_producto": p, "cantidad": c, "precio_unitario": 1000}
+            for p, c in items
+        ],
+    }
+
+
+@pytest.fixture
+def datos(monkeypatch, tmp_path):
+    monkeypatch.setattr(materia_prima_controller, "DATA_PATH", str(tmp_path / "materias_primas.json"))
+    monkeypatch.setattr(recetas_controller, "DATA_PATH", str(tmp_path / "recetas.json"))
+    monkeypatch.setattr(tickets_controller, "DATA_PATH", str(tmp_path / "tickets.json"))
+    REPOSITORIOS.invalidar()
+    _write(
+        tmp_path / "materias_primas.json",
+        [
+            {"id": "m1", "nombre": "Cafe", "unidad_medida": "kg", "costo_unitario": 10, "stock": 30, "stock_minimo": 10},
+            {"id": "m2", "nombre": "Leche", "unidad_medida": "l", "costo_unitario": 4, "stock": 3, "stock_minimo": 5},
+            {"id": "m3", "nombre": "Azucar", "unidad_medida": "kg", "costo_unitario": 4, "stock": 8},
+        ],
+    )
+    _write(
+        tmp_path / "recetas.json",
+        [
+            {
+                "id": "r1",
+                "producto_id": "p1",
+                "nombre_producto": "Espresso",
+                "ingredientes": [{"materia_prima_id": "m1", "cantidad_necesaria": 1}],
+                "rendimiento": 1,
+            },
+            {
+                "id": "r2",
+                "producto_id": "p2",
+                "nombre_producto": "Cortado",
+                "ingredientes": [
+                    {"materia_prima_id": "m1", "cantidad_necesaria": 1},
+                    {"materia_prima_id": "m2", "cantidad_necesaria": 0.5},
+                ],
+                "rendimiento": 1,
+            },
+        ],
+    )
+    _write(
+        tmp_path / "tickets.json",
+        [
+            # Fuera del período: no cuenta.
+            _ticket("t0", "2023-01-01 10:00:00", [("p1", 100)]),
+            _ticket("t1", "2024-03-01 10:00:00", [("p1", 2), ("p2", 2)]),
+            _ticket("t2", "2024-03-05 10:00:00", [("p2", 2), ("sin_receta", 3)]),
+        ],
+    )
+    yield
+    REPOSITORIOS.invalidar()
+
+
+def test_consumo_diario(datos):
+    consumo = pronostico_stock_controller.consumo_diario_materias(dias_historial=30, hoy="2024-03-05")
+    # Cinco días desde la primera venta del período.
+    assert consumo == pytest.approx({"m1": 6 / 5, "m2": 2 / 5})
+
+
+def test_pronostico_de_quiebres(datos):
+    pronosticos = pronostico_stock_controller.pronosticar_quiebres(
+        dias_historial=30, dias_cobertura=10, hoy="2024-03-05"
+    )
+    assert [p.materia_prima_id for p in pronosticos] == ["m2", "m1", "m3"]
+    leche, cafe, azucar = pronosticos
+
+    assert leche.dias_hasta_minimo == 0
+    assert leche.dias_hasta_quiebre == pytest.approx(7.5)
+    assert leche.fecha_quiebre == "2024-03-12"
+    assert leche.cantidad_sugerida == pytest.approx(0.4 * 10 + 5 - 3)
+
+    assert cafe.dias_hasta_minimo == pytest.approx(20 / 1.2)
+    assert cafe.fecha_minimo == "2024-03-21"
+    assert cafe.cantidad_sugerida == 0
+
+    assert azucar.consumo_diario == 0
+    assert math.isinf(azucar.dias_hasta_quiebre)
+    assert azucar.fecha_quiebre is None
+
+
+def test_sin_ventas(datos):
+    pronosticos = pronostico_stock_controller.pronosticar_quiebres(hoy="2020-01-01")
+    assert all(p.consumo_diario == 0 for p in pronosticos)
+    # Leche ya está bajo el mínimo aunque no se consuma.
+    assert {p.materia_prima_id: p.cantidad_sugerida for p in pronosticos}["m2"] == 2
+
+
+def test_consumo_infimo_no_desborda_la_fecha(datos, tmp_path):
+    _write(
+        tmp_path / "materias_primas.json",
+        [{"id": "m1", "nombre": "Cafe", "unidad_medida": "kg", "costo_unitario": 10, "stock": 1e12}],
+    )
+    REPOSITORIOS.invalidar()
+    (cafe,) = pronostico_stock_controller.pronosticar_quiebres(dias_historial=30, hoy="2024-03-05")
+    assert cafe.dias_hasta_quiebre == pytest.approx(1e12 / 1.2)
+    assert cafe.fecha_quiebre is None
@@ -0,0 +1,129 @@
+import json
+
+import pytest
+
+from controllers import (
+    compras_controller,
+    gastos_adicionales_controller,
+    materia_prima_controller,
+    recetas_controller,
+    tickets_controller,
+)
+from models.compra_detalle import CompraDetalle
+from models.gasto_adicional import GastoAdicional
+from models.proveedor import Proveedor
+from models.ticket import Ticket
+from models.venta_detalle import VentaDetalle
+from utils import storage
+from utils.cache_utils import REPOSITORIOS
+from utils.rollup_utils import RollupPeriodos, claves_periodo, rollup_path
+
+
+@pytest.fixture(params=["json", "sqlite"])
+def backend(request, monkeypatch, tmp_path):
+    monkeypatch.setenv("CAFE_STORAGE_BACKEND", request.param)
+    monkeypatch.setattr(storage, "_ALMACENES", {})
+    REPOSITORIOS.invalidar()
+    yield tmp_path
+    REPOSITORIOS.invalidar()
+
+
+class _Cargador:
+    def __init__(self, entidades):
+        self.entidades = entidades
+        self.llamadas = 0
+
+    def __call__(self):
+        self.llamadas += 1
+        return self.entidades
+
+
+def _ticket(total, fecha):
+    return Ticket(cliente="C", items_venta=[VentaDetalle("p1", "Prod", 1, total)], fecha=fecha)
+
+
+def test_claves_periodo():
+    assert claves_periodo("2024-12-30 10:00:00") == {
+        "mes": "2024-12",
+        "semana": "2025-W01",
+        "dia": "2024-12-30",
+    }
+    assert claves_periodo("sin fecha") is None
+
+
+def test_altas_y_bajas_no_recorren_la_coleccion(backend):
+    path = str(backend / "tickets.json")
+    t1 = _ticket(10, "2024-01-05 10:00:00")
+    storage.obtener_almacen().agregar(path, t1.to_dict())
+    cargar = _Cargador([t1])
+    rollup = RollupPeriodos(lambda t: t.total)
+    assert rollup.totales(path, cargar, "mes") == {"2024-01": 10}
+    assert cargar.llamadas == 1
+
+    t2 = _ticket(5, "2024-02-01 09:00:00")
+    rollup.aplicar(path, lambda: storage.obtener_almacen().agregar(path, t2.to_dict()), sumar=[t2])
+    rollup.aplicar(path, lambda: storage.obtener_almacen().eliminar(path, t1.id), restar=[t1])
+    assert rollup.totales(path, cargar, "mes") == {"2024-02": 5}
+    assert rollup.totales(path, cargar, "dia") == {"2024-02-01": 5}
+    assert cargar.llamadas == 1
+
+    # Otra instancia (otro proceso) reutiliza los acumulados guardados.
+    otro = RollupPeriodos(lambda t: t.total)
+    assert otro.totales(path, cargar, "semana") == {"2024-W05": 5}
+    assert cargar.llamadas == 1
+
+
+def test_cambio_externo_reconstruye(backend):
+    path = str(backend / "gastos_adicionales.json")
+    rollup = RollupPeriodos(lambda ga: ga.monto)
+    cargar = _Cargador([])
+    assert rollup.totales(path, cargar, "mes") == {}
+
+    storage.obtener_almacen().agregar(path, {"id": "g1", "monto": 3, "fecha": "2024-03-01 00:00:00"})
+    gasto = GastoAdicional.from_dict(
+        {"id": "g1", "nombre": "Luz", "monto": 3, "fecha": "2024-03-01 00:00:00"}
+    )
+    cargar.entidades = [gasto]
+    assert rollup.totales(path, cargar, "mes") == {"2024-03": 3}
+    assert cargar.llamadas == 2
+
+
+def test_controladores_mantienen_acumulados(backend, monkeypatch):
+    monkeypatch.setattr(tickets_controller, "DATA_PATH", str(backend / "tickets.json"))
+    monkeypatch.setattr(materia_prima_controller, "DATA_PATH", str(backend / "materias_primas.json"))
+    monkeypatch.setattr(recetas_controller, "DATA_PATH", str(backend / "recetas.json"))
+    monkeypatch.setattr(compras_controller, "DATA_PATH", str(backend / "compras.json"))
+    monkeypatch.setattr(compras_controller, "ajustar_stock_materias_primas", lambda *a, **k: [])
+    monkeypatch.setattr(
+        gastos_adicionales_controller, "DATA_PATH", str(backend / "gastos_adicionales.json")
+    )
+
+    assert tickets_controller.obtener_ventas_por_mes() == {}
+    ticket = tickets_controller.registrar_ticket(
+        "Ana", [VentaDetalle("p1", "Prod", 2, 1500)], fecha="2024-05-02 08:00:00"
+    )
+    assert tickets_controller.obtener_ventas_por_mes() == {"2024-05": 3000}
+    assert tickets_controller.obtener_ventas_por_dia() == [("2024-05-02", "Gs 3.000")]
+    tickets_controller.eliminar_ticket(ticket.id)
+    assert tickets_controller.obtener_ventas_por_semana() == {}
+
+    assert compras_controller.obtener_compras_por_mes() == []
+    compra = compras_controller.registrar_compra(
+        Proveedor("Prov"), [CompraDetalle("m1", "Harina", 2, 1000)], fecha="2024-05-03 10:00:00"
+    )
+    assert compras_controller.obtener_compras_por_mes() == [("2024-05", "Gs 2.000")]
+    compras_controller.eliminar_compra(compra.id)
+    assert compras_controller.obtener_compras_por_dia() == []
+
+    assert gastos_adicionales_controller.obtener_gastos_adicionales_por_mes() == []
+    gasto = gastos_adicionales_controller.agregar_gasto_adicional(
+        "Luz", 500, fecha="2024-05-04 10:00:00"
+    )
+    assert gastos_adicionales_controller.obtener_gastos_adicionales_por_semana() == [
+        ("2024-W18", "Gs 500")
+    ]
+    gastos_adicionales_controller.eliminar_gasto_adicional(gasto.id)
+    assert gastos_adicionales_controller.obtener_gastos_adicionales_por_dia() == []
+
+    with open(rollup_path(tickets_controller.DATA_PATH), encoding="utf-8") as f:
+        assert json.load(f)["periodos"]["mes"] == {}
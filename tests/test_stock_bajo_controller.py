@@ -0,0 +1,78 @@
+import pytest
+
+from controllers import materia_prima_controller
+from controllers import movimientos_stock_controller
+from controllers import stock_bajo_controller
+from utils.storage import obtener_almacen
+
+
+@pytest.fixture
+def datos(monkeypatch, tmp_path):
+    monkeypatch.setattr(materia_prima_controller, "DATA_PATH", str(tmp_path / "materias_primas.json"))
+    monkeypatch.setattr(movimientos_stock_controller, "DATA_PATH", str(tmp_path / "movimientos_stock.json"))
+    monkeypatch.setattr(stock_bajo_controller, "INDICE_STOCK_BAJO", stock_bajo_controller.IndiceStockBajo())
+    monkeypatch.setattr(materia_prima_controller, "INDICE_STOCK_BAJO", stock_bajo_controller.INDICE_STOCK_BAJO)
+    cruces = []
+    cancelar = stock_bajo_controller.suscribir_stock_bajo(cruces.append)
+    yield cruces
+    cancelar()
+
+
+def test_cruces_al_ajustar_stock(datos):
+    cafe = materia_prima_controller.agregar_materia_prima("Cafe", "kg", 10, 5, 2)
+    azucar = materia_prima_controller.agregar_materia_prima("Azucar", "kg", 10, 1, 1)
+    # Un alta ya en el mínimo no es un cruce, pero figura en el índice.
+    assert datos == []
+    assert [mp.id for mp in materia_prima_controller.materias_con_stock_bajo()] == [azucar.id]
+
+    materia_prima_controller.ajustar_stock_materias_primas({cafe.id: -3, azucar.id: 4})
+    assert [(c.materia_prima_id, c.bajo, c.stock) for c in datos] == [
+        (cafe.id, True, 2),
+        (azucar.id, False, 5),
+    ]
+    materia_prima_controller.actualizar_stock_materia_prima(cafe.id, -1)
+    assert len(datos) == 2
+    assert [mp.id for mp in materia_prima_controller.materias_con_stock_bajo()] == [cafe.id]
+    assert stock_bajo_controller.cruces_stock_bajo() == datos
+
+    materia_prima_controller.editar_materia_prima(cafe.id, "Cafe", "kg", 10, 1, 0)
+    assert (datos[-1].materia_prima_id, datos[-1].bajo) == (cafe.id, False)
+    assert materia_prima_controller.materias_con_stock_bajo() == []
+
+
+def test_consulta_no_recorre_la_coleccion(datos, monkeypatch):
+    cafe = materia_prima_controller.agregar_materia_prima("Cafe", "kg", 10, 5, 2)
+    materia_prima_controller.materias_con_stock_bajo()
+    evaluadas = []
+    original = stock_bajo_controller.IndiceStockBajo._aplicar
+
+    def espiar(self, materias):
+        evaluadas.append(len(materias))
+        return original(self, materias)
+
+    monkeypatch.setattr(stock_bajo_controller.IndiceStockBajo, "_aplicar", espiar)
+    materia_prima_controller.ajustar_stock_materias_primas({cafe.id: -4}, persistir=False)
+    assert [mp.id for mp in materia_prima_controller.materias_con_stock_bajo()] == [cafe.id]
+    assert evaluadas == [1]
+
+
+def test_cambio_externo_reconstruye_con_cruces(datos):
+    cafe = materia_prima_controller.agregar_materia_prima("Cafe", "kg", 10, 5, 2)
+    materia_prima_controller.materias_con_stock_bajo()
+    # Escritura directa al almacén, sin pasar por el controlador.
+    obtener_almacen().actualizar(materia_prima_controller.DATA_PATH, dict(cafe.to_dict(), stock=0))
+
+    assert [mp.id for mp in materia_prima_controller.materias_con_stock_bajo()] == [cafe.id]
+    assert [(c.materia_prima_id, c.bajo) for c in datos] == [(cafe.id, True)]
+
+
+def test_suscriptor_con_error_no_interrumpe(datos):
+    def fallar(cruce):
+        raise RuntimeError("falla")
+
+    cancelar = stock_bajo_controller.suscribir_stock_bajo(fallar)
+    cafe = materia_prima_controller.agregar_materia_prima("Cafe", "kg", 10, 5, 2)
+    materia_prima_controller.actualizar_stock_materia_prima(cafe.id, -4)
+    cancelar()
+    materia_prima_controller.actualizar_stock_materia_prima(cafe.id, 4)
+    assert [c.bajo for c in datos] == [True, False]
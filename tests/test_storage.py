@@ -0,0 +1,281 @@
+import json
+import sqlite3
+
+import pytest
+
+from controllers import proveedores_controller
+from utils import storage
+
+
+@pytest.fixture(params=["json", "sqlite"])
+def almacen(request, monkeypatch):
+    monkeypatch.setenv("CAFE_STORAGE_BACKEND", request.param)
+    monkeypatch.setattr(storage, "_ALMACENES", {})
+    return storage.obtener_almacen()
+
+
+def _ticket(id_, fecha, total=10):
+    return {"id": id_, "fecha": fecha, "cliente": "Ana", "items_venta": [], "total": total}
+
+
+def test_operaciones_por_registro(almacen, tmp_path):
+    path = str(tmp_path / "tickets.json")
+    almacen.agregar(path, _ticket("t1", "2024-01-05 10:00:00"))
+    almacen.agregar(path, _ticket("t2", "2024-02-05 10:00:00"))
+    almacen.agregar(path, _ticket("t3", "2024-03-05 10:00:00"))
+
+    assert almacen.obtener(path, "t2")["fecha"] == "2024-02-05 10:00:00"
+    assert almacen.obtener(path, "nada") is None
+
+    almacen.actualizar(path, _ticket("t2", "2024-02-05 10:00:00", total=99))
+    assert almacen.obtener(path, "t2")["total"] == 99
+
+    assert almacen.eliminar(path, "t1")
+    assert not almacen.eliminar(path, "t1")
+    assert [t["id"] for t in almacen.cargar(path)] == ["t2", "t3"]
+
+
+def test_actualizar_varios(almacen, tmp_path):
+    path = str(tmp_path / "materias_primas.json")
+    almacen.agregar(path, {"id": "m1", "stock": 1})
+    almacen.agregar(path, {"id": "m2", "stock": 2})
+    assert almacen.actualizar_varios(path, [{"id": "m1", "stock": 5}, {"id": "m3", "stock": 3}])
+    assert [(r["id"], r["stock"]) for r in almacen.cargar(path)] == [("m1", 5), ("m2", 2), ("m3", 3)]
+
+
+def test_rango_de_fechas(almacen, tmp_path):
+    path = str(tmp_path / "tickets.json")
+    almacen.guardar(
+        path,
+        [
+            _ticket("t1", "2024-01-31 23:59:59"),
+            _ticket("t2", "2024-02-01 00:00:00"),
+            _ticket("t3", "2024-02-29 10:00:00"),
+            _ticket("t4", "2024-03-01 00:00:00"),
+        ],
+    )
+    ids = [t["id"] for t in almacen.rango(path, "2024-02-01", "2024-02-29 23:59:59")]
+    assert ids == ["t2", "t3"]
+
+
+def test_buscar_por_clave_secundaria(almacen, tmp_path):
+    path = str(tmp_path / "recetas.json")
+    almacen.agregar(path, {"id": "r1", "producto_id": "p1", "ingredientes": []})
+    almacen.agregar(path, {"id": "r2", "producto_id": "p2", "ingredientes": []})
+    assert [r["id"] for r in almacen.buscar(path, "p2")] == ["r2"]
+
+
+def test_sqlite_migra_json_existente(tmp_path, monkeypatch):
+    monkeypatch.setattr(storage, "_ALMACENES", {})
+    path = tmp_path / "tickets.json"
+    path.write_text(json.dumps([_ticket("t1", "2024-01-05 10:00:00")]), encoding="utf-8")
+
+    resultado = storage.migrar_json_a_sqlite(str(tmp_path))
+    assert resultado["tickets"] == 1
+    # Una segunda migración no duplica los registros.
+    assert storage.migrar_json_a_sqlite(str(tmp_path))["tickets"] == 1
+
+    with sqlite3.connect(tmp_path / "cafe.db") as conexion:
+        indices = {fila[1] for fila in conexion.execute("PRAGMA index_list('tickets')")}
+    assert "idx_tickets_fecha" in indices
+
+
+def test_sqlite_migracion_fallida_se_reintenta(tmp_path, monkeypatch):
+    monkeypatch.setattr(storage, "_ALMACENES", {})
+    path = tmp_path / "tickets.json"
+    path.write_text(json.dumps([_ticket("t1", "2024-01-05 10:00:00")]), encoding="utf-8")
+    almacen = storage.AlmacenSQLite()
+
+    def fallar(conexion, tabla):
+        raise sqlite3.OperationalError("disco lleno")
+
+    with monkeypatch.context() as m:
+        m.setattr(storage.AlmacenSQLite, "_modificada", staticmethod(fallar))
+        with pytest.raises(sqlite3.Error):
+            almacen.cargar(str(path))
+    # La tabla no queda creada a medias.
+    with sqlite3.connect(tmp_path / "cafe.db") as conexion:
+        assert conexion.execute("SELECT name FROM sqlite_master WHERE name='tickets'").fetchone() is None
+    assert [t["id"] for t in almacen.cargar(str(path))] == ["t1"]
+
+    with monkeypatch.context() as m:
+        m.setattr(storage.AlmacenSQLite, "_modificada", staticmethod(fallar))
+        assert almacen.eliminar(str(path), "t1") is False
+    assert almacen.obtener(str(path), "t1") is not None
+
+
+def test_sqlite_actualizar_inexistente_agrega_en_una_transaccion(tmp_path, monkeypatch):
+    monkeypatch.setattr(storage, "_ALMACENES", {})
+    path = str(tmp_path / "materias_primas.json")
+    almacen = storage.AlmacenSQLite()
+    almacen.agregar(path, {"id": "m1", "stock": 1})
+    modificaciones = []
+    original = storage.AlmacenSQLite._modificada
+
+    def contar(conexion, tabla):
+        modificaciones.append(tabla)
+        original(conexion, tabla)
+
+    monkeypatch.setattr(storage.AlmacenSQLite, "_modificada", staticmethod(contar))
+    monkeypatch.setattr(
+        storage.AlmacenSQLite, "agregar", lambda *a: pytest.fail("debe agregar en la misma transacción")
+    )
+    assert almacen.actualizar(path, {"id": "m2", "stock": 2})
+
+    assert modificaciones == ["materias_primas"]
+    assert [(r["id"], r["stock"]) for r in almacen.cargar(path)] == [("m1", 1), ("m2", 2)]
+
+
+def test_controlador_sobre_sqlite(tmp_path, monkeypatch):
+    monkeypatch.setenv("CAFE_STORAGE_BACKEND", "sqlite")
+    monkeypatch.setattr(storage, "_ALMACENES", {})
+    monkeypatch.setattr(proveedores_controller, "DATA_PATH", str(tmp_path / "proveedores.json"))
+
+    prov = proveedores_controller.agregar_proveedor("Prov1", "c")
+    proveedores_controller.editar_proveedor(prov.id, "Nuevo", "x")
+
+    assert proveedores_controller.obtener_proveedor_por_id(prov.id).nombre == "Nuevo"
+    assert not (tmp_path / "proveedores.json").exists()
+    proveedores_controller.eliminar_proveedor(prov.id)
+    assert proveedores_controller.listar_proveedores() == []
+
+
+def test_meses_disponibles(almacen, tmp_path):
+    path = str(tmp_path / "tickets.json")
+    almacen.agregar(path, _ticket("t1", "2024-03-05 10:00:00"))
+    almacen.agregar(path, _ticket("t2", "2024-01-05 10:00:00"))
+    almacen.agregar(path, _ticket("t3", "2024-03-09 10:00:00"))
+    assert almacen.meses(path) == ["2024-01", "2024-03"]
+
+
+def _json(monkeypatch):
+    monkeypatch.setenv("CAFE_STORAGE_BACKEND", "json")
+    monkeypatch.setattr(storage, "_ALMACENES", {})
+    return storage.obtener_almacen()
+
+
+def test_particiones_mensuales_de_tickets(tmp_path, monkeypatch):
+    almacen = _json(monkeypatch)
+    path = str(tmp_path / "tickets.json")
+    almacen.guardar(
+        path,
+        [
+            _ticket("t1", "2024-01-31 23:59:59"),
+            _ticket("t2", "2024-02-01 00:00:00"),
+            _ticket("t3", "2024-03-01 00:00:00"),
+        ],
+    )
+    particiones = tmp_path / "tickets"
+    assert sorted(p.name for p in particiones.iterdir()) == [
+        "2024-01.json", "2024-02.json", "2024-03.json", "history", "manifest.json",
+    ]
+
+    leidas = []
+    original = storage.AlmacenJSON._leer_particion
+
+    def espiar(self, path, mes):
+        leidas.append(mes)
+        return original(self, path, mes)
+
+    monkeypatch.setattr(storage.AlmacenJSON, "_leer_particion", espiar)
+    ids = [t["id"] for t in almacen.rango(path, "2024-02-01", "2024-02-29 23:59:59")]
+    assert ids == ["t2"]
+    assert leidas == ["2024-02"]
+
+
+def test_manifest_solo_cambia_con_meses_nuevos(tmp_path, monkeypatch):
+    almacen = _json(monkeypatch)
+    path = str(tmp_path / "tickets.json")
+    manifest = tmp_path / "tickets" / "manifest.json"
+
+    almacen.agregar(path, _ticket("t1", "2024-01-05 10:00:00"))
+    inode = manifest.stat().st_ino
+    almacen.agregar(path, _ticket("t2", "2024-01-06 10:00:00"))
+    assert manifest.stat().st_ino == inode
+    almacen.agregar(path, _ticket("t3", "2024-02-06 10:00:00"))
+    assert json.loads(manifest.read_text(encoding="utf-8"))["meses"] == ["2024-01", "2024-02"]
+
+
+def test_compactacion_reescribe_solo_meses_tocados(tmp_path, monkeypatch):
+    almacen = _json(monkeypatch)
+    path = str(tmp_path / "tickets.json")
+    almacen.guardar(path, [_ticket("t1", "2024-01-05 10:00:00"), _ticket("t2", "2024-02-05 10:00:00")])
+    enero = tmp_path / "tickets" / "2024-01.json"
+    mtime_enero = enero.stat().st_mtime_ns
+
+    almacen.agregar(path, _ticket("t3", "2024-02-09 10:00:00"))
+    assert almacen.eliminar(path, "t2")
+    assert almacen.compactar(path)
+
+    assert enero.stat().st_mtime_ns == mtime_enero
+    febrero = json.loads((tmp_path / "tickets" / "2024-02.json").read_text(encoding="utf-8"))
+    assert [t["id"] for t in febrero] == ["t3"]
+    assert [t["id"] for t in almacen.cargar(path)] == ["t1", "t3"]
+
+
+def test_snapshot_heredado_se_migra_a_particiones(tmp_path, monkeypatch):
+    almacen = _json(monkeypatch)
+    path = tmp_path / "tickets.json"
+    path.write_text(
+        json.dumps([_ticket("t1", "2024-01-05 10:00:00"), _ticket("t2", "2024-02-05 10:00:00")]),
+        encoding="utf-8",
+    )
+    assert almacen.meses(str(path)) == ["2024-01", "2024-02"]
+    assert [t["id"] for t in almacen.rango(str(path), "2024-02-01", "2024-02-28")] == ["t2"]
+
+    assert almacen.compactar(str(path))
+    assert not path.exists()
+    assert [t["id"] for t in almacen.cargar(str(path))] == ["t1", "t2"]
+    assert almacen.meses(str(path)) == ["2024-01", "2024-02"]
+
+
+@pytest.mark.parametrize("coleccion", ["tickets", "compras"])
+def test_iterar_equivale_a_cargar(almacen, tmp_path, monkeypatch, coleccion):
+    monkeypatch.setattr(storage, "LOTE_ITERACION", 2)
+    path = str(tmp_path / f"{coleccion}.json")
+    almacen.guardar(path, [_ticket(f"t{i}", f"2024-0{i % 3 + 1}-05 10:00:00") for i in range(7)])
+    # Cambios en el journal: baja, edición, cambio de mes y alta.
+    almacen.eliminar(path, "t1")
+    almacen.actualizar(path, _ticket("t2", "2024-03-05 10:00:00", total=99))
+    almacen.actualizar(path, _ticket("t3", "2024-02-20 10:00:00"))
+    almacen.agregar(path, _ticket("t9", "2024-02-10 10:00:00"))
+
+    def por_id(registros):
+        return sorted((t["id"], t["fecha"], t["total"]) for t in registros)
+
+    assert por_id(almacen.iterar(path)) == por_id(almacen.cargar(path))
+    assert por_id(almacen.iterar(path, "2024-02-01", "2024-02-29 23:59:59")) == por_id(
+        almacen.rango(path, "2024-02-01", "2024-02-29 23:59:59")
+    )
+
+
+def test_iterar_snapshot_por_bloques(tmp_path, monkeypatch):
+    from utils.json_utils import iter_json
+
+    path = tmp_path / "compras.json"
+    registros = [dict(_ticket(f"t{i}", "2024-01-05 10:00:00"), total=i + 0.5) for i in range(30)]
+    path.write_text(json.dumps(registros, indent=4), encoding="utf-8")
+    for tamano_bloque in (1, 7, 1 << 16):
+        assert list(iter_json(str(path), tamano_bloque)) == registros
+
+    path.write_text(json.dumps(registros)[:-40], encoding="utf-8")
+    assert 0 < len(list(iter_json(str(path)))) < len(registros)
+
+
+def test_respaldar_compacta_y_copia_todo(tmp_path, monkeypatch):
+    almacen = _json(monkeypatch)
+    datos = tmp_path / "data"
+    almacen.guardar(str(datos / "productos.json"), [{"id": "p1"}])
+    almacen.agregar(str(datos / "productos.json"), {"id": "p2"})
+    almacen.agregar(str(datos / "tickets.json"), _ticket("t1", "2024-01-05 10:00:00"))
+    (datos / "backups").mkdir()
+
+    destino = storage.respaldar(str(tmp_path / "respaldo"), str(datos))
+
+    respaldo = tmp_path / "respaldo"
+    assert destino == str(respaldo)
+    assert not (respaldo / "backups").exists()
+    assert not (respaldo / "productos.journal").read_text()
+    assert [r["id"] for r in json.loads((respaldo / "productos.json").read_text())] == ["p1", "p2"]
+    assert [t["id"] for t in almacen.cargar(str(respaldo / "tickets.json"))] == ["t1"]
+    assert (respaldo / "tickets" / "2024-01.json").exists()
@@ -1,10 +1,19 @@
 import os
 import json
+import sys
 import tempfile
 import unittest
+from types import SimpleNamespace
+from unittest.mock import Mock, patch
 
-from controllers import tickets_controller
-from models.ticket import Ticket
+from controllers import (
+    materia_prima_controller,
+    movimientos_stock_controller,
+    productos_controller,
+    recetas_controller,
+    tickets_controller,
+)
+from models.ticket import ResumenTicket, Ticket
 from models.venta_detalle import VentaDetalle
 
 
@@ -35,6 +44,274 @@ class TestObtenerVentasPorProducto(unittest.TestCase):
         ventas = tickets_controller.obtener_ventas_por_producto()
         self.assertEqual(ventas, {1: 30.0, 2: 5.0})
 
+    def test_agregados_sin_cargar_los_tickets(self):
+        with patch("controllers.tickets_controller._leer_tickets") as leer:
+            tickets = list(tickets_controller.iterar_tickets())
+            self.assertEqual(tickets_controller.total_vendido_tickets(), 35)
+            self.assertEqual(tickets_controller.obtener_ventas_por_producto(), {1: 30.0, 2: 5.0})
+            leer.assert_not_called()
+        self.assertIsInstance(tickets[0], ResumenTicket)
+        self.assertEqual([t.total for t in tickets], [25, 10])
+        self.assertEqual(tickets[0].items_venta[0].total, 20)
+
+
+class TestJournalTickets(unittest.TestCase):
+    def setUp(self):
+        self.original_paths = (
+            tickets_controller.DATA_PATH,
+            materia_prima_controller.DATA_PATH,
+            recetas_controller.DATA_PATH,
+            movimientos_stock_controller.DATA_PATH,
+        )
+        self.temp_dir = tempfile.TemporaryDirectory()
+        tickets_controller.DATA_PATH = os.path.join(self.temp_dir.name, "tickets.json")
+        materia_prima_controller.DATA_PATH = os.path.join(self.temp_dir.name, "materias_primas.json")
+        recetas_controller.DATA_PATH = os.path.join(self.temp_dir.name, "recetas.json")
+        movimientos_stock_controller.DATA_PATH = os.path.join(self.temp_dir.name, "movimientos_stock.json")
+        materia_prima_controller.clear_materias_cache()
+
+        ticket = Ticket(cliente="Alice", items_venta=[VentaDetalle("p1", "Cafe", 1, 10)])
+        with open(tickets_controller.DATA_PATH, "w", encoding="utf-8") as f:
+            json.dump([ticket.to_dict()], f)
+        self.journal = os.path.splitext(tickets_controller.DATA_PATH)[0] + ".journal"
+
+    def tearDown(self):
+        (
+            tickets_controller.DATA_PATH,
+            materia_prima_controller.DATA_PATH,
+            recetas_controller.DATA_PATH,
+            movimientos_stock_controller.DATA_PATH,
+        ) = self.original_paths
+        materia_prima_controller.clear_materias_cache()
+        self.temp_dir.cleanup()
+
+    def _snapshot(self):
+        with open(tickets_controller.DATA_PATH, encoding="utf-8") as f:
+            return json.load(f)
+
+    def test_registrar_ticket_anexa_sin_reescribir_snapshot(self):
+        nuevo = tickets_controller.registrar_ticket("Bob", [VentaDetalle("p2", "Te", 2, 5)])
+        self.assertEqual(len(self._snapshot()), 1)
+        with open(self.journal, encoding="utf-8") as f:
+            self.assertEqual(len(f.readlines()), 1)
+        tickets = tickets_controller.listar_tickets()
+        self.assertEqual([t.cliente for t in tickets], ["Alice", "Bob"])
+        self.assertEqual(tickets[-1].id, nuevo.id)
+
+    def test_eliminar_ticket_y_compactar(self):
+        nuevo = tickets_controller.registrar_ticket("Bob", [VentaDetalle("p2", "Te", 2, 5)])
+        tickets_controller.eliminar_ticket(nuevo.id)
+        self.assertEqual([t.cliente for t in tickets_controller.cargar_tickets()], ["Alice"])
+
+        tickets_controller.compactar_tickets()
+        # La compactación reparte el snapshot en particiones mensuales.
+        self.assertFalse(os.path.exists(tickets_controller.DATA_PATH))
+        mes = tickets_controller.meses_con_tickets()[0]
+        particion = os.path.join(self.temp_dir.name, "tickets", f"{mes}.json")
+        with open(particion, encoding="utf-8") as f:
+            self.assertEqual([t["cliente"] for t in json.load(f)], ["Alice"])
+        self.assertEqual(os.path.getsize(self.journal), 0)
+        self.assertEqual([t.cliente for t in tickets_controller.cargar_tickets()], ["Alice"])
+
+    def test_columnas_siguen_altas_bajas_y_compactacion(self):
+        self.assertEqual(tickets_controller.total_vendido_tickets(), 10)
+        with patch.object(
+            tickets_controller.COLUMNAS_VENTAS, "_reconstruir", side_effect=AssertionError
+        ):
+            nuevo = tickets_controller.registrar_ticket("Bob", [VentaDetalle("p2", "Te", 2, 5)])
+            self.assertEqual(tickets_controller.obtener_ventas_por_producto(), {"p1": 10.0, "p2": 10.0})
+            tickets_controller.eliminar_ticket(nuevo.id)
+            tickets_controller.compactar_tickets()
+            self.assertEqual(tickets_controller.total_vendido_tickets(), 10)
+            self.assertEqual(tickets_controller.obtener_ventas_por_producto(), {"p1": 10.0})
+
+    def test_edicion_externa_de_particion_reconstruye(self):
+        tickets_controller.compactar_tickets()
+        mes = tickets_controller.meses_con_tickets()[0]
+        self.assertEqual(len(tickets_controller.listar_tickets()), 1)
+        self.assertEqual(tickets_controller.obtener_ventas_por_mes(), {mes: 10})
+        self.assertEqual(tickets_controller.total_vendido_tickets(), 10)
+
+        # Una restauración o edición a mano de la partición, sin pasar por el almacén.
+        particion = os.path.join(self.temp_dir.name, "tickets", f"{mes}.json")
+        with open(particion, encoding="utf-8") as f:
+            tickets = json.load(f)
+        tickets[0]["total"] = 125
+        tickets[0]["items_venta"][0]["precio_unitario"] = 125
+        with open(particion, "w", encoding="utf-8") as f:
+            json.dump(tickets, f)
+
+        self.assertEqual(tickets_controller.listar_tickets()[0].total, 125)
+        self.assertEqual(tickets_controller.obtener_ventas_por_mes(), {mes: 125})
+        self.assertEqual(tickets_controller.total_vendido_tickets(), 125)
+        self.assertEqual(tickets_controller.obtener_ventas_por_producto(), {"p1": 125.0})
+
+    def test_exportacion_toma_la_ruta_y_lee_los_tickets_al_ejecutar(self):
+        programadas = []
+        with patch.object(tickets_controller, "programar_exportacion", lambda clave, f: programadas.append(f)), patch.object(
+            tickets_controller, "cargar_tickets", side_effect=AssertionError("No debería cargar los tickets")
+        ):
+            tickets_controller.exportar_tickets_excel()
+        # Las ventas posteriores a la programación también se exportan.
+        tickets_controller.registrar_ticket("Bob", [VentaDetalle("p2", "Te", 2, 5)])
+        directorio = self.temp_dir.name
+        tickets_controller.DATA_PATH = os.path.join(directorio, "otro", "tickets.json")
+
+        with patch.object(tickets_controller, "_escribir_tickets_excel") as escribir:
+            programadas[0]()
+        registros, excel_path = escribir.call_args.args
+        registros = list(registros)
+        self.assertEqual([t["cliente"] for t in registros], ["Alice", "Bob"])
+        self.assertEqual(excel_path, os.path.join(directorio, "tickets.xlsx"))
+
+    def test_error_al_exportar_no_interrumpe(self):
+        pandas = SimpleNamespace(DataFrame=Mock(from_records=Mock(side_effect=ValueError("hoja inválida"))))
+        with patch.dict(sys.modules, {"pandas": pandas}), self.assertLogs(
+            "controllers.tickets_controller", "WARNING"
+        ) as logs:
+            tickets_controller.exportar_tickets_excel(en_segundo_plano=False)
+        self.assertIn("hoja inválida", logs.output[0])
+
+    def test_journal_reaplicado_no_duplica_tickets(self):
+        nuevo = tickets_controller.registrar_ticket("Bob", [VentaDetalle("p2", "Te", 2, 5)])
+        # Simula una compactación interrumpida: snapshot escrito, journal intacto.
+        snapshot = self._snapshot() + [nuevo.to_dict()]
+        with open(tickets_controller.DATA_PATH, "w", encoding="utf-8") as f:
+            json.dump(snapshot, f)
+        self.assertEqual(len(tickets_controller.cargar_tickets()), 2)
+
+
+class TestConsumoCarrito(unittest.TestCase):
+    def setUp(self):
+        self.original_paths = (
+            tickets_controller.DATA_PATH,
+            materia_prima_controller.DATA_PATH,
+            recetas_controller.DATA_PATH,
+            movimientos_stock_controller.DATA_PATH,
+        )
+        self.temp_dir = tempfile.TemporaryDirectory()
+        tickets_controller.DATA_PATH = os.path.join(self.temp_dir.name, "tickets.json")
+        materia_prima_controller.DATA_PATH = os.path.join(self.temp_dir.name, "materias_primas.json")
+        recetas_controller.DATA_PATH = os.path.join(self.temp_dir.name, "recetas.json")
+        movimientos_stock_controller.DATA_PATH = os.path.join(self.temp_dir.name, "movimientos_stock.json")
+        with open(materia_prima_controller.DATA_PATH, "w", encoding="utf-8") as f:
+            json.dump(
+                [{"id": "m1", "nombre": "Cafe", "unidad_medida": "kg", "costo_unitario": 1, "stock": 5}],
+                f,
+            )
+        with open(recetas_controller.DATA_PATH, "w", encoding="utf-8") as f:
+            json.dump(
+                [
+                    {
+                        "id": "r1",
+                        "producto_id": "p1",
+                        "nombre_producto": "Espresso",
+                        "ingredientes": [{"materia_prima_id": "m1", "cantidad_necesaria": 2}],
+                        "rendimiento": 1,
+                    }
+                ],
+                f,
+            )
+
+    def tearDown(self):
+        (
+            tickets_controller.DATA_PATH,
+            materia_prima_controller.DATA_PATH,
+            recetas_controller.DATA_PATH,
+            movimientos_stock_controller.DATA_PATH,
+        ) = self.original_paths
+        self.temp_dir.cleanup()
+
+    def test_carrito_agrega_productos_repetidos(self):
+        carrito = [VentaDetalle("p1", "Espresso", 2, 10), VentaDetalle("p1", "Espresso", 1, 10)]
+        with self.assertRaises(ValueError):
+            tickets_controller.registrar_ticket("Ana", carrito)
+        self.assertEqual(materia_prima_controller.obtener_materia_prima_por_id("m1").stock, 5)
+
+        tickets_controller.registrar_ticket("Ana", [VentaDetalle("p1", "Espresso", 1, 10)] * 2)
+        self.assertEqual(materia_prima_controller.obtener_materia_prima_por_id("m1").stock, 1)
+
+    def test_plan_de_consumo_se_compila_una_vez(self):
+        with patch.object(
+            recetas_controller, "_compilar_plan", wraps=recetas_controller._compilar_plan
+        ) as compilar:
+            tickets_controller.registrar_ticket("Ana", [VentaDetalle("p1", "Espresso", 1, 10)])
+            tickets_controller.registrar_ticket("Bob", [VentaDetalle("p1", "Espresso", 1, 10)])
+            self.assertEqual(compilar.call_count, 1)
+
+            receta = recetas_controller.obtener_receta_por_producto_id("p1")
+            recetas_controller.editar_receta(
+                receta.id, [{"materia_prima_id": "m1", "cantidad_necesaria": 0.5}], 1
+            )
+            self.assertEqual(
+                recetas_controller.planes_consumo(["p1"]), {"p1": (("m1", 0.5, "m1"),)}
+            )
+            self.assertEqual(compilar.call_count, 2)
+
+
+class TestTicketsLote(unittest.TestCase):
+    def setUp(self):
+        TestConsumoCarrito.setUp(self)
+        self.original_productos_path = productos_controller.DATA_PATH
+        productos_controller.DATA_PATH = os.path.join(self.temp_dir.name, "productos.json")
+        with open(productos_controller.DATA_PATH, "w", encoding="utf-8") as f:
+            json.dump([{"id": "p1", "nombre": "Espresso", "precio_unitario": 10}], f)
+
+    def tearDown(self):
+        productos_controller.DATA_PATH = self.original_productos_path
+        TestConsumoCarrito.tearDown(self)
+
+    def _lineas(self, path):
+        journal = os.path.splitext(path)[0] + ".journal"
+        with open(journal, encoding="utf-8") as f:
+            return len(f.readlines())
+
+    def test_stock_se_valida_sobre_el_lote(self):
+        ventas = [
+            {"cliente": "Ana", "items": [VentaDetalle("p1", "Espresso", 1, 10)], "fecha": "2024-05-01 08:00:00"},
+            {"cliente": "", "items": [VentaDetalle("p1", "Espresso", 1, 10)]},
+            {"cliente": "Bob", "items": [VentaDetalle("p1", "Espresso", 1, 10)]},
+            {"cliente": "Caro", "items": [VentaDetalle("p1", "Espresso", 1, 10)]},
+        ]
+        registrados, errores = tickets_controller.registrar_tickets_lote(ventas)
+        self.assertEqual([t.cliente for t in registrados], ["Ana", "Bob"])
+        self.assertEqual([indice for indice, _ in errores], [1, 3])
+        self.assertIn("Stock insuficiente", errores[1][1])
+        self.assertEqual(materia_prima_controller.obtener_materia_prima_por_id("m1").stock, 1)
+        # Una sola escritura por colección.
+        self.assertEqual(self._lineas(tickets_controller.DATA_PATH), 1)
+        self.assertEqual(self._lineas(materia_prima_controller.DATA_PATH), 1)
+        self.assertEqual(self._lineas(movimientos_stock_controller.DATA_PATH), 1)
+
+    def test_importar_csv_con_reporte_por_fila(self):
+        ruta = os.path.join(self.temp_dir.name, "ventas.csv")
+        with open(ruta, "w", encoding="utf-8", newline="") as f:
+            f.write(
+                "ticket,cliente,fecha,producto_id,nombre_producto,cantidad,precio_unitario\n"
+                "A,Ana,2024-05-01 08:00:00,p1,,1,\n"
+                "A,,,p1,Espresso,1,12\n"
+                "B,Bob,2024-05-01 09:00:00,p1,,dos,\n"
+                "C,Caro,2024-05-01 10:00:00,p9,,1,\n"
+                "D,Dani,2024-05-01,p1,,1,\n"
+            )
+        registrados, errores = tickets_controller.importar_tickets(ruta)
+        self.assertEqual(len(registrados), 1)
+        self.assertEqual(registrados[0].total, 22)
+        self.assertEqual([fila for fila, _ in errores], [4, 5, 6])
+        self.assertIn("Cantidad inválida", errores[0][1])
+        self.assertIn("p9", errores[1][1])
+        self.assertIn("Stock insuficiente", errores[2][1])
+
+    def test_importar_json_exportado(self):
+        ruta = os.path.join(self.temp_dir.name, "ventas.json")
+        ticket = Ticket("Ana", [VentaDetalle("p1", "Espresso", 2, 10)], fecha="2024-05-01 08:00:00")
+        with open(ruta, "w", encoding="utf-8") as f:
+            json.dump([ticket.to_dict(), {"cliente": "Bob", "fecha": "ayer", "items": []}], f)
+        registrados, errores = tickets_controller.importar_tickets(ruta)
+        self.assertEqual([t.cliente for t in registrados], ["Ana"])
+        self.assertEqual(errores[0][0], 2)
+        self.assertEqual(len(tickets_controller.listar_tickets()), 1)
+
 
 if __name__ == "__main__":
     unittest.main()
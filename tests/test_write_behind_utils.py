@@ -0,0 +1,126 @@
+import json
+import os
+
+import pytest
+
+from controllers import (
+    materia_prima_controller,
+    movimientos_stock_controller,
+    recetas_controller,
+    tickets_controller,
+)
+from models.venta_detalle import VentaDetalle
+from utils import storage
+from utils.cache_utils import REPOSITORIOS
+from utils.write_behind_utils import ColaEscrituraDiferida, escrituras_pendientes
+
+
+def test_cola_agrupa_y_confirma():
+    lotes = []
+    cola = ColaEscrituraDiferida(tamano_lote=10, intervalo=60)
+    cola.registrar("ventas", lotes.append)
+    confirmaciones = [cola.encolar("ventas", i) for i in range(3)]
+    assert not any(c.confirmada for c in confirmaciones)
+    assert cola.pendientes() == 3
+
+    assert cola.detener()
+    assert lotes == [[0, 1, 2]]
+    assert all(c.esperar(0) for c in confirmaciones)
+    assert cola.pendientes() == 0
+
+
+def test_cola_vacia_al_completar_lote():
+    lotes = []
+    cola = ColaEscrituraDiferida(tamano_lote=2, intervalo=60)
+    cola.registrar("ventas", lotes.append)
+    cola.encolar("ventas", "a")
+    assert cola.encolar("ventas", "b").esperar(5)
+    assert lotes == [["a", "b"]]
+    cola.detener()
+
+
+def test_lote_fallido_se_reintenta():
+    lotes = []
+
+    def persistir(elementos):
+        if not lotes:
+            lotes.append(None)
+            raise OSError("disco lleno")
+        lotes.append(list(elementos))
+
+    cola = ColaEscrituraDiferida(tamano_lote=10, intervalo=60)
+    cola.registrar("ventas", persistir)
+    confirmacion = cola.encolar("ventas", 1)
+    assert not cola.vaciar()
+    assert not confirmacion.confirmada
+    cola.encolar("ventas", 2)
+    assert cola.detener()
+    assert lotes == [None, [1, 2]]
+    assert confirmacion.confirmada
+
+
+def test_grupo_desconocido():
+    with pytest.raises(ValueError):
+        ColaEscrituraDiferida().encolar("compras", 1)
+
+
+@pytest.fixture
+def diferida(monkeypatch, tmp_path):
+    monkeypatch.setenv("CAFE_ESCRITURA_DIFERIDA", "1")
+    monkeypatch.setenv("CAFE_STORAGE_BACKEND", "json")
+    monkeypatch.setattr(storage, "_ALMACENES", {})
+    monkeypatch.setattr(tickets_controller, "DATA_PATH", str(tmp_path / "tickets.json"))
+    monkeypatch.setattr(materia_prima_controller, "DATA_PATH", str(tmp_path / "materias_primas.json"))
+    monkeypatch.setattr(recetas_controller, "DATA_PATH", str(tmp_path / "recetas.json"))
+    monkeypatch.setattr(movimientos_stock_controller, "DATA_PATH", str(tmp_path / "movimientos_stock.json"))
+    with open(materia_prima_controller.DATA_PATH, "w", encoding="utf-8") as f:
+        json.dump(
+            [{"id": "m1", "nombre": "Cafe", "unidad_medida": "kg", "costo_unitario": 1, "stock": 10}],
+            f,
+        )
+    with open(recetas_controller.DATA_PATH, "w", encoding="utf-8") as f:
+        json.dump(
+            [
+                {
+                    "id": "r1",
+                    "producto_id": "p1",
+                    "nombre_producto": "Espresso",
+                    "ingredientes": [{"materia_prima_id": "m1", "cantidad_necesaria": 1}],
+                    "rendimiento": 1,
+                }
+            ],
+            f,
+        )
+    REPOSITORIOS.invalidar()
+    yield tmp_path
+    REPOSITORIOS.invalidar()
+
+
+def test_ventas_diferidas_comparten_una_escritura(diferida):
+    journal = os.path.splitext(tickets_controller.DATA_PATH)[0] + ".journal"
+    tickets_controller.cargar_tickets()
+    for cliente in ("Ana", "Bob", "Caro"):
+        tickets_controller.registrar_ticket(
+            cliente, [VentaDetalle("p1", "Espresso", 2, 1000)], fecha="2024-05-02 08:00:00"
+        )
+    # Las ventas se ven en memoria antes de llegar al disco.
+    assert [t.cliente for t in tickets_controller.listar_tickets()] == ["Ana", "Bob", "Caro"]
+    assert materia_prima_controller.obtener_materia_prima_por_id("m1").stock == 4
+
+    # Leer los acumulados vacía la cola: una línea de journal para las tres ventas.
+    assert tickets_controller.obtener_ventas_por_mes() == {"2024-05": 6000}
+    assert escrituras_pendientes() == 0
+    with open(journal, encoding="utf-8") as f:
+        assert len(f.readlines()) == 1
+
+    REPOSITORIOS.invalidar()
+    assert len(tickets_controller.listar_tickets()) == 3
+    assert materia_prima_controller.obtener_materia_prima_por_id("m1").stock == 4
+
+
+def test_esperar_confirmacion(diferida):
+    ticket = tickets_controller.registrar_ticket(
+        "Ana", [VentaDetalle("p1", "Espresso", 1, 1000)], esperar_confirmacion=True
+    )
+    assert escrituras_pendientes() == 0
+    assert storage.obtener_almacen().obtener(tickets_controller.DATA_PATH, ticket.id)
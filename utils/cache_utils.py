@@ -0,0 +1,235 @@
+"""Cache compartido (identity map) de las colecciones de los controladores.
+
+Cada colección se identifica por la ruta de su archivo de datos. Una entrada
+guarda la lista de entidades ya deserializadas junto con la *firma* del
+almacén en el momento de la carga (``mtime``/tamaño de los archivos en el
+backend JSON o la versión de los datos en SQLite). Si la firma cambia, por
+ejemplo porque otro proceso modificó los archivos, la entrada se descarta y
+se vuelve a cargar.
+
+Las escrituras hechas a través de ``reemplazar`` y ``modificar`` actualizan
+la entrada en el lugar, de modo que las propias escrituras no obligan a
+releer la colección.
+"""
+
+import threading
+
+from utils.storage import nombre_coleccion, normalizar_fecha, obtener_almacen
+
+
+class _Entrada:
+    __slots__ = ("firma", "valor", "indices")
+
+    def __init__(self, firma, valor):
+        self.firma = firma
+        self.valor = valor
+        self.indices = {}
+
+    def indice(self, campo):
+        """Retorna el índice ``valor de campo -> entidad`` construyéndolo si falta.
+
+        Si varias entidades comparten el valor se conserva la primera, igual
+        que una búsqueda lineal.
+        """
+        indice = self.indices.get(campo)
+        if indice is None:
+            indice = {}
+            for entidad in self.valor:
+                indice.setdefault(getattr(entidad, campo, None), entidad)
+            self.indices[campo] = indice
+        return indice
+
+    def indexar(self, entidad):
+        for campo, indice in self.indices.items():
+            indice.setdefault(getattr(entidad, campo, None), entidad)
+
+    def desindexar(self, quitadas):
+        for campo, indice in self.indices.items():
+            for entidad in quitadas:
+                clave = getattr(entidad, campo, None)
+                if indice.get(clave) is not entidad:
+                    continue
+                reemplazo = next(
+                    (e for e in self.valor if getattr(e, campo, None) == clave), None
+                )
+                if reemplazo is None:
+                    del indice[clave]
+                else:
+                    indice[clave] = reemplazo
+
+
+class CacheRepositorios:
+    """Cache de listas de entidades por colección con contadores de uso.
+
+    Además de la lista, cada entrada mantiene índices por campo (por ejemplo
+    ``id`` o ``producto_id``) que se construyen en la primera búsqueda y se
+    actualizan con las altas y bajas hechas a través del cache.
+    """
+
+    def __init__(self):
+        self._entradas = {}
+        self._contadores = {}
+        self._versiones = {}
+        self._lock = threading.RLock()
+
+    @property
+    def bloqueo(self):
+        """Lock reentrante del cache, para operaciones compuestas entre capas."""
+        return self._lock
+
+    def _cambio(self, path):
+        self._versiones[path] = self._versiones.get(path, 0) + 1
+
+    def _contar(self, path, campo):
+        contador = self._contadores.setdefault(
+            nombre_coleccion(path), {"aciertos": 0, "fallos": 0}
+        )
+        contador[campo] += 1
+
+    def _vigente(self, path):
+        """Retorna la entrada de *path* si su firma sigue siendo válida."""
+        entrada = self._entradas.get(path)
+        if entrada is None:
+            return None
+        if entrada.firma != obtener_almacen().firma(path):
+            del self._entradas[path]
+            self._cambio(path)
+            return None
+        return entrada
+
+    def _entrada(self, path, cargar):
+        entrada = self._vigente(path)
+        if entrada is not None:
+            self._contar(path, "aciertos")
+            return entrada
+        self._contar(path, "fallos")
+        firma = obtener_almacen().firma(path)
+        entrada = _Entrada(firma, cargar())
+        self._entradas[path] = entrada
+        self._cambio(path)
+        return entrada
+
+    def obtener(self, path, cargar):
+        """Retorna la colección de *path*, cargándola con *cargar* si hace falta."""
+        with self._lock:
+            return self._entrada(path, cargar).valor
+
+    def en_cache(self, path):
+        """Indica si la colección de *path* está cargada y vigente."""
+        with self._lock:
+            return self._vigente(path) is not None
+
+    def buscar(self, path, cargar, valor, campo="id"):
+        """Retorna la entidad de *path* cuyo *campo* vale *valor* o ``None``."""
+        with self._lock:
+            return self._entrada(path, cargar).indice(campo).get(valor)
+
+    def reemplazar(self, path, escritura, valor):
+        """Ejecuta *escritura* y deja *valor* como contenido de la colección."""
+        with self._lock:
+            ok = escritura()
+            if ok is False:
+                self._entradas.pop(path, None)
+            else:
+                self._entradas[path] = _Entrada(obtener_almacen().firma(path), valor)
+            self._cambio(path)
+            return ok
+
+    def _escribir(self, path, escritura, aplicar):
+        with self._lock:
+            entrada = self._vigente(path)
+            ok = escritura()
+            self._cambio(path)
+            if entrada is None or ok is False:
+                self._entradas.pop(path, None)
+                return ok
+            aplicar(entrada)
+            entrada.firma = obtener_almacen().firma(path)
+            return ok
+
+    def modificar(self, path, escritura):
+        """Ejecuta *escritura* que persiste cambios hechos sobre entidades cacheadas.
+
+        Los cambios no deben alterar los campos indexados. Si la entrada no
+        estaba vigente antes de escribir, se descarta y la próxima lectura
+        recargará la colección.
+        """
+        return self._escribir(path, escritura, lambda entrada: None)
+
+    def agregar(self, path, escritura, entidad):
+        """Ejecuta *escritura* y agrega *entidad* a la colección cacheada."""
+
+        def aplicar(entrada):
+            entrada.valor.append(entidad)
+            entrada.indexar(entidad)
+
+        return self._escribir(path, escritura, aplicar)
+
+    def agregar_varios(self, path, escritura, entidades):
+        """Ejecuta *escritura* y agrega *entidades* a la colección cacheada."""
+
+        def aplicar(entrada):
+            for entidad in entidades:
+                entrada.valor.append(entidad)
+                entrada.indexar(entidad)
+
+        return self._escribir(path, escritura, aplicar)
+
+    def quitar(self, path, escritura, valor, campo="id"):
+        """Ejecuta *escritura* y quita de la colección las entidades con ese *campo*."""
+
+        def aplicar(entrada):
+            quitadas = [e for e in entrada.valor if getattr(e, campo, None) == valor]
+            if quitadas:
+                entrada.valor[:] = [e for e in entrada.valor if getattr(e, campo, None) != valor]
+                entrada.desindexar(quitadas)
+
+        return self._escribir(path, escritura, aplicar)
+
+    def invalidar(self, path=None):
+        """Descarta la entrada de *path* o todo el cache si es ``None``."""
+        with self._lock:
+            for clave in list(self._entradas) if path is None else [path]:
+                self._entradas.pop(clave, None)
+                self._cambio(clave)
+
+    def version(self, path):
+        """Retorna un contador que aumenta con cada cambio de la colección de *path*.
+
+        Permite a los cálculos derivados (por ejemplo la tabla de costos)
+        saber si deben revisar la colección sin recorrerla.
+        """
+        with self._lock:
+            return self._versiones.get(path, 0)
+
+    def estadisticas(self):
+        """Retorna los aciertos y fallos por colección y el total acumulado."""
+        with self._lock:
+            resultado = {c: dict(v) for c, v in self._contadores.items()}
+            resultado["total"] = {
+                "aciertos": sum(v["aciertos"] for v in self._contadores.values()),
+                "fallos": sum(v["fallos"] for v in self._contadores.values()),
+            }
+            return resultado
+
+    def reiniciar_estadisticas(self):
+        with self._lock:
+            self._contadores.clear()
+
+
+def filtrar_periodo(entidades, inicio=None, fin=None, campo="fecha"):
+    """Retorna las entidades cuyo *campo* está entre *inicio* y *fin* inclusive.
+
+    Equivale a ``almacen.rango`` pero sobre una lista ya cacheada.
+    """
+    inicio, fin = normalizar_fecha(inicio), normalizar_fecha(fin)
+    resultado = []
+    for entidad in entidades:
+        fecha = normalizar_fecha(getattr(entidad, campo, None))
+        if not fecha or (inicio is not None and fecha < inicio) or (fin is not None and fecha > fin):
+            continue
+        resultado.append(entidad)
+    return resultado
+
+
+REPOSITORIOS = CacheRepositorios()
@@ -0,0 +1,321 @@
+"""Columnas binarias de los tickets y sus líneas, abiertas con ``numpy.memmap``.
+
+Los cálculos agregados sobre las ventas (totales, ventas por producto, el
+tablero mensual) solo necesitan unos pocos números por línea. ``ColumnasVentas``
+los guarda en ``<datos>/columnas/<coleccion>/`` como arreglos binarios de
+ancho fijo, uno por archivo:
+
+* por ticket: ``clave`` (hash del id), ``fecha`` (segundos epoch) y ``total``;
+* por línea: ``fecha``, ``producto`` (índice en la lista de productos),
+  ``cantidad``, ``precio``, ``total`` y ``ticket`` (índice del ticket).
+
+Un ``meta.json`` lleva la cantidad de filas, la lista de productos, los
+tickets eliminados y la *marca* del almacén, igual que ``RollupPeriodos``. Las
+altas hechas con ``aplicar`` se anexan al final de cada archivo y las bajas
+marcan el ticket como eliminado; si la colección cambió por otro camino la
+marca no coincide y las columnas se reconstruyen con una pasada sobre la
+colección. Abrir un año de ventas cuesta así unas pocas llamadas a ``mmap``
+y las sumas son reducciones de NumPy.
+
+NumPy se importa recién al usar las columnas, para no demorar el arranque de
+las interfaces que importan los controladores.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+import threading
+
+from utils.fechas import epoch
+from utils.rollup_utils import _normalizar
+from utils.storage import nombre_coleccion, obtener_almacen
+
+logger = logging.getLogger(__name__)
+
+COLUMNAS_TICKETS = {"clave": "<u8", "fecha": "<i8", "total": "<f8"}
+COLUMNAS_LINEAS = {
+    "fecha": "<i8",
+    "producto": "<i4",
+    "cantidad": "<f8",
+    "precio": "<f8",
+    "total": "<f8",
+    "ticket": "<i4",
+}
+# Fecha de los tickets con una fecha inválida: queda fuera de todo período.
+SIN_FECHA = -(1 << 63)
+# Mayor fecha representable en las columnas (``int64``).
+MAX_FECHA = (1 << 63) - 1
+# Tickets que se convierten a columnas por escritura durante una reconstrucción.
+LOTE_COLUMNAS = 10000
+# Con más eliminados que esta fracción de los tickets se reconstruye.
+MAX_ELIMINADOS = 0.25
+
+
+def columnas_path(path):
+    """Retorna el directorio de columnas de la colección de *path*."""
+    return os.path.join(
+        os.path.dirname(os.path.abspath(path)), "columnas", nombre_coleccion(path)
+    )
+
+
+def clave_ticket(ticket_id):
+    """Hash de 64 bits de *ticket_id* con el que se ubica un ticket para darlo de baja."""
+    digest = hashlib.blake2b(str(ticket_id).encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little")
+
+
+class TablaVentas:
+    """Columnas de los tickets vigentes y de sus líneas.
+
+    Los arreglos son de solo lectura (mapeados del disco o filtrados en
+    memoria); ``productos[i]`` y ``nombres[i]`` corresponden al índice ``i``
+    de la columna ``producto``.
+    """
+
+    def __init__(self, tickets, lineas, productos, nombres):
+        self.ticket_fecha = tickets["fecha"]
+        self.ticket_total = tickets["total"]
+        self.fecha = lineas["fecha"]
+        self.producto = lineas["producto"]
+        self.cantidad = lineas["cantidad"]
+        self.precio = lineas["precio"]
+        self.total = lineas["total"]
+        self.ticket = lineas["ticket"]
+        self.productos = productos
+        self.nombres = nombres
+
+    def periodo(self, inicio=None, fin=None):
+        """Retorna la tabla con los tickets entre *inicio* y *fin* (inclusive)."""
+        desde = SIN_FECHA + 1 if inicio is None else epoch(inicio)
+        hasta = MAX_FECHA if fin is None else epoch(fin)
+        if desde is None or hasta is None:
+            raise ValueError("Formato de fecha inválido. Use 'YYYY-MM-DD' o 'YYYY-MM-DD HH:MM:SS'.")
+        en_tickets = (self.ticket_fecha >= desde) & (self.ticket_fecha <= hasta)
+        en_lineas = (self.fecha >= desde) & (self.fecha <= hasta)
+        return TablaVentas(
+            {"fecha": self.ticket_fecha[en_tickets], "total": self.ticket_total[en_tickets]},
+            {nombre: getattr(self, nombre)[en_lineas] for nombre in COLUMNAS_LINEAS},
+            self.productos,
+            self.nombres,
+        )
+
+
+class ColumnasVentas:
+    """Columnas en disco de una colección de tickets con ``items_venta``."""
+
+    def __init__(self):
+        self._tablas = {}
+        self._lock = threading.RLock()
+
+    def tabla(self, path, cargar):
+        """Retorna la ``TablaVentas`` de la colección de *path*.
+
+        *cargar* recorre la colección completa y solo se usa si hay que
+        reconstruir las columnas.
+        """
+        with self._lock:
+            if self._vigentes(path) is None:
+                return self._reconstruir(path, cargar)
+            return self._tablas[path][1]
+
+    def aplicar(self, path, escritura, sumar=(), restar=()):
+        """Ejecuta *escritura* y anexa o da de baja sus tickets en las columnas.
+
+        Si las columnas no estaban vigentes antes de escribir, o la escritura
+        falló, no se tocan: la próxima consulta las reconstruye.
+        """
+        with self._lock:
+            meta = self._vigentes(path)
+            ok = escritura()
+            if meta is None or ok is False:
+                return ok
+            meta = {clave: list(valor) if isinstance(valor, list) else valor for clave, valor in meta.items()}
+            try:
+                if sumar:
+                    self._anexar(path, meta, list(sumar))
+                if restar and not self._eliminar(path, meta, restar):
+                    self._descartar(path)
+                    return ok
+                meta["marca"] = _normalizar(obtener_almacen().marca(path))
+                self._escribir_meta(path, meta)
+            except OSError as e:
+                logger.warning(f"No se pudieron actualizar las columnas de {path}: {e}")
+                self._descartar(path)
+            # La próxima consulta mapea las columnas con sus nuevas filas.
+            self._tablas.pop(path, None)
+            return ok
+
+    def invalidar(self, path=None):
+        """Olvida las columnas abiertas de *path* (o todas)."""
+        with self._lock:
+            if path is None:
+                self._tablas.clear()
+            else:
+                self._tablas.pop(path, None)
+
+    def _vigentes(self, path):
+        """Retorna el ``meta`` de *path* si las columnas corresponden a la colección actual."""
+        marca = _normalizar(obtener_almacen().marca(path))
+        abierta = self._tablas.get(path)
+        meta = abierta[0] if abierta else self._leer_meta(path)
+        if (
+            meta is None
+            or meta.get("marca") != marca
+            or len(meta["eliminados"]) > max(LOTE_COLUMNAS, meta["tickets"]) * MAX_ELIMINADOS
+        ):
+            self._tablas.pop(path, None)
+            return None
+        if abierta is None:
+            self._tablas[path] = (meta, self._abrir(path, meta))
+        return meta
+
+    def _reconstruir(self, path, cargar):
+        logger.debug(f"Reconstruyendo columnas de ventas de {path}")
+        self._descartar(path)
+        marca = _normalizar(obtener_almacen().marca(path))
+        meta = {"marca": None, "tickets": 0, "lineas": 0, "productos": [], "nombres": [], "eliminados": []}
+        try:
+            lote = []
+            for entidad in cargar():
+                lote.append(entidad)
+                if len(lote) >= LOTE_COLUMNAS:
+                    self._anexar(path, meta, lote)
+                    lote = []
+            self._anexar(path, meta, lote)
+            meta["marca"] = marca
+            self._escribir_meta(path, meta)
+        except OSError as e:
+            # Sin columnas en disco la tabla se arma en memoria para esta consulta.
+            logger.warning(f"No se pudieron guardar las columnas de {path}: {e}")
+            self._descartar(path)
+            meta = dict(meta, tickets=0, lineas=0, productos=[], nombres=[])
+            tickets, lineas = self._convertir(list(cargar()), meta)
+            return TablaVentas(tickets, lineas, meta["productos"], meta["nombres"])
+        tabla = self._abrir(path, meta)
+        self._tablas[path] = (meta, tabla)
+        return tabla
+
+    def _anexar(self, path, meta, entidades):
+        """Anexa *entidades* al final de cada columna y actualiza los contadores de *meta*."""
+        import numpy as np
+
+        tickets, lineas = self._convertir(entidades, meta)
+        directorio = columnas_path(path)
+        os.makedirs(directorio, exist_ok=True)
+        for columnas, filas, clave in (
+            (COLUMNAS_TICKETS, tickets, "tickets"),
+            (COLUMNAS_LINEAS, lineas, "lineas"),
+        ):
+            for nombre, tipo in columnas.items():
+                archivo = os.path.join(directorio, f"{clave}_{nombre}.bin")
+                with open(archivo, "ab") as f:
+                    # Descarta lo que haya quedado de una escritura interrumpida.
+                    f.truncate(meta[clave] * np.dtype(tipo).itemsize)
+                    f.write(filas[nombre].tobytes())
+        meta["tickets"] += len(tickets["clave"])
+        meta["lineas"] += len(lineas["ticket"])
+
+    def _convertir(self, entidades, meta):
+        """Convierte *entidades* en arreglos; interna los productos nuevos en *meta*."""
+        import numpy as np
+
+        indices = {producto: i for i, producto in enumerate(meta["productos"])}
+        tickets = {nombre: [] for nombre in COLUMNAS_TICKETS}
+        lineas = {nombre: [] for nombre in COLUMNAS_LINEAS}
+        for posicion, entidad in enumerate(entidades, meta["tickets"]):
+            fecha = entidad.epoch
+            if fecha is None:
+                fecha = SIN_FECHA
+            tickets["clave"].append(clave_ticket(entidad.id))
+            tickets["fecha"].append(fecha)
+            tickets["total"].append(float(entidad.total or 0))
+            for item in entidad.items_venta:
+                producto = indices.get(item.producto_id)
+                if producto is None:
+                    producto = indices[item.producto_id] = len(meta["productos"])
+                    meta["productos"].append(item.producto_id)
+                    meta["nombres"].append(getattr(item, "nombre_producto", "") or "")
+                lineas["fecha"].append(fecha)
+                lineas["producto"].append(producto)
+                lineas["cantidad"].append(float(item.cantidad or 0))
+                lineas["precio"].append(float(item.precio_unitario or 0))
+                lineas["total"].append(float(item.total or 0))
+                lineas["ticket"].append(posicion)
+        return (
+            {nombre: np.asarray(tickets[nombre], dtype=tipo) for nombre, tipo in COLUMNAS_TICKETS.items()},
+            {nombre: np.asarray(lineas[nombre], dtype=tipo) for nombre, tipo in COLUMNAS_LINEAS.items()},
+        )
+
+    def _eliminar(self, path, meta, entidades):
+        """Marca *entidades* como eliminadas; retorna False si alguna no está."""
+        import numpy as np
+
+        claves = self._mapear(path, "tickets", "clave", COLUMNAS_TICKETS["clave"], meta["tickets"])
+        eliminados = set(meta["eliminados"])
+        for entidad in entidades:
+            posiciones = [
+                int(p) for p in np.flatnonzero(claves == np.uint64(clave_ticket(entidad.id)))
+                if int(p) not in eliminados
+            ]
+            if not posiciones:
+                return False
+            eliminados.add(posiciones[-1])
+            meta["eliminados"].append(posiciones[-1])
+        return True
+
+    def _abrir(self, path, meta):
+        import numpy as np
+
+        tickets = {
+            nombre: self._mapear(path, "tickets", nombre, tipo, meta["tickets"])
+            for nombre, tipo in COLUMNAS_TICKETS.items()
+        }
+        lineas = {
+            nombre: self._mapear(path, "lineas", nombre, tipo, meta["lineas"])
+            for nombre, tipo in COLUMNAS_LINEAS.items()
+        }
+        if meta["eliminados"]:
+            vigentes = np.ones(meta["tickets"], dtype=bool)
+            vigentes[meta["eliminados"]] = False
+            en_lineas = vigentes[lineas["ticket"]]
+            tickets = {nombre: columna[vigentes] for nombre, columna in tickets.items()}
+            lineas = {nombre: columna[en_lineas] for nombre, columna in lineas.items()}
+        return TablaVentas(tickets, lineas, meta["productos"], meta["nombres"])
+
+    @staticmethod
+    def _mapear(path, tabla, nombre, tipo, filas):
+        import numpy as np
+
+        if not filas:
+            return np.empty(0, dtype=tipo)
+        archivo = os.path.join(columnas_path(path), f"{tabla}_{nombre}.bin")
+        return np.memmap(archivo, dtype=tipo, mode="r", shape=(filas,))
+
+    @staticmethod
+    def _leer_meta(path):
+        archivo = os.path.join(columnas_path(path), "meta.json")
+        if not os.path.exists(archivo):
+            return None
+        try:
+            with open(archivo, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"No se pudieron leer las columnas {archivo}: {e}")
+            return None
+        claves = {"marca", "tickets", "lineas", "productos", "nombres", "eliminados"}
+        return meta if isinstance(meta, dict) and claves <= set(meta) else None
+
+    @staticmethod
+    def _escribir_meta(path, meta):
+        archivo = os.path.join(columnas_path(path), "meta.json")
+        temporal = archivo + ".tmp"
+        with open(temporal, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(temporal, archivo)
+
+    def _descartar(self, path):
+        """Borra las columnas de *path*; la próxima consulta las reconstruye."""
+        self._tablas.pop(path, None)
+        shutil.rmtree(columnas_path(path), ignore_errors=True)
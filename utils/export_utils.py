@@ -0,0 +1,108 @@
+"""Ejecución diferida de exportaciones (por ejemplo a Excel).
+
+Las exportaciones se programan con una clave; si llegan varias solicitudes
+con la misma clave antes de que venza la demora, se ejecuta una sola vez con
+la última función programada. Así una ráfaga de guardados produce una única
+exportación y el trabajo pesado queda fuera del hilo que registra la venta o
+la compra.
+
+El hilo trabajador no es *daemon* y termina en cuanto no quedan trabajos, de
+modo que al cerrar el intérprete las exportaciones pendientes se completan
+antes de salir. Los módulos indicados en ``precargar`` se importan al iniciar
+el hilo (y no durante el cierre del intérprete, cuando ya no es posible).
+"""
+
+import importlib
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Segundos de inactividad que se esperan antes de ejecutar una exportación.
+DEMORA_EXPORTACION = 2.0
+
+
+class ExportadorEnSegundoPlano:
+    """Hilo trabajador que agrupa y ejecuta exportaciones pendientes."""
+
+    def __init__(self, demora=DEMORA_EXPORTACION, precargar=()):
+        self.demora = demora
+        self.precargar = tuple(precargar)
+        self._pendientes = {}  # clave -> (vencimiento, funcion)
+        self._condicion = threading.Condition()
+        self._hilo = None
+
+    def programar(self, clave, funcion):
+        """Programar *funcion* bajo *clave*, reemplazando la anterior si existe."""
+        with self._condicion:
+            self._pendientes[clave] = (time.monotonic() + self.demora, funcion)
+            if self._hilo is None:
+                self._hilo = threading.Thread(target=self._ejecutar, name="exportador-excel")
+                self._hilo.start()
+            self._condicion.notify()
+
+    def pendientes(self):
+        """Retorna las claves con exportaciones aún no ejecutadas."""
+        with self._condicion:
+            return sorted(self._pendientes)
+
+    def ejecutar_pendientes(self):
+        """Ejecutar inmediatamente todas las exportaciones pendientes."""
+        with self._condicion:
+            trabajos = [funcion for _, funcion in self._pendientes.values()]
+            self._pendientes.clear()
+        for funcion in trabajos:
+            self._correr(funcion)
+
+    def detener(self):
+        """Ejecutar lo pendiente y esperar a que finalice el hilo trabajador."""
+        self.ejecutar_pendientes()
+        with self._condicion:
+            hilo = self._hilo
+            self._condicion.notify()
+        if hilo is not None:
+            hilo.join(timeout=5)
+
+    def _ejecutar(self):
+        for modulo in self.precargar:
+            try:
+                importlib.import_module(modulo)
+            except Exception as e:
+                logger.debug(f"No se pudo precargar {modulo}: {e}")
+        while True:
+            with self._condicion:
+                while self._pendientes:
+                    ahora = time.monotonic()
+                    vencimiento = min(v for v, _ in self._pendientes.values())
+                    if vencimiento <= ahora:
+                        break
+                    self._condicion.wait(vencimiento - ahora)
+                if not self._pendientes:
+                    self._hilo = None
+                    return
+                ahora = time.monotonic()
+                vencidas = [c for c, (v, _) in self._pendientes.items() if v <= ahora]
+                trabajos = [self._pendientes.pop(c)[1] for c in vencidas]
+            for funcion in trabajos:
+                self._correr(funcion)
+
+    @staticmethod
+    def _correr(funcion):
+        try:
+            funcion()
+        except Exception as e:
+            logger.warning(f"Error en exportación diferida: {e}")
+
+
+_EXPORTADOR = ExportadorEnSegundoPlano(precargar=("pandas",))
+
+
+def programar_exportacion(clave, funcion):
+    """Programar una exportación en el exportador compartido."""
+    _EXPORTADOR.programar(clave, funcion)
+
+
+def ejecutar_exportaciones_pendientes():
+    """Ejecutar ya las exportaciones pendientes del exportador compartido."""
+    _EXPORTADOR.ejecutar_pendientes()
@@ -0,0 +1,109 @@
+"""Interpretación de las fechas ``YYYY-MM-DD HH:MM:SS`` de los registros.
+
+Todas las colecciones guardan las fechas como texto y los reportes las
+interpretan una y otra vez. Este módulo reúne esa lógica:
+
+* ``parse_fecha`` interpreta el formato canónico con
+  ``datetime.fromisoformat`` (varias veces más rápido que ``strptime``, que
+  queda solo para variantes sin ceros a la izquierda) y memoriza el resultado
+  por cadena;
+* ``epoch`` convierte una fecha a segundos enteros, de modo que los filtros
+  por rango son comparaciones de enteros;
+* ``clave_mes``, ``clave_semana`` y ``clave_dia`` arman las claves de período
+  con aritmética sobre el ``datetime`` en lugar de ``strftime``.
+
+Los modelos con fecha guardan su ``datetime`` y su epoch la primera vez que se
+piden (``models.fechado.ConFecha``).
+"""
+
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+
+FORMATO_FECHA = "%Y-%m-%d"
+FORMATO_FECHA_HORA = "%Y-%m-%d %H:%M:%S"
+# Cadenas distintas cuyo resultado se recuerda.
+TAMANO_CACHE = 1 << 16
+
+_EPOCH = datetime(1970, 1, 1)
+_SEGUNDO = timedelta(seconds=1)
+
+
+@lru_cache(maxsize=TAMANO_CACHE)
+def _interpretar(texto):
+    """Retorna el ``datetime`` de *texto* (ya recortado a 19 caracteres) o ``None``."""
+    largo = len(texto)
+    canonica = (
+        largo in (10, 19)
+        and texto[4] == "-"
+        and texto[7] == "-"
+        and (largo == 10 or (texto[10] == " " and texto[13] == ":" and texto[16] == ":"))
+    )
+    if canonica:
+        try:
+            return datetime.fromisoformat(texto)
+        except ValueError:
+            return None
+    for formato in (FORMATO_FECHA_HORA, FORMATO_FECHA):
+        try:
+            return datetime.strptime(texto, formato)
+        except ValueError:
+            continue
+    return None
+
+
+def parse_fecha_opcional(fecha):
+    """Retorna *fecha* (texto, ``date`` o ``datetime``) como ``datetime``, o ``None`` si es inválida."""
+    if isinstance(fecha, datetime):
+        return fecha
+    if isinstance(fecha, date):
+        return datetime(fecha.year, fecha.month, fecha.day)
+    if isinstance(fecha, str) and fecha:
+        return _interpretar(fecha[:19])
+    return None
+
+
+def parse_fecha(fecha):
+    """Interpreta *fecha* (``YYYY-MM-DD`` o ``YYYY-MM-DD HH:MM:SS``) como ``datetime``.
+
+    Raises:
+        ValueError: Si el texto no tiene uno de esos formatos.
+        TypeError: Si *fecha* no es un texto ni una fecha.
+    """
+    if not isinstance(fecha, (str, date)):
+        raise TypeError("La fecha debe ser un string o datetime.")
+    resultado = parse_fecha_opcional(fecha)
+    if resultado is None:
+        raise ValueError("Formato de fecha inválido. Use 'YYYY-MM-DD' o 'YYYY-MM-DD HH:MM:SS'.")
+    return resultado
+
+
+def epoch(fecha):
+    """Retorna *fecha* en segundos epoch (hora local sin zona), o ``None`` si es inválida."""
+    valor = parse_fecha_opcional(fecha)
+    if valor is None:
+        return None
+    return (valor.replace(tzinfo=None) - _EPOCH) // _SEGUNDO
+
+
+def clave_mes(valor):
+    """``AAAA-MM`` de un ``datetime``."""
+    return f"{valor.year:04d}-{valor.month:02d}"
+
+
+def clave_semana(valor):
+    """``AAAA-WNN`` (semana ISO) de un ``datetime``."""
+    anio, semana, _ = valor.isocalendar()
+    return f"{anio:04d}-W{semana:02d}"
+
+
+def clave_dia(valor):
+    """``AAAA-MM-DD`` de un ``datetime``."""
+    return f"{valor.year:04d}-{valor.month:02d}-{valor.day:02d}"
+
+
+def rango_mes(mes):
+    """Retorna el primer y el último segundo epoch del mes ``AAAA-MM``."""
+    anio, numero = (int(parte) for parte in mes.split("-"))
+    inicio = datetime(anio, numero, 1)
+    siguiente = datetime(anio + numero // 12, numero % 12 + 1, 1)
+    return epoch(inicio), epoch(siguiente) - 1
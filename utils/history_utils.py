@@ -1,32 +1,341 @@
+"""Historial de versiones de los archivos JSON con almacenamiento por chunks.
+
+Cada versión se guarda como una lista de *chunks* direccionados por su
+contenido (``history/<nombre>/objects``) más una línea en el manifiesto
+``history/<nombre>/versions.jsonl``. Los registros de una lista se agrupan en
+chunks con límites definidos por el propio contenido, de modo que al agregar,
+editar o eliminar algunos registros solo cambian los chunks que los
+contienen: el resto ya existe en disco y no se vuelve a escribir.
+
+La retención conserva las últimas ``MAX_VERSIONES`` versiones y, además, la
+última versión de cada día durante ``DIAS_RETENCION`` días. Los chunks que
+dejan de estar referenciados se eliminan al aplicar la retención.
+"""
+
+import hashlib
 import json
 import logging
 import os
-from datetime import datetime
+import re
+import sys
+from datetime import datetime, timedelta
 
 logger = logging.getLogger(__name__)
 
+# Cantidad media de registros por chunk (los límites dependen del contenido).
+CHUNK_PROMEDIO = 64
+# Tope de registros por chunk para acotar el tamaño de cada objeto.
+CHUNK_MAXIMO = 512
+# Versiones recientes que siempre se conservan.
+MAX_VERSIONES = 100
+# Días durante los cuales se conserva la última versión de cada día.
+DIAS_RETENCION = 30
+# Versiones nuevas toleradas antes de volver a aplicar la retención.
+MARGEN_RETENCION = 20
+
+_FORMATO_VERSION = "%Y%m%d%H%M%S%f"
+# Copias completas del historial anterior a los chunks: ``<AAAAMMDDHHMMSS>.json``.
+_VERSION_HEREDADA = re.compile(r"^\d{14}\.json$")
+
+# Conteo de versiones por archivo para no releer el manifiesto en cada guardado:
+# nombre de historial -> [versiones actuales, versiones tras la última retención]
+_CONTADORES = {}
+
+
+def _history_dir(path):
+    nombre = os.path.splitext(os.path.basename(path))[0]
+    base = os.path.dirname(os.path.abspath(path))
+    return os.path.join(base, "history", nombre)
+
+
+def _manifest_path(path):
+    return os.path.join(_history_dir(path), "versions.jsonl")
+
+
+def _object_path(path, digest):
+    return os.path.join(_history_dir(path), "objects", digest[:2], f"{digest}.json")
+
+
+def _serializar(valor):
+    return json.dumps(valor, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+
+
+def _digest(texto):
+    return hashlib.blake2b(texto.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def _dividir_en_chunks(data):
+    """Divide *data* en chunks serializados con límites definidos por contenido."""
+    if not isinstance(data, list):
+        return [_serializar(data)]
+    chunks = []
+    actual = []
+    for registro in data:
+        texto = _serializar(registro)
+        actual.append(texto)
+        limite = int(_digest(texto)[:8], 16) % CHUNK_PROMEDIO == 0
+        if limite or len(actual) >= CHUNK_MAXIMO:
+            chunks.append("[" + ",".join(actual) + "]")
+            actual = []
+    if actual:
+        chunks.append("[" + ",".join(actual) + "]")
+    return chunks
+
+
+def _escribir_objeto(path, digest, texto):
+    destino = _object_path(path, digest)
+    if os.path.exists(destino):
+        return
+    os.makedirs(os.path.dirname(destino), exist_ok=True)
+    temporal = destino + ".tmp"
+    with open(temporal, "w", encoding="utf-8") as f:
+        f.write(texto)
+    os.replace(temporal, destino)
+
+
+def _leer_manifiesto(path):
+    manifest = _manifest_path(path)
+    if not os.path.exists(manifest):
+        return []
+    versiones = []
+    with open(manifest, "r", encoding="utf-8") as f:
+        for linea in f:
+            linea = linea.strip()
+            if not linea:
+                continue
+            try:
+                versiones.append(json.loads(linea))
+            except json.JSONDecodeError:
+                logger.warning(f"Entrada de historial malformada en {manifest}. Se omitirá.")
+    return versiones
+
+
+def tiene_versiones(path):
+    """Indica si ya existe al menos una versión guardada de *path*."""
+    return os.path.exists(_manifest_path(path))
+
 
 def guardar_version(path, data):
-    """Guardar una versión del archivo original en data/history."""
+    """Guardar *data* como una nueva versión del archivo *path*.
+
+    Solo se escriben los chunks que aún no existen en el historial y una
+    línea en el manifiesto. Retorna el identificador de la versión o
+    ``None`` si ocurrió un error.
+    """
     try:
-        nombre = os.path.splitext(os.path.basename(path))[0]
-        history_dir = os.path.join("data", "history", nombre)
-        os.makedirs(history_dir, exist_ok=True)
-        timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
-        version_path = os.path.join(history_dir, f"{timestamp}.json")
-        with open(version_path, "w", encoding="utf-8") as f:
-            json.dump(data, f, indent=4)
+        chunks = _dividir_en_chunks(data)
+        digests = []
+        for texto in chunks:
+            digest = _digest(texto)
+            _escribir_objeto(path, digest, texto)
+            digests.append(digest)
+
+        return _registrar(path, {"lista": isinstance(data, list), "chunks": digests})
     except Exception as e:
         logger.error(f"Error al guardar versión de {path}: {e}")
+        return None
 
 
-def listar_versiones(path):
-    """Listar las versiones disponibles de un archivo."""
-    nombre = os.path.splitext(os.path.basename(path))[0]
-    history_dir = os.path.join("data", "history", nombre)
+def guardar_version_particiones(path, versiones):
+    """Registrar una versión de una colección guardada en particiones mensuales.
+
+    *versiones* indica, por mes ``AAAA-MM``, la versión del historial de cada
+    partición (que ``write_json`` versiona por separado) que forma la
+    colección en este momento. La entrada no escribe chunks: ``cargar_version``
+    reúne las particiones. Retorna el identificador de la versión o ``None``.
+    """
+    try:
+        return _registrar(path, {"lista": True, "particiones": dict(sorted(versiones.items()))})
+    except Exception as e:
+        logger.error(f"Error al guardar versión de {path}: {e}")
+        return None
+
+
+def _registrar(path, entrada):
+    """Anexa *entrada* al manifiesto de *path* y aplica la retención si corresponde."""
+    version = datetime.now().strftime(_FORMATO_VERSION)
+    entrada = {"version": version, **entrada}
+    manifest = _manifest_path(path)
+    os.makedirs(os.path.dirname(manifest), exist_ok=True)
+    with open(manifest, "a", encoding="utf-8") as f:
+        f.write(json.dumps(entrada, separators=(",", ":")) + "\n")
+
+    clave = _history_dir(path)
+    if clave not in _CONTADORES:
+        total = len(_leer_manifiesto(path))
+        _CONTADORES[clave] = [total, total]
+    else:
+        _CONTADORES[clave][0] += 1
+    if _CONTADORES[clave][0] - _CONTADORES[clave][1] >= MARGEN_RETENCION and (
+        _CONTADORES[clave][0] > MAX_VERSIONES
+    ):
+        aplicar_retencion(path)
+    return version
+
+
+def _versiones_heredadas(path):
+    """Retorna ``{version: archivo}`` con las copias completas del historial anterior.
+
+    Se conservan de solo lectura: se listan y restauran como cualquier otra
+    versión, pero la retención no las elimina.
+    """
+    history_dir = _history_dir(path)
     if not os.path.isdir(history_dir):
-        return []
-    archivos = [
-        os.path.join(history_dir, f) for f in os.listdir(history_dir) if f.endswith(".json")
-    ]
-    return sorted(archivos)
+        return {}
+    return {
+        os.path.splitext(archivo)[0]: os.path.join(history_dir, archivo)
+        for archivo in os.listdir(history_dir)
+        if _VERSION_HEREDADA.match(archivo)
+    }
+
+
+def listar_versiones(path):
+    """Listar los identificadores de las versiones disponibles de un archivo."""
+    versiones = {v["version"] for v in _leer_manifiesto(path)}
+    return sorted(versiones | set(_versiones_heredadas(path)))
+
+
+def ultima_version(path):
+    """Retorna el identificador de la versión más reciente de *path* o ``None``."""
+    versiones = _leer_manifiesto(path)
+    return versiones[-1]["version"] if versiones else None
+
+
+def cargar_version(path, version=None):
+    """Reconstruir el contenido de *path* en la versión indicada.
+
+    Si *version* es ``None`` se usa la más reciente. En una colección
+    particionada se reúnen los registros de las versiones de sus particiones
+    (ver ``guardar_version_particiones``). Lanza ``ValueError`` si la versión,
+    o alguna de las versiones de sus particiones, no existe.
+    """
+    versiones = _leer_manifiesto(path)
+    if version is None:
+        entrada = versiones[-1] if versiones else None
+    else:
+        entrada = next((v for v in versiones if v["version"] == version), None)
+    if entrada is None:
+        heredadas = _versiones_heredadas(path)
+        if version is None and heredadas:
+            version = max(heredadas)
+        if version in heredadas:
+            with open(heredadas[version], "r", encoding="utf-8") as f:
+                return json.load(f)
+        raise ValueError(f"No existe la versión '{version}' de {path}.")
+
+    if "particiones" in entrada:
+        from utils.storage import directorio_particiones
+
+        data = []
+        for mes, version_mes in entrada["particiones"].items():
+            particion = os.path.join(directorio_particiones(path), f"{mes}.json")
+            data.extend(cargar_version(particion, version_mes))
+        return data
+
+    partes = []
+    for digest in entrada["chunks"]:
+        with open(_object_path(path, digest), "r", encoding="utf-8") as f:
+            partes.append(json.load(f))
+    if not entrada.get("lista", True):
+        return partes[0] if partes else None
+    data = []
+    for parte in partes:
+        data.extend(parte)
+    return data
+
+
+def restaurar_version(path, version, destino=None):
+    """Restaurar una versión del historial sobre la colección de *path*.
+
+    La versión se guarda a través del almacén (``obtener_almacen().guardar``),
+    que reescribe el snapshot y vacía el journal: de lo contrario las
+    operaciones del journal se volverían a aplicar sobre los datos
+    restaurados. La restauración queda a su vez registrada como una nueva
+    versión. Con *destino* la versión solo se escribe en ese archivo.
+    """
+    from utils.json_utils import write_json
+    from utils.storage import obtener_almacen
+
+    data = cargar_version(path, version)
+    if destino is not None:
+        return write_json(destino, data)
+    return obtener_almacen().guardar(path, data)
+
+
+def exportar_version(path, version, directorio):
+    """Escribir la versión indicada como ``<directorio>/<nombre>.json``.
+
+    Permite materializar una versión completa para inspeccionarla o copiarla
+    manualmente al directorio de datos.
+    """
+    data = cargar_version(path, version)
+    os.makedirs(directorio, exist_ok=True)
+    destino = os.path.join(directorio, os.path.basename(path))
+    with open(destino, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=4)
+    return destino
+
+
+def aplicar_retencion(path, ahora=None):
+    """Descartar versiones fuera de la política de retención y sus chunks huérfanos."""
+    versiones = _leer_manifiesto(path)
+    ahora = ahora or datetime.now()
+    limite_diario = ahora - timedelta(days=DIAS_RETENCION)
+
+    conservar = set(range(max(0, len(versiones) - MAX_VERSIONES), len(versiones)))
+    ultima_por_dia = {}
+    for i, entrada in enumerate(versiones):
+        try:
+            fecha = datetime.strptime(entrada["version"], _FORMATO_VERSION)
+        except ValueError:
+            conservar.add(i)
+            continue
+        if fecha >= limite_diario:
+            ultima_por_dia[fecha.date()] = i
+    conservar.update(ultima_por_dia.values())
+
+    vigentes = [v for i, v in enumerate(versiones) if i in conservar]
+    manifest = _manifest_path(path)
+    if len(vigentes) != len(versiones):
+        temporal = manifest + ".tmp"
+        with open(temporal, "w", encoding="utf-8") as f:
+            for entrada in vigentes:
+                f.write(json.dumps(entrada, separators=(",", ":")) + "\n")
+        os.replace(temporal, manifest)
+
+        referenciados = {d for v in vigentes for d in v.get("chunks", ())}
+        objetos = os.path.join(_history_dir(path), "objects")
+        for raiz, _, archivos in os.walk(objetos):
+            for archivo in archivos:
+                if os.path.splitext(archivo)[0] not in referenciados:
+                    os.remove(os.path.join(raiz, archivo))
+
+    _CONTADORES[_history_dir(path)] = [len(vigentes), len(vigentes)]
+    return len(versiones) - len(vigentes)
+
+
+def _main(argv):
+    uso = (
+        "Uso: python -m utils.history_utils listar <archivo.json>\n"
+        "     python -m utils.history_utils restaurar <archivo.json> <version>\n"
+        "     python -m utils.history_utils exportar <archivo.json> <version> <directorio>"
+    )
+    if len(argv) < 2:
+        print(uso)
+        return 1
+    comando, path = argv[0], argv[1]
+    if comando == "listar":
+        for version in listar_versiones(path):
+            print(version)
+        return 0
+    if comando == "restaurar" and len(argv) == 3:
+        return 0 if restaurar_version(path, argv[2]) else 1
+    if comando == "exportar" and len(argv) == 4:
+        print(exportar_version(path, argv[2], argv[3]))
+        return 0
+    print(uso)
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(_main(sys.argv[1:]))
@@ -0,0 +1,96 @@
+import json
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+
+def journal_path(path):
+    """Return the journal file associated with the JSON snapshot *path*."""
+    return os.path.splitext(path)[0] + ".journal"
+
+
+def append_journal(path, record):
+    """Append *record* as a single JSON line to the journal at *path*.
+
+    The line is flushed and ``fsync``'d before returning so that an
+    acknowledged record survives a crash. Returns ``True`` on success and
+    ``False`` if the write failed (the error is logged).
+    """
+    try:
+        directorio = os.path.dirname(path)
+        if directorio:
+            os.makedirs(directorio, exist_ok=True)
+        linea = json.dumps(record, ensure_ascii=False, separators=(",", ":"))
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(linea + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+    except Exception as e:
+        logger.error(f"Error al anexar al journal {path}: {e}")
+        return False
+    return True
+
+
+def append_journal_batch(path, records):
+    """Append *records* to the journal at *path* as one atomic line.
+
+    The batch is stored as ``{"op": "lote", "ops": [...]}`` with a single
+    ``fsync``; ``read_journal`` expands it back into its records. Since a torn
+    line is skipped on read, either every record of the batch survives a
+    crash or none does.
+    """
+    return append_journal(path, {"op": "lote", "ops": list(records)})
+
+
+def read_journal(path):
+    """Return the list of records stored in the journal at *path*.
+
+    Missing journals yield an empty list. A malformed line (for example a
+    partially written last line after a crash) is logged and skipped. Batches
+    written by ``append_journal_batch`` are expanded into their records.
+    """
+    if not os.path.exists(path):
+        return []
+    registros = []
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            for numero, linea in enumerate(f, start=1):
+                linea = linea.strip()
+                if not linea:
+                    continue
+                try:
+                    registro = json.loads(linea)
+                except json.JSONDecodeError:
+                    logger.warning(
+                        f"Línea {numero} del journal {path} malformada. Se omitirá."
+                    )
+                    continue
+                if isinstance(registro, dict) and registro.get("op") == "lote":
+                    registros.extend(registro.get("ops", []))
+                else:
+                    registros.append(registro)
+    except Exception as e:
+        logger.error(f"Error al leer el journal {path}: {e}")
+    return registros
+
+
+def journal_size(path):
+    """Return the size in bytes of the journal at *path* (0 if missing)."""
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+
+def truncate_journal(path):
+    """Empty the journal at *path* once its records have been compacted."""
+    try:
+        if os.path.exists(path):
+            with open(path, "w", encoding="utf-8") as f:
+                f.flush()
+                os.fsync(f.fileno())
+    except Exception as e:
+        logger.error(f"Error al vaciar el journal {path}: {e}")
+        return False
+    return True
@@ -4,7 +4,7 @@ import os
 import shutil
 from datetime import datetime
 
-from utils.history_utils import guardar_version
+from utils.history_utils import guardar_version, tiene_versiones
 
 logger = logging.getLogger(__name__)
 
@@ -30,8 +30,90 @@ def read_json(path):
     return []
 
 
+def iter_json(path, tamano_bloque=1 << 16):
+    """Yield the elements of the JSON array stored in *path* one at a time.
+
+    The file is read in blocks of *tamano_bloque* characters and each element
+    is decoded as soon as it is complete, so memory stays bounded by the size
+    of the largest element instead of the whole file. Like ``read_json``, a
+    missing file yields nothing and a malformed one is logged (the elements
+    decoded before the error have already been yielded).
+    """
+    if not os.path.exists(path):
+        logger.debug(f"Archivo no encontrado: {path}")
+        return
+    decoder = json.JSONDecoder()
+    with open(path, "r", encoding="utf-8") as f:
+        buffer, pos, fin_archivo = "", 0, False
+
+        def leer():
+            nonlocal buffer, pos, fin_archivo
+            bloque = f.read(tamano_bloque)
+            fin_archivo = not bloque
+            buffer, pos = buffer[pos:] + bloque, 0
+
+        def siguiente():
+            """Return the next non-blank character without consuming it."""
+            nonlocal pos
+            while True:
+                while pos < len(buffer) and buffer[pos].isspace():
+                    pos += 1
+                if pos < len(buffer) or fin_archivo:
+                    return buffer[pos] if pos < len(buffer) else ""
+                leer()
+
+        def malformado():
+            logger.error(
+                f"Advertencia: El archivo {path} est\u00e1 vac\u00edo o malformado. Se omitir\u00e1 el resto."
+            )
+
+        primero = siguiente()
+        if primero != "[":
+            if primero:
+                logger.error(f"El archivo {path} no contiene una lista válida.")
+            else:
+                malformado()
+            return
+        pos += 1
+        if siguiente() == "]":
+            return
+        while True:
+            try:
+                elemento, fin = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                fin = None
+            incompleto = fin is None or (
+                # Un número al final del bloque podría seguir en el próximo.
+                not fin_archivo
+                and isinstance(elemento, (int, float))
+                and buffer[fin:].lstrip()[:1] not in (",", "]")
+            )
+            if incompleto:
+                if fin_archivo:
+                    malformado()
+                    return
+                leer()
+                siguiente()
+                continue
+            pos = fin
+            yield elemento
+            separador = siguiente()
+            if separador == ",":
+                pos += 1
+                siguiente()
+            elif separador == "]":
+                return
+            else:
+                malformado()
+                return
+
+
 def crear_backup(path):
-    """Crear una copia de seguridad del archivo indicado en data/backups."""
+    """Crear una copia completa del archivo indicado en data/backups.
+
+    ``write_json`` ya no la invoca en cada guardado (el historial por chunks
+    cubre ese caso); queda disponible para respaldos explícitos.
+    """
     try:
         if not os.path.exists(path):
             return
@@ -48,17 +130,19 @@ def crear_backup(path):
 def write_json(path, data):
     """Serialize *data* to JSON and write it into *path*.
 
-    Any exception during the write process is logged.
+    The written content is recorded as a new version in the chunked history
+    (see ``utils.history_utils``), so only the chunks that changed hit the
+    disk. The first time a pre-existing file is written, its previous content
+    is recorded too. Any exception during the write process is logged.
     """
     try:
-        if os.path.exists(path):
-            # Guardar la versión actual antes de sobrescribir
-            datos_previos = read_json(path)
-            guardar_version(path, datos_previos)
-        crear_backup(path)
+        if os.path.exists(path) and not tiene_versiones(path):
+            # Conservar el contenido original antes de la primera escritura
+            guardar_version(path, read_json(path))
         os.makedirs(os.path.dirname(path), exist_ok=True)
         with open(path, "w", encoding="utf-8") as f:
             json.dump(data, f, indent=4)
+        guardar_version(path, data)
     except Exception as e:
         logger.error(f"Error al escribir {path}: {e}")
         return False
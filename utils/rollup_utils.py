@@ -0,0 +1,283 @@
+"""Acumulados persistentes por día, semana y mes de una colección con fecha.
+
+Las estadísticas de ventas, compras y gastos agrupan montos por período. En
+lugar de recorrer la colección completa en cada consulta, ``RollupPeriodos``
+mantiene en ``<datos>/rollups/<coleccion>.json`` los totales de cada período
+junto con la *marca* del almacén (``almacen.marca``) a la que corresponden.
+
+Las altas y bajas hechas con ``aplicar`` suman o restan la entidad en sus tres
+períodos y actualizan la marca. Si la colección cambió por otro camino (un
+guardado completo, otro proceso, una restauración) la marca no coincide y los
+totales se reconstruyen con una pasada sobre la colección.
+"""
+
+import json
+import logging
+import os
+import threading
+from bisect import bisect_left
+from itertools import accumulate
+
+from utils.fechas import clave_dia, clave_mes, clave_semana, parse_fecha_opcional
+from utils.storage import nombre_coleccion, obtener_almacen
+
+logger = logging.getLogger(__name__)
+
+PERIODOS = ("mes", "semana", "dia")
+
+
+def claves_periodo(fecha):
+    """Retorna ``{"mes": AAAA-MM, "semana": AAAA-WNN, "dia": AAAA-MM-DD}``.
+
+    Retorna ``None`` si *fecha* no es una fecha ``YYYY-MM-DD[ HH:MM:SS]`` válida.
+    """
+    fecha = parse_fecha_opcional(fecha)
+    if fecha is None:
+        return None
+    return {"mes": clave_mes(fecha), "semana": clave_semana(fecha), "dia": clave_dia(fecha)}
+
+
+def rollup_path(path):
+    """Retorna el archivo de acumulados de la colección de *path*."""
+    return os.path.join(
+        os.path.dirname(os.path.abspath(path)), "rollups", f"{nombre_coleccion(path)}.json"
+    )
+
+
+def formatear_totales(totales):
+    """Ordena ``{periodo: total}`` y formatea cada total como ``Gs 1.234``."""
+    formatted = []
+    for periodo, total in sorted(totales.items()):
+        total_str = f"{total:,.0f}".replace(",", "X").replace(".", ",").replace("X", ".")
+        formatted.append((periodo, f"Gs {total_str}"))
+    return formatted
+
+
+def _normalizar(marca):
+    # La marca guardada pasó por JSON: las tuplas vuelven como listas.
+    return json.loads(json.dumps(marca))
+
+
+class RollupPeriodos:
+    """Totales por período de una colección, actualizados en cada alta o baja.
+
+    *valor* extrae el monto de una entidad (por ejemplo ``ticket.total``) y
+    *campo* indica el atributo con su fecha. Cada período guarda
+    ``clave -> [total, cantidad]``; cuando la cantidad llega a cero la clave
+    desaparece, igual que si se recorriera la colección.
+    """
+
+    def __init__(self, valor, campo="fecha"):
+        self._valor = valor
+        self._campo = campo
+        self._datos = {}
+        self._lock = threading.RLock()
+
+    def totales(self, path, cargar, periodo):
+        """Retorna ``{clave: total}`` de *periodo* para la colección de *path*.
+
+        *cargar* devuelve la colección completa y solo se usa si hay que
+        reconstruir los acumulados.
+        """
+        if periodo not in PERIODOS:
+            raise ValueError(f"Período desconocido: '{periodo}'.")
+        with self._lock:
+            datos = self._vigentes(path)
+            if datos is None:
+                datos = self._reconstruir(path, cargar)
+            return {clave: total for clave, (total, _) in datos["periodos"][periodo].items()}
+
+    def aplicar(self, path, escritura, sumar=(), restar=()):
+        """Ejecuta *escritura* y actualiza los acumulados con sus entidades.
+
+        Si los acumulados no estaban vigentes antes de escribir, o la
+        escritura falló, no se tocan: la próxima consulta los reconstruye.
+        """
+        with self._lock:
+            datos = self._vigentes(path)
+            ok = escritura()
+            if datos is None or ok is False:
+                return ok
+            for entidad in sumar:
+                self._acumular(datos, entidad, 1)
+            for entidad in restar:
+                self._acumular(datos, entidad, -1)
+            datos["marca"] = _normalizar(obtener_almacen().marca(path))
+            self._escribir(path, datos)
+            return ok
+
+    def invalidar(self, path=None):
+        """Olvida los acumulados en memoria de *path* (o todos)."""
+        with self._lock:
+            if path is None:
+                self._datos.clear()
+            else:
+                self._datos.pop(path, None)
+
+    def _vigentes(self, path):
+        """Retorna los acumulados de *path* si corresponden a la colección actual."""
+        marca = _normalizar(obtener_almacen().marca(path))
+        datos = self._datos.get(path)
+        if datos is None:
+            datos = self._leer(path)
+        if datos is None or datos.get("marca") != marca:
+            self._datos.pop(path, None)
+            return None
+        self._datos[path] = datos
+        return datos
+
+    def _reconstruir(self, path, cargar):
+        logger.debug(f"Reconstruyendo acumulados por período de {path}")
+        marca = _normalizar(obtener_almacen().marca(path))
+        datos = {"marca": marca, "periodos": {periodo: {} for periodo in PERIODOS}}
+        for entidad in cargar():
+            self._acumular(datos, entidad, 1)
+        self._datos[path] = datos
+        self._escribir(path, datos)
+        return datos
+
+    def _acumular(self, datos, entidad, signo):
+        claves = claves_periodo(getattr(entidad, self._campo, None))
+        if claves is None:
+            logger.error(
+                f"Advertencia: Fecha inválida '{getattr(entidad, self._campo, None)}'. "
+                "Se ignorará el registro en los acumulados por período."
+            )
+            return
+        monto = float(self._valor(entidad) or 0)
+        for periodo, clave in claves.items():
+            acumulado = datos["periodos"][periodo].setdefault(clave, [0.0, 0])
+            acumulado[0] += signo * monto
+            acumulado[1] += signo
+            if acumulado[1] <= 0:
+                del datos["periodos"][periodo][clave]
+
+    @staticmethod
+    def _leer(path):
+        datos = _leer_archivo(path)
+        if not isinstance(datos, dict) or set(datos.get("periodos", {})) != set(PERIODOS):
+            return None
+        return datos
+
+    @staticmethod
+    def _escribir(path, datos):
+        _escribir_archivo(path, datos)
+
+
+def _leer_archivo(path):
+    archivo = rollup_path(path)
+    if not os.path.exists(archivo):
+        return None
+    try:
+        with open(archivo, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        logger.warning(f"No se pudieron leer los acumulados {archivo}: {e}")
+        return None
+
+
+def _escribir_archivo(path, datos):
+    archivo = rollup_path(path)
+    temporal = archivo + ".tmp"
+    try:
+        os.makedirs(os.path.dirname(archivo), exist_ok=True)
+        with open(temporal, "w", encoding="utf-8") as f:
+            json.dump(datos, f)
+        os.replace(temporal, archivo)
+    except OSError as e:
+        logger.warning(f"No se pudieron guardar los acumulados {archivo}: {e}")
+
+
+class SaldosMensuales:
+    """Neto mensual por clave de una colección de movimientos (checkpoints).
+
+    *clave* extrae el agrupador de una entidad (por ejemplo la materia prima
+    de un movimiento de stock) y *valor* su cantidad con signo. Se guarda
+    ``clave -> {AAAA-MM: neto}`` con la misma *marca* que ``RollupPeriodos``,
+    de modo que el saldo acumulado hasta un mes se obtiene con una búsqueda
+    binaria sobre los meses, sin recorrer los movimientos.
+    """
+
+    def __init__(self, clave, valor, campo="fecha"):
+        self._clave = clave
+        self._valor = valor
+        self._campo = campo
+        self._datos = {}
+        self._prefijos = {}  # (path, clave) -> (meses ordenados, netos acumulados)
+        self._lock = threading.RLock()
+
+    def neto_hasta(self, path, cargar, clave, mes=None):
+        """Suma los netos de *clave* de los meses anteriores a *mes* (o todos)."""
+        clave = str(clave)
+        with self._lock:
+            datos = self._vigentes(path)
+            if datos is None:
+                datos = self._reconstruir(path, cargar)
+            prefijo = self._prefijos.get((path, clave))
+            if prefijo is None:
+                netos = datos["saldos"].get(clave, {})
+                meses = sorted(netos)
+                prefijo = (meses, list(accumulate(netos[m] for m in meses)))
+                self._prefijos[(path, clave)] = prefijo
+            meses, acumulados = prefijo
+            posicion = len(meses) if mes is None else bisect_left(meses, mes)
+            return acumulados[posicion - 1] if posicion else 0.0
+
+    def aplicar(self, path, escritura, entidades):
+        """Ejecuta *escritura* y suma *entidades* a sus meses."""
+        with self._lock:
+            datos = self._vigentes(path)
+            ok = escritura()
+            if datos is None or ok is False:
+                return ok
+            for entidad in entidades:
+                clave = self._acumular(datos, entidad)
+                self._prefijos.pop((path, clave), None)
+            datos["marca"] = _normalizar(obtener_almacen().marca(path))
+            _escribir_archivo(path, datos)
+            return ok
+
+    def invalidar(self, path=None):
+        """Olvida los saldos en memoria de *path* (o todos)."""
+        with self._lock:
+            if path is None:
+                self._datos.clear()
+                self._prefijos.clear()
+            else:
+                self._datos.pop(path, None)
+                self._prefijos = {k: v for k, v in self._prefijos.items() if k[0] != path}
+
+    def _vigentes(self, path):
+        marca = _normalizar(obtener_almacen().marca(path))
+        datos = self._datos.get(path)
+        if datos is None:
+            datos = _leer_archivo(path)
+            if not isinstance(datos, dict) or not isinstance(datos.get("saldos"), dict):
+                datos = None
+        if datos is None or datos.get("marca") != marca:
+            self.invalidar(path)
+            return None
+        self._datos[path] = datos
+        return datos
+
+    def _reconstruir(self, path, cargar):
+        logger.debug(f"Reconstruyendo saldos mensuales de {path}")
+        datos = {"marca": _normalizar(obtener_almacen().marca(path)), "saldos": {}}
+        for entidad in cargar():
+            self._acumular(datos, entidad)
+        self._datos[path] = datos
+        _escribir_archivo(path, datos)
+        return datos
+
+    def _acumular(self, datos, entidad):
+        claves = claves_periodo(getattr(entidad, self._campo, None))
+        if claves is None:
+            logger.error(
+                f"Advertencia: Fecha inválida '{getattr(entidad, self._campo, None)}'. "
+                "Se ignorará el registro en los saldos mensuales."
+            )
+            return None
+        clave = str(self._clave(entidad))
+        netos = datos["saldos"].setdefault(clave, {})
+        netos[claves["mes"]] = netos.get(claves["mes"], 0.0) + float(self._valor(entidad) or 0)
+        return clave
@@ -0,0 +1,913 @@
+"""Capa de almacenamiento intercambiable para los controladores.
+
+Los controladores identifican cada colección por la ruta de su archivo JSON
+(``DATA_PATH``) y operan a través del almacén devuelto por
+``obtener_almacen()``. El backend se elige con ``config.get_storage_backend()``:
+
+* ``json`` (por defecto): un snapshot ``<coleccion>.json`` más un journal de
+  solo anexado ``<coleccion>.journal``. Las altas, ediciones y bajas
+  individuales se anexan al journal y se compactan en el snapshot al superar
+  ``JOURNAL_MAX_BYTES``. Las colecciones con ``"particion": "mes"`` en su
+  esquema (los tickets) guardan el snapshot en particiones mensuales
+  ``<coleccion>/AAAA-MM.json`` con un ``manifest.json`` de los meses
+  existentes; las consultas por rango solo abren los meses que se solapan.
+  ``iterar`` recorre los registros de a uno (una partición o un bloque del
+  snapshot por vez) para los cálculos que no necesitan la colección entera.
+* ``sqlite``: una base ``cafe.db`` junto a los archivos de datos, con una
+  tabla por colección indexada por id, fecha y clave secundaria. La primera
+  vez que se usa una colección se migra automáticamente desde su JSON.
+"""
+
+import json
+import logging
+import os
+import re
+import shutil
+import sqlite3
+import sys
+import threading
+
+import config
+from utils.journal_utils import (
+    append_journal,
+    append_journal_batch,
+    journal_path,
+    journal_size,
+    read_journal,
+    truncate_journal,
+)
+from utils.history_utils import guardar_version, guardar_version_particiones, ultima_version
+from utils.json_utils import iter_json, read_json, write_json
+
+logger = logging.getLogger(__name__)
+
+# Tamaño (en bytes) a partir del cual un journal se compacta en su snapshot.
+JOURNAL_MAX_BYTES = 512 * 1024
+
+# Campos indexados por colección: ``id`` es la clave primaria, ``fecha`` el
+# campo de las consultas por rango y ``clave`` una búsqueda secundaria.
+ESQUEMAS = {
+    "productos": {"id": "id"},
+    "materias_primas": {"id": "id"},
+    "recetas": {"id": "id", "clave": "producto_id"},
+    "tickets": {"id": "id", "fecha": "fecha", "particion": "mes"},
+    "compras": {"id": "id", "fecha": "fecha", "clave": "proveedor_id"},
+    "gastos_adicionales": {"id": "id", "fecha": "fecha"},
+    "proveedores": {"id": "id"},
+    "planes_venta": {"id": "nombre", "fecha": "actualizado"},
+    "movimientos_stock": {"id": "id", "fecha": "fecha", "clave": "materia_prima_id", "particion": "mes"},
+}
+
+
+def nombre_coleccion(path):
+    """Retorna el nombre de la colección asociada al archivo *path*."""
+    return os.path.splitext(os.path.basename(path))[0]
+
+
+def esquema(path):
+    """Retorna el esquema de índices de la colección de *path*."""
+    return ESQUEMAS.get(nombre_coleccion(path), {"id": "id"})
+
+
+def normalizar_fecha(valor):
+    """Normaliza una fecha a ``YYYY-MM-DD HH:MM:SS`` para comparar como texto."""
+    if valor is None:
+        return None
+    if hasattr(valor, "strftime"):
+        return valor.strftime("%Y-%m-%d %H:%M:%S")
+    texto = str(valor)[:19]
+    if len(texto) == 10:
+        texto += " 00:00:00"
+    return texto
+
+
+# Filas que lee cada consulta de ``AlmacenSQLite.iterar``.
+LOTE_ITERACION = 500
+
+# Partición de los registros sin una fecha válida.
+SIN_FECHA = "sin-fecha"
+
+
+def mes_de(registro, campo="fecha"):
+    """Retorna el mes ``AAAA-MM`` de *registro* o ``SIN_FECHA``."""
+    fecha = normalizar_fecha(registro.get(campo))
+    if fecha and re.fullmatch(r"\d{4}-\d{2}", fecha[:7]):
+        return fecha[:7]
+    return SIN_FECHA
+
+
+def directorio_particiones(path):
+    """Retorna el directorio con las particiones mensuales de *path*."""
+    return os.path.splitext(path)[0]
+
+
+def _registro_de(operacion):
+    # Los journals de tickets anteriores guardaban el registro en "ticket".
+    return operacion.get("registro", operacion.get("ticket")) or {}
+
+
+def _en_rango(registro, campo, inicio, fin):
+    fecha = normalizar_fecha(registro.get(campo))
+    if not fecha:
+        return False
+    if inicio is not None and fecha < inicio:
+        return False
+    if fin is not None and fecha > fin:
+        return False
+    return True
+
+
+def _firma_archivo(path):
+    try:
+        estado = os.stat(path)
+    except OSError:
+        return None
+    return (estado.st_ino, estado.st_mtime_ns, estado.st_size)
+
+
+class AlmacenJSON:
+    """Almacén basado en snapshot JSON + journal de solo anexado."""
+
+    @staticmethod
+    def _particionada(path):
+        return esquema(path).get("particion") == "mes"
+
+    def rango_eficiente(self, path):
+        """Indica si ``rango`` evita recorrer la colección completa."""
+        return self._particionada(path)
+
+    def firma(self, path):
+        """Retorna un valor que cambia cada vez que cambia la colección.
+
+        En las colecciones particionadas incluye cada mes del manifest, de
+        modo que también cambia si una partición se edita o se restaura por
+        fuera del almacén.
+        """
+        firma = (_firma_archivo(path), _firma_archivo(journal_path(path)))
+        if self._particionada(path):
+            firma += (_firma_archivo(self._manifest_path(path)),)
+            firma += tuple(
+                _firma_archivo(self._particion_path(path, mes)) for mes in self._leer_manifest(path)
+            )
+        return firma
+
+    def marca(self, path):
+        """Retorna una firma persistente de la colección, apta para guardar en JSON.
+
+        A diferencia de ``firma`` sirve entre procesos: los datos derivados
+        guardados en disco (por ejemplo los acumulados por período) la usan
+        para saber si siguen correspondiendo a la colección.
+        """
+        return [list(f) if f else None for f in self.firma(path)]
+
+    def cargar(self, path):
+        if self._particionada(path):
+            return self._cargar_particiones(path)
+        data = read_json(path)
+        if not isinstance(data, list):
+            logger.error(f"El archivo {path} no contiene una lista válida.")
+            data = []
+        registros = read_journal(journal_path(path))
+        if registros:
+            data = self._aplicar_journal(list(data), registros, esquema(path)["id"])
+        return data
+
+    def guardar(self, path, registros):
+        if self._particionada(path):
+            return self._guardar_particiones(path, registros)
+        ok = write_json(path, list(registros))
+        if ok:
+            truncate_journal(journal_path(path))
+        return ok
+
+    def compactar(self, path):
+        """Incorpora el journal de *path* a su snapshot."""
+        if self._particionada(path):
+            return self._compactar_particiones(path)
+        return self.guardar(path, self.cargar(path))
+
+    def agregar(self, path, registro):
+        return self._anexar(path, {"op": "add", "registro": registro})
+
+    def agregar_varios(self, path, registros):
+        """Agrega varios registros anexando una sola línea al journal."""
+        operaciones = [{"op": "add", "registro": registro} for registro in registros]
+        return self._anexar(path, *operaciones) if operaciones else True
+
+    def actualizar(self, path, registro):
+        return self._anexar(path, *self._operaciones_actualizar(path, registro))
+
+    def actualizar_varios(self, path, registros):
+        """Actualiza varios registros anexando una sola línea al journal."""
+        operaciones = []
+        for registro in registros:
+            operaciones.extend(self._operaciones_actualizar(path, registro))
+        return self._anexar(path, *operaciones) if operaciones else True
+
+    def _operaciones_actualizar(self, path, registro):
+        operaciones = []
+        if self._particionada(path):
+            campos = esquema(path)
+            anterior = self.obtener(path, registro.get(campos["id"]))
+            if anterior is not None and mes_de(anterior, campos["fecha"]) != mes_de(registro, campos["fecha"]):
+                # El registro cambia de mes: se quita de su partición anterior.
+                operaciones.append(self._baja(path, anterior))
+        operaciones.append({"op": "add", "registro": registro})
+        return operaciones
+
+    def eliminar(self, path, valor):
+        registro = self.obtener(path, valor)
+        if registro is None:
+            return False
+        if self._particionada(path):
+            return self._anexar(path, self._baja(path, registro))
+        return self._anexar(path, {"op": "del", "id": valor})
+
+    def obtener(self, path, valor):
+        campo = esquema(path)["id"]
+        if self._particionada(path):
+            return self._obtener_particionado(path, campo, valor)
+        return next((r for r in self.cargar(path) if r.get(campo) == valor), None)
+
+    def buscar(self, path, valor):
+        campo = esquema(path).get("clave", "id")
+        return [r for r in self.cargar(path) if r.get(campo) == valor]
+
+    def rango(self, path, inicio=None, fin=None):
+        campo = esquema(path).get("fecha", "fecha")
+        inicio, fin = normalizar_fecha(inicio), normalizar_fecha(fin)
+        if self._particionada(path):
+            desde = inicio[:7] if inicio else None
+            hasta = fin[:7] if fin else None
+            data = self._cargar_particiones(
+                path,
+                lambda mes: mes != SIN_FECHA
+                and (desde is None or mes >= desde)
+                and (hasta is None or mes <= hasta),
+            )
+        else:
+            data = self.cargar(path)
+        return [r for r in data if _en_rango(r, campo, inicio, fin)]
+
+    def iterar(self, path, inicio=None, fin=None):
+        """Recorre los registros de *path* (o los del período) sin cargarlos todos.
+
+        El journal, acotado por ``JOURNAL_MAX_BYTES``, se reproduce primero en
+        un estado por clave; luego se lee el snapshot elemento por elemento (o
+        una partición mensual por vez) reemplazando o saltando los registros
+        que el journal modificó, y al final se emiten sus altas nuevas. El
+        orden puede diferir del de ``cargar`` pero el contenido es el mismo.
+        """
+        campos = esquema(path)
+        campo = campos.get("fecha", "fecha")
+        inicio, fin = normalizar_fecha(inicio), normalizar_fecha(fin)
+        filtrar = inicio is not None or fin is not None
+        if self._particionada(path):
+            if os.path.exists(path):
+                # Snapshot anterior a las particiones: puede repetir registros.
+                yield from (self.rango(path, inicio, fin) if filtrar else self.cargar(path))
+                return
+            desde = inicio[:7] if inicio else None
+            hasta = fin[:7] if fin else None
+            fuentes = (
+                self._leer_particion(path, mes)
+                for mes in self._leer_manifest(path)
+                if not filtrar
+                or (mes != SIN_FECHA and (desde is None or mes >= desde) and (hasta is None or mes <= hasta))
+            )
+        else:
+            fuentes = [iter_json(path)]
+
+        pendientes = {}  # clave -> registro final, o None si se eliminó
+        for operacion in read_journal(journal_path(path)):
+            if operacion.get("op") == "add":
+                registro = _registro_de(operacion)
+                pendientes[registro.get(campos["id"])] = registro
+            elif operacion.get("op") == "del":
+                pendientes[operacion.get("id")] = None
+
+        for registros in fuentes:
+            for registro in registros:
+                clave = registro.get(campos["id"])
+                if clave in pendientes:
+                    registro = pendientes.pop(clave)
+                    if registro is None:
+                        continue
+                if not filtrar or _en_rango(registro, campo, inicio, fin):
+                    yield registro
+        for registro in pendientes.values():
+            if registro is not None and (not filtrar or _en_rango(registro, campo, inicio, fin)):
+                yield registro
+
+    def meses(self, path):
+        """Retorna los meses ``AAAA-MM`` con registros en la colección."""
+        campo = esquema(path).get("fecha", "fecha")
+        if self._particionada(path):
+            meses = set(self._leer_manifest(path))
+            if os.path.exists(path):
+                # Snapshot anterior a las particiones, hasta su primera compactación.
+                heredados = read_json(path)
+                if isinstance(heredados, list):
+                    meses.update(mes_de(r, campo) for r in heredados)
+        else:
+            meses = {mes_de(r, campo) for r in self.cargar(path)}
+        return sorted(meses - {SIN_FECHA})
+
+    def _anexar(self, path, *operaciones):
+        """Anexa *operaciones* al journal; si son varias, como un lote atómico."""
+        destino = journal_path(path)
+        if self._particionada(path):
+            campo_fecha = esquema(path)["fecha"]
+            nuevos = {
+                mes_de(_registro_de(op), campo_fecha) for op in operaciones if op["op"] == "add"
+            }
+            meses = self._leer_manifest(path)
+            if nuevos - set(meses):
+                self._escribir_manifest(path, meses + sorted(nuevos))
+        if len(operaciones) == 1:
+            ok = append_journal(destino, operaciones[0])
+        else:
+            ok = append_journal_batch(destino, operaciones)
+        if not ok:
+            return False
+        if journal_size(destino) >= JOURNAL_MAX_BYTES:
+            self.compactar(path)
+        return True
+
+    # --- Particiones mensuales -------------------------------------------
+
+    @staticmethod
+    def _manifest_path(path):
+        return os.path.join(directorio_particiones(path), "manifest.json")
+
+    @staticmethod
+    def _particion_path(path, mes):
+        return os.path.join(directorio_particiones(path), f"{mes}.json")
+
+    def _leer_manifest(self, path):
+        manifest = self._manifest_path(path)
+        if not os.path.exists(manifest):
+            return []
+        data = read_json(manifest)
+        return sorted(data.get("meses", [])) if isinstance(data, dict) else []
+
+    def _escribir_manifest(self, path, meses):
+        manifest = self._manifest_path(path)
+        temporal = manifest + ".tmp"
+        os.makedirs(os.path.dirname(manifest), exist_ok=True)
+        with open(temporal, "w", encoding="utf-8") as f:
+            json.dump({"meses": sorted(set(meses))}, f, indent=4)
+        os.replace(temporal, manifest)
+
+    def _leer_particion(self, path, mes):
+        particion = self._particion_path(path, mes)
+        if not os.path.exists(particion):
+            return []
+        data = read_json(particion)
+        return data if isinstance(data, list) else []
+
+    def _baja(self, path, registro):
+        campos = esquema(path)
+        return {"op": "del", "id": registro.get(campos["id"]), "particion": mes_de(registro, campos["fecha"])}
+
+    def _cargar_particiones(self, path, incluir_mes=None):
+        """Lee el snapshot heredado, las particiones y el journal de *path*.
+
+        Con *incluir_mes* solo se abren las particiones (y se reproducen las
+        altas del journal) de los meses para los que retorna ``True``.
+        """
+        campos = esquema(path)
+        data = read_json(path) if os.path.exists(path) else []
+        if not isinstance(data, list):
+            logger.error(f"El archivo {path} no contiene una lista válida.")
+            data = []
+        heredados = bool(data)
+        for mes in self._leer_manifest(path):
+            if incluir_mes is not None and not incluir_mes(mes):
+                continue
+            registros = self._leer_particion(path, mes)
+            if heredados:
+                # Un snapshot anterior a las particiones puede repetir registros.
+                operaciones = [{"op": "add", "registro": r} for r in registros]
+                data = self._aplicar_journal(data, operaciones, campos["id"])
+            else:
+                data.extend(registros)
+        operaciones = read_journal(journal_path(path))
+        if incluir_mes is not None:
+            operaciones = [
+                op
+                for op in operaciones
+                if op.get("op") != "add" or incluir_mes(mes_de(_registro_de(op), campos["fecha"]))
+            ]
+        if operaciones:
+            data = self._aplicar_journal(data, operaciones, campos["id"])
+        return data
+
+    def _obtener_particionado(self, path, campo, valor):
+        for operacion in reversed(read_journal(journal_path(path))):
+            if operacion.get("op") == "del" and operacion.get("id") == valor:
+                return None
+            if operacion.get("op") == "add" and _registro_de(operacion).get(campo) == valor:
+                return _registro_de(operacion)
+        if os.path.exists(path):
+            heredados = read_json(path)
+            if isinstance(heredados, list):
+                encontrado = next((r for r in heredados if r.get(campo) == valor), None)
+                if encontrado is not None:
+                    return encontrado
+        # Las bajas suelen ser de ventas recientes: se recorre desde el último mes.
+        for mes in reversed(self._leer_manifest(path)):
+            encontrado = next(
+                (r for r in self._leer_particion(path, mes) if r.get(campo) == valor), None
+            )
+            if encontrado is not None:
+                return encontrado
+        return None
+
+    def _guardar_particiones(self, path, registros):
+        campo_fecha = esquema(path)["fecha"]
+        por_mes = {}
+        for registro in registros:
+            por_mes.setdefault(mes_de(registro, campo_fecha), []).append(registro)
+        for mes, registros_mes in por_mes.items():
+            if not write_json(self._particion_path(path, mes), registros_mes):
+                return False
+        for mes in set(self._leer_manifest(path)) - set(por_mes):
+            self._borrar(self._particion_path(path, mes))
+        self._escribir_manifest(path, por_mes)
+        self._versionar_particiones(path, por_mes)
+        # El snapshot anterior a las particiones ya quedó repartido por mes.
+        self._borrar(path)
+        truncate_journal(journal_path(path))
+        return True
+
+    def _compactar_particiones(self, path):
+        """Incorpora el journal reescribiendo solo los meses que toca."""
+        if os.path.exists(path):
+            # Primera compactación: migra el snapshot heredado a particiones.
+            return self._guardar_particiones(path, self._cargar_particiones(path))
+        campos = esquema(path)
+        por_mes = {}
+        for operacion in read_journal(journal_path(path)):
+            if operacion.get("op") == "add":
+                mes = mes_de(_registro_de(operacion), campos["fecha"])
+            else:
+                mes = operacion.get("particion")
+            if mes is None:
+                return self._guardar_particiones(path, self._cargar_particiones(path))
+            por_mes.setdefault(mes, []).append(operacion)
+        meses = set(self._leer_manifest(path))
+        for mes, operaciones in por_mes.items():
+            registros = self._aplicar_journal(
+                self._leer_particion(path, mes), operaciones, campos["id"]
+            )
+            if registros:
+                if not write_json(self._particion_path(path, mes), registros):
+                    return False
+                meses.add(mes)
+            else:
+                self._borrar(self._particion_path(path, mes))
+                meses.discard(mes)
+        self._escribir_manifest(path, meses)
+        self._versionar_particiones(path, meses)
+        truncate_journal(journal_path(path))
+        return True
+
+    def _versionar_particiones(self, path, meses):
+        """Registra en el historial de *path* qué versión de cada partición la forma.
+
+        Así ``history_utils`` puede cargar o restaurar la colección completa
+        tal como estaba, aunque cada partición se versione por separado.
+        """
+        versiones = {}
+        for mes in meses:
+            particion = self._particion_path(path, mes)
+            version = ultima_version(particion)
+            if version is None:
+                version = guardar_version(particion, self._leer_particion(path, mes))
+            versiones[mes] = version
+        guardar_version_particiones(path, versiones)
+
+    @staticmethod
+    def _borrar(path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    @staticmethod
+    def _aplicar_journal(data, operaciones, campo_id):
+        """Reproduce sobre *data* las operaciones registradas en el journal.
+
+        Las operaciones son idempotentes por clave: volver a aplicar un alta ya
+        presente en el snapshot (por ejemplo tras una compactación
+        interrumpida) reemplaza el registro en lugar de duplicarlo.
+        """
+        posiciones = {r.get(campo_id): i for i, r in enumerate(data)}
+        eliminados = set()
+        for operacion in operaciones:
+            op = operacion.get("op")
+            if op == "add":
+                registro = _registro_de(operacion)
+                clave = registro.get(campo_id)
+                eliminados.discard(clave)
+                if clave in posiciones:
+                    data[posiciones[clave]] = registro
+                else:
+                    posiciones[clave] = len(data)
+                    data.append(registro)
+            elif op == "del":
+                eliminados.add(operacion.get("id"))
+            else:
+                logger.warning(f"Operación de journal desconocida: {operacion}")
+        if eliminados:
+            data = [r for r in data if r.get(campo_id) not in eliminados]
+        return data
+
+
+class AlmacenSQLite:
+    """Almacén SQLite con una tabla indexada por colección."""
+
+    def __init__(self):
+        self._conexiones = {}
+        self._tablas = set()
+        self._lock = threading.RLock()
+
+    def firma(self, path):
+        """Retorna un valor que cambia cada vez que cambia la colección.
+
+        ``PRAGMA data_version`` detecta cambios hechos por otras conexiones y
+        la versión de la tabla los hechos por esta conexión.
+        """
+        conexion, tabla = self._preparar(path)
+        with self._lock:
+            (version,) = conexion.execute("PRAGMA data_version").fetchone()
+            return (version, self._version_tabla(conexion, tabla))
+
+    def marca(self, path):
+        """Retorna la versión persistente de la tabla de la colección.
+
+        Cada escritura la incrementa dentro de su transacción, por lo que se
+        conserva entre procesos.
+        """
+        conexion, tabla = self._preparar(path)
+        with self._lock:
+            return self._version_tabla(conexion, tabla)
+
+    @staticmethod
+    def _version_tabla(conexion, tabla):
+        fila = conexion.execute(
+            "SELECT version FROM _versiones WHERE tabla=?", (tabla,)
+        ).fetchone()
+        return fila[0] if fila else 0
+
+    def rango_eficiente(self, path):
+        """Las consultas por rango usan el índice por fecha."""
+        return True
+
+    @staticmethod
+    def _modificada(conexion, tabla):
+        conexion.execute("INSERT OR IGNORE INTO _versiones (tabla, version) VALUES (?, 0)", (tabla,))
+        conexion.execute("UPDATE _versiones SET version = version + 1 WHERE tabla=?", (tabla,))
+
+    def _conexion(self, path):
+        db_path = os.path.join(os.path.dirname(os.path.abspath(path)), "cafe.db")
+        with self._lock:
+            conexion = self._conexiones.get(db_path)
+            if conexion is None:
+                conexion = sqlite3.connect(db_path, check_same_thread=False)
+                conexion.execute("PRAGMA journal_mode=WAL")
+                conexion.execute("PRAGMA synchronous=NORMAL")
+                with conexion:
+                    conexion.execute(
+                        "CREATE TABLE IF NOT EXISTS _versiones "
+                        "(tabla TEXT PRIMARY KEY, version INTEGER NOT NULL)"
+                    )
+                self._conexiones[db_path] = conexion
+            return conexion
+
+    @staticmethod
+    def _tabla(path):
+        return re.sub(r"\W", "_", nombre_coleccion(path))
+
+    def _preparar(self, path):
+        """Retorna conexión y tabla, creándola y migrando el JSON si hace falta.
+
+        La tabla se crea y se llena con los registros del JSON en una sola
+        transacción: si la migración falla no queda una tabla vacía y se
+        reintenta en el próximo uso.
+
+        Raises:
+            sqlite3.Error: Si no se pudo crear o migrar la tabla.
+        """
+        conexion = self._conexion(path)
+        tabla = self._tabla(path)
+        clave = (id(conexion), tabla)
+        if clave in self._tablas:
+            return conexion, tabla
+        with self._lock:
+            existe = conexion.execute(
+                "SELECT 1 FROM sqlite_master WHERE type='table' AND name=?", (tabla,)
+            ).fetchone()
+            if not existe:
+                registros = self._registros_json(path)
+                try:
+                    with conexion:
+                        # Sin BEGIN explícito sqlite3 confirmaría cada CREATE por separado.
+                        conexion.execute("BEGIN")
+                        conexion.execute(
+                            f'CREATE TABLE "{tabla}" ('
+                            "pk TEXT PRIMARY KEY, pos INTEGER NOT NULL, "
+                            "fecha TEXT, clave TEXT, data TEXT NOT NULL)"
+                        )
+                        conexion.execute(f'CREATE INDEX "idx_{tabla}_fecha" ON "{tabla}"(fecha)')
+                        conexion.execute(f'CREATE INDEX "idx_{tabla}_clave" ON "{tabla}"(clave)')
+                        conexion.execute(f'CREATE INDEX "idx_{tabla}_pos" ON "{tabla}"(pos)')
+                        if registros:
+                            logger.info(f"Migrando {len(registros)} registros de {path} a SQLite.")
+                            conexion.executemany(
+                                f'INSERT OR REPLACE INTO "{tabla}" (pk, pos, fecha, clave, data) '
+                                "VALUES (?, ?, ?, ?, ?)",
+                                [self._fila(path, r, i) for i, r in enumerate(registros)],
+                            )
+                            self._modificada(conexion, tabla)
+                except sqlite3.Error as e:
+                    logger.error(f"Error al migrar {path} a SQLite: {e}")
+                    raise
+            self._tablas.add(clave)
+        return conexion, tabla
+
+    @staticmethod
+    def _registros_json(path):
+        """Retorna los registros de la colección JSON de *path* a migrar."""
+        json_almacen = AlmacenJSON()
+        if not any(json_almacen.firma(path)):
+            return []
+        return json_almacen.cargar(path)
+
+    @staticmethod
+    def _fila(path, registro, pos):
+        campos = esquema(path)
+        pk = registro.get(campos["id"])
+        fecha = normalizar_fecha(registro.get(campos["fecha"])) if "fecha" in campos else None
+        clave = registro.get(campos["clave"]) if "clave" in campos else None
+        data = json.dumps(registro, ensure_ascii=False, separators=(",", ":"))
+        return (str(pk), pos, fecha, None if clave is None else str(clave), data)
+
+    @staticmethod
+    def _decodificar(filas):
+        return [json.loads(fila[0]) for fila in filas]
+
+    def cargar(self, path):
+        conexion, tabla = self._preparar(path)
+        with self._lock:
+            return self._decodificar(conexion.execute(f'SELECT data FROM "{tabla}" ORDER BY pos'))
+
+    def guardar(self, path, registros):
+        """Reemplaza la colección escribiendo solo las filas que cambiaron."""
+        conexion, tabla = self._preparar(path)
+        filas = [self._fila(path, r, i) for i, r in enumerate(registros)]
+        try:
+            with self._lock, conexion:
+                actuales = {
+                    pk: (pos, data)
+                    for pk, pos, data in conexion.execute(f'SELECT pk, pos, data FROM "{tabla}"')
+                }
+                nuevas = {fila[0] for fila in filas}
+                borrar = [(pk,) for pk in actuales if pk not in nuevas]
+                cambiadas = [
+                    fila for fila in filas if actuales.get(fila[0]) != (fila[1], fila[4])
+                ]
+                conexion.executemany(f'DELETE FROM "{tabla}" WHERE pk=?', borrar)
+                conexion.executemany(
+                    f'INSERT OR REPLACE INTO "{tabla}" (pk, pos, fecha, clave, data) VALUES (?, ?, ?, ?, ?)',
+                    cambiadas,
+                )
+                self._modificada(conexion, tabla)
+        except sqlite3.Error as e:
+            logger.error(f"Error al guardar {tabla} en SQLite: {e}")
+            return False
+        return True
+
+    def compactar(self, path):
+        return True
+
+    def agregar(self, path, registro):
+        conexion, tabla = self._preparar(path)
+        try:
+            with self._lock, conexion:
+                (pos,) = conexion.execute(f'SELECT COALESCE(MAX(pos), -1) + 1 FROM "{tabla}"').fetchone()
+                conexion.execute(
+                    f'INSERT OR REPLACE INTO "{tabla}" (pk, pos, fecha, clave, data) VALUES (?, ?, ?, ?, ?)',
+                    self._fila(path, registro, pos),
+                )
+                self._modificada(conexion, tabla)
+        except sqlite3.Error as e:
+            logger.error(f"Error al agregar en {tabla}: {e}")
+            return False
+        return True
+
+    def agregar_varios(self, path, registros):
+        """Agrega varios registros en una sola transacción."""
+        conexion, tabla = self._preparar(path)
+        try:
+            with self._lock, conexion:
+                (pos,) = conexion.execute(f'SELECT COALESCE(MAX(pos), -1) + 1 FROM "{tabla}"').fetchone()
+                conexion.executemany(
+                    f'INSERT OR REPLACE INTO "{tabla}" (pk, pos, fecha, clave, data) VALUES (?, ?, ?, ?, ?)',
+                    [self._fila(path, r, pos + i) for i, r in enumerate(registros)],
+                )
+                self._modificada(conexion, tabla)
+        except sqlite3.Error as e:
+            logger.error(f"Error al agregar en {tabla}: {e}")
+            return False
+        return True
+
+    def actualizar(self, path, registro):
+        conexion, tabla = self._preparar(path)
+        pk, _, fecha, clave, data = self._fila(path, registro, 0)
+        try:
+            with self._lock, conexion:
+                cursor = conexion.execute(
+                    f'UPDATE "{tabla}" SET fecha=?, clave=?, data=? WHERE pk=?',
+                    (fecha, clave, data, pk),
+                )
+                if cursor.rowcount == 0:
+                    # Sin fila que actualizar: se agrega en la misma transacción.
+                    (pos,) = conexion.execute(
+                        f'SELECT COALESCE(MAX(pos), -1) + 1 FROM "{tabla}"'
+                    ).fetchone()
+                    conexion.execute(
+                        f'INSERT INTO "{tabla}" (pk, pos, fecha, clave, data) VALUES (?, ?, ?, ?, ?)',
+                        (pk, pos, fecha, clave, data),
+                    )
+                self._modificada(conexion, tabla)
+        except sqlite3.Error as e:
+            logger.error(f"Error al actualizar {tabla}: {e}")
+            return False
+        return True
+
+    def actualizar_varios(self, path, registros):
+        """Actualiza varios registros en una sola transacción."""
+        conexion, tabla = self._preparar(path)
+        filas = [self._fila(path, r, 0) for r in registros]
+        try:
+            with self._lock, conexion:
+                for pk, _, fecha, clave, data in filas:
+                    cursor = conexion.execute(
+                        f'UPDATE "{tabla}" SET fecha=?, clave=?, data=? WHERE pk=?',
+                        (fecha, clave, data, pk),
+                    )
+                    if cursor.rowcount == 0:
+                        (pos,) = conexion.execute(
+                            f'SELECT COALESCE(MAX(pos), -1) + 1 FROM "{tabla}"'
+                        ).fetchone()
+                        conexion.execute(
+                            f'INSERT INTO "{tabla}" (pk, pos, fecha, clave, data) VALUES (?, ?, ?, ?, ?)',
+                            (pk, pos, fecha, clave, data),
+                        )
+                self._modificada(conexion, tabla)
+        except sqlite3.Error as e:
+            logger.error(f"Error al actualizar {tabla}: {e}")
+            return False
+        return True
+
+    def eliminar(self, path, valor):
+        conexion, tabla = self._preparar(path)
+        try:
+            with self._lock, conexion:
+                cursor = conexion.execute(f'DELETE FROM "{tabla}" WHERE pk=?', (str(valor),))
+                self._modificada(conexion, tabla)
+        except sqlite3.Error as e:
+            logger.error(f"Error al eliminar en {tabla}: {e}")
+            return False
+        return cursor.rowcount > 0
+
+    def obtener(self, path, valor):
+        conexion, tabla = self._preparar(path)
+        with self._lock:
+            fila = conexion.execute(f'SELECT data FROM "{tabla}" WHERE pk=?', (str(valor),)).fetchone()
+        return json.loads(fila[0]) if fila else None
+
+    def buscar(self, path, valor):
+        conexion, tabla = self._preparar(path)
+        with self._lock:
+            filas = conexion.execute(
+                f'SELECT data FROM "{tabla}" WHERE clave=? ORDER BY pos', (str(valor),)
+            )
+            return self._decodificar(filas)
+
+    def rango(self, path, inicio=None, fin=None):
+        conexion, tabla = self._preparar(path)
+        inicio = normalizar_fecha(inicio) or ""
+        fin = normalizar_fecha(fin) or "9999"
+        with self._lock:
+            filas = conexion.execute(
+                f'SELECT data FROM "{tabla}" WHERE fecha BETWEEN ? AND ? ORDER BY pos',
+                (inicio, fin),
+            )
+            return self._decodificar(filas)
+
+    def iterar(self, path, inicio=None, fin=None):
+        """Recorre los registros de *path* (o los del período) de a ``LOTE_ITERACION`` filas.
+
+        Cada lote es una consulta independiente que continúa desde la última
+        posición leída, por lo que el lock no queda tomado entre lotes.
+        """
+        conexion, tabla = self._preparar(path)
+        condicion, parametros = "", ()
+        if inicio is not None or fin is not None:
+            condicion = " AND fecha BETWEEN ? AND ?"
+            parametros = (normalizar_fecha(inicio) or "", normalizar_fecha(fin) or "9999")
+        ultima = -1
+        while True:
+            with self._lock:
+                filas = conexion.execute(
+                    f'SELECT pos, data FROM "{tabla}" WHERE pos > ?{condicion} ORDER BY pos LIMIT ?',
+                    (ultima, *parametros, LOTE_ITERACION),
+                ).fetchall()
+            if not filas:
+                return
+            for _, data in filas:
+                yield json.loads(data)
+            ultima = filas[-1][0]
+
+    def meses(self, path):
+        """Retorna los meses ``AAAA-MM`` con registros en la colección."""
+        conexion, tabla = self._preparar(path)
+        with self._lock:
+            filas = conexion.execute(
+                f'SELECT DISTINCT substr(fecha, 1, 7) FROM "{tabla}" WHERE fecha IS NOT NULL ORDER BY 1'
+            )
+            return [fila[0] for fila in filas]
+
+
+_ALMACENES = {}
+
+
+def obtener_almacen():
+    """Retorna el almacén configurado en ``config.get_storage_backend()``."""
+    backend = config.get_storage_backend()
+    almacen = _ALMACENES.get(backend)
+    if almacen is None:
+        if backend == "sqlite":
+            almacen = AlmacenSQLite()
+        elif backend == "json":
+            almacen = AlmacenJSON()
+        else:
+            raise ValueError(f"Backend de almacenamiento desconocido: '{backend}'.")
+        _ALMACENES[backend] = almacen
+    return almacen
+
+
+def migrar_json_a_sqlite(directorio=None):
+    """Migra a SQLite todas las colecciones JSON de *directorio*.
+
+    Solo se importan las colecciones cuya tabla todavía no existe, por lo que
+    ejecutar la migración varias veces no duplica datos. Retorna un
+    diccionario ``coleccion -> registros en SQLite``.
+    """
+    directorio = directorio or os.path.dirname(config.get_data_path("productos.json"))
+    almacen = _ALMACENES.setdefault("sqlite", AlmacenSQLite())
+    resultado = {}
+    for coleccion in ESQUEMAS:
+        path = os.path.join(directorio, f"{coleccion}.json")
+        almacen._preparar(path)
+        resultado[coleccion] = len(almacen.cargar(path))
+    return resultado
+
+
+def respaldar(destino, directorio=None):
+    """Copia el directorio de datos completo a *destino* (que no debe existir).
+
+    Antes de copiar compacta los journals pendientes (o vuelca el WAL de
+    SQLite a ``cafe.db``), de modo que el respaldo no depende de escrituras
+    sin compactar. Se copian también las particiones, el historial y los
+    datos derivados (``rollups``, ``columnas``); el directorio ``backups`` se
+    omite. Conviene ejecutarlo con la aplicación cerrada. Retorna *destino*.
+    """
+    directorio = directorio or os.path.dirname(config.get_data_path("productos.json"))
+    almacen = obtener_almacen()
+    for coleccion in ESQUEMAS:
+        path = os.path.join(directorio, f"{coleccion}.json")
+        if isinstance(almacen, AlmacenSQLite):
+            with almacen._lock:
+                almacen._conexion(path).execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            break
+        if journal_size(journal_path(path)) and not almacen.compactar(path):
+            raise OSError(f"No se pudo compactar {path} antes del respaldo.")
+    shutil.copytree(directorio, destino, ignore=shutil.ignore_patterns("backups"))
+    return destino
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["migrar"]:
+        for coleccion, cantidad in migrar_json_a_sqlite(*sys.argv[2:3]).items():
+            print(f"{coleccion}: {cantidad} registros")
+    elif sys.argv[1:2] == ["respaldar"] and len(sys.argv) in (3, 4):
+        print(respaldar(*sys.argv[2:4]))
+    else:
+        print(
+            "Uso: python -m utils.storage migrar [directorio_de_datos]\n"
+            "     python -m utils.storage respaldar <destino> [directorio_de_datos]"
+        )
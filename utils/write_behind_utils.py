@@ -0,0 +1,213 @@
+"""Escritura diferida con confirmación en grupo (*group commit*).
+
+Con ``config.escritura_diferida()`` activo, las operaciones frecuentes (por
+ejemplo cada venta) se aplican en memoria y se encolan aquí en lugar de
+escribirse una por una. Un hilo trabajador vacía la cola en grupos cuando se
+juntan ``TAMANO_LOTE`` elementos o cuando el más antiguo lleva
+``INTERVALO_SEGUNDOS`` esperando, de modo que una ráfaga de ventas comparte
+un único ``fsync`` por colección.
+
+Cada elemento encolado devuelve una ``Confirmacion`` que se resuelve recién
+cuando su grupo quedó persistido. La cola es acotada: al llegar a
+``MAX_PENDIENTES`` quien encola vacía la cola en su propio hilo. Igual que el
+exportador de ``utils.export_utils``, el hilo trabajador no es *daemon* y
+termina cuando no quedan pendientes, por lo que el intérprete no sale con
+escrituras sin confirmar.
+
+Las funciones que persisten cada grupo se ejecutan bajo el lock del cache de
+repositorios: quien lee del almacén mientras tiene ese lock (los cargadores
+de los controladores) puede vaciar la cola antes de leer sin riesgo de
+bloqueo mutuo con el hilo trabajador.
+"""
+
+import logging
+import threading
+import time
+
+from utils.cache_utils import REPOSITORIOS
+
+logger = logging.getLogger(__name__)
+
+# Elementos que disparan un vaciado sin esperar el intervalo.
+TAMANO_LOTE = 20
+# Segundos que puede esperar el elemento más antiguo antes de persistirse.
+INTERVALO_SEGUNDOS = 1.0
+# Máximo de elementos en memoria; al superarlo se vacía en el hilo que encola.
+MAX_PENDIENTES = 200
+# Vaciados fallidos seguidos tras los que el hilo trabajador se detiene.
+REINTENTOS = 3
+
+
+class Confirmacion:
+    """Acuse de una escritura diferida, resuelto al persistir su grupo."""
+
+    def __init__(self):
+        self._evento = threading.Event()
+
+    @property
+    def confirmada(self):
+        return self._evento.is_set()
+
+    def esperar(self, timeout=None):
+        """Espera la persistencia; retorna ``True`` si quedó confirmada."""
+        return self._evento.wait(timeout)
+
+    def _resolver(self):
+        self._evento.set()
+
+
+class ColaEscrituraDiferida:
+    """Cola acotada de escrituras agrupadas por tipo de operación.
+
+    Cada *grupo* (por ejemplo ``"ventas"``) tiene una función de persistencia
+    registrada con ``registrar`` que recibe la lista de elementos pendientes
+    en el orden en que se encolaron. Si la función falla los elementos
+    quedan en la cola y se reintentan en el siguiente vaciado.
+    """
+
+    def __init__(
+        self,
+        tamano_lote=TAMANO_LOTE,
+        intervalo=INTERVALO_SEGUNDOS,
+        max_pendientes=MAX_PENDIENTES,
+        bloqueo=None,
+    ):
+        self.tamano_lote = tamano_lote
+        self.intervalo = intervalo
+        self.max_pendientes = max_pendientes
+        self._bloqueo = bloqueo if bloqueo is not None else threading.RLock()
+        self._persistir = {}  # grupo -> funcion(elementos)
+        self._pendientes = []  # (grupo, elemento, confirmacion)
+        self._primero = None  # instante en que se encoló el pendiente más antiguo
+        self._en_curso = 0  # lotes tomados de la cola y aún no persistidos
+        self._condicion = threading.Condition()
+        self._hilo = None
+
+    def registrar(self, grupo, funcion):
+        """Registra la función que persiste los elementos de *grupo*."""
+        self._persistir[grupo] = funcion
+
+    def encolar(self, grupo, elemento):
+        """Encola *elemento* de *grupo* y retorna su ``Confirmacion``."""
+        if grupo not in self._persistir:
+            raise ValueError(f"Grupo de escritura desconocido: '{grupo}'.")
+        confirmacion = Confirmacion()
+        with self._condicion:
+            if not self._pendientes:
+                self._primero = time.monotonic()
+            self._pendientes.append((grupo, elemento, confirmacion))
+            lleno = len(self._pendientes) >= self.max_pendientes
+            if self._hilo is None:
+                self._hilo = threading.Thread(target=self._ejecutar, name="escritura-diferida")
+                self._hilo.start()
+            self._condicion.notify()
+        if lleno:
+            self.vaciar()
+        return confirmacion
+
+    def pendientes(self):
+        """Cantidad de elementos encolados aún no persistidos."""
+        with self._condicion:
+            return len(self._pendientes)
+
+    def vaciar(self):
+        """Persiste ya todo lo pendiente; retorna ``False`` si algo falló.
+
+        Si otro hilo está persistiendo un lote, espera a que termine: al
+        retornar, todo lo encolado antes de la llamada está en disco.
+        """
+        with self._condicion:
+            if not self._pendientes and not self._en_curso:
+                return True
+        with self._bloqueo:
+            with self._condicion:
+                lote = self._pendientes
+                self._pendientes = []
+                self._primero = None
+                self._en_curso += 1
+            try:
+                return self._persistir_lote(lote)
+            finally:
+                with self._condicion:
+                    self._en_curso -= 1
+
+    def detener(self):
+        """Vacía la cola y espera a que finalice el hilo trabajador."""
+        ok = self.vaciar()
+        with self._condicion:
+            hilo = self._hilo
+            self._condicion.notify()
+        if hilo is not None and hilo is not threading.current_thread():
+            hilo.join(timeout=5)
+        return ok
+
+    def _persistir_lote(self, lote):
+        por_grupo = {}
+        for grupo, elemento, confirmacion in lote:
+            elementos, confirmaciones = por_grupo.setdefault(grupo, ([], []))
+            elementos.append(elemento)
+            confirmaciones.append(confirmacion)
+        fallidos = []
+        for grupo, (elementos, confirmaciones) in por_grupo.items():
+            try:
+                self._persistir[grupo](elementos)
+            except Exception as e:
+                logger.error(f"No se pudieron persistir {len(elementos)} escrituras de '{grupo}': {e}")
+                fallidos.extend(item for item in lote if item[0] == grupo)
+                continue
+            for confirmacion in confirmaciones:
+                confirmacion._resolver()
+        if fallidos:
+            # Se reintentan en el próximo vaciado, antes que los nuevos.
+            with self._condicion:
+                self._pendientes[:0] = fallidos
+                self._primero = time.monotonic()
+        return not fallidos
+
+    def _ejecutar(self):
+        fallos = 0
+        while True:
+            with self._condicion:
+                while self._pendientes and len(self._pendientes) < self.tamano_lote:
+                    restante = self._primero + self.intervalo - time.monotonic()
+                    if restante <= 0:
+                        break
+                    self._condicion.wait(restante)
+                if not self._pendientes or fallos >= REINTENTOS:
+                    # Tras varios fallos seguidos el hilo termina para no
+                    # impedir la salida; el próximo encolado lo reinicia.
+                    self._hilo = None
+                    return
+            if self.vaciar():
+                fallos = 0
+            else:
+                fallos += 1
+                time.sleep(self.intervalo)
+
+
+_COLA = ColaEscrituraDiferida(bloqueo=REPOSITORIOS.bloqueo)
+
+
+def registrar_persistencia(grupo, funcion):
+    """Registra en la cola compartida la función que persiste *grupo*."""
+    _COLA.registrar(grupo, funcion)
+
+
+def encolar_escritura(grupo, elemento):
+    """Encola *elemento* en la cola compartida y retorna su ``Confirmacion``."""
+    return _COLA.encolar(grupo, elemento)
+
+
+def vaciar_escrituras():
+    """Persiste ya las escrituras pendientes de la cola compartida."""
+    return _COLA.vaciar()
+
+
+def detener_escrituras():
+    """Vacía la cola compartida y espera a su hilo (al cerrar la aplicación)."""
+    return _COLA.detener()
+
+
+def escrituras_pendientes():
+    """Cantidad de escrituras de la cola compartida aún no persistidas."""
+    return _COLA.pendientes()